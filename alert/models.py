@@ -1,5 +1,13 @@
+from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel
 
 class AlertIn(BaseModel):
     vin: int
     alertTypeId: int
+
+class AlertOut(BaseModel):
+    alertId: int
+    vin: int
+    alertTypeId: int
+    timestamp: Optional[datetime] = None
@@ -1,54 +1,70 @@
-from fastapi import APIRouter, HTTPException
-from ..database import SessionLocal
-from .models import AlertIn
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from ..export import PAGE_SIZE, export, exportFormats
+from .models import AlertIn, AlertOut
 from .schemas import Alert
+from .summary import record_alerts
 
 router = APIRouter()
 
+def alert_entry(alert: Alert):
+    return {"vin": alert.vin, "alertTypeId": alert.alertTypeId, "timestamp": alert.timestamp}
+
 @router.post("/")
-async def create_alert(alert: AlertIn):
-    db = SessionLocal()
+async def create_alert(alert: AlertIn, db: AsyncSession = Depends(get_db)) -> AlertOut:
     db_alert = Alert(
         vin = alert.vin,
-        alertTypeId = alert.alertTypeId
+        alertTypeId = alert.alertTypeId,
+        timestamp = datetime.utcnow()
     )
     db.add(db_alert)
-    db.commit()
-    db.refresh(db_alert)
+    await record_alerts(db, [alert_entry(db_alert)])
+    await db.commit()
+    await db.refresh(db_alert)
     return db_alert
 
 @router.get("/all")
-async def create_alert():
-    db = SessionLocal()
-    db_alerts = db.query(Alert).all()
-    return db_alerts
+async def get_alerts(
+    after: Optional[int] = None,
+    limit: int = PAGE_SIZE,
+    vin: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    format: exportFormats = exportFormats.json,
+    db: AsyncSession = Depends(get_db)
+):
+    return await export(db, Alert.__table__, "alertId", format, after, limit, vin, since, until, "alerts")
 
 @router.get("/{alert_id}")
-async def get_alert(alert_id: int):
-    db = SessionLocal()
-    db_alert = db.query(Alert).filter(Alert.alertId == alert_id).first()
+async def get_alert(alert_id: int, db: AsyncSession = Depends(get_db)) -> AlertOut:
+    db_alert = await db.scalar(select(Alert).where(Alert.alertId == alert_id))
     if not db_alert:
         raise HTTPException(status_code=404, detail="Alert Not Found")
     return db_alert
 
 @router.put("/{alert_id}")
-async def update_alert(alert_id: int, alert: AlertIn):
-    db = SessionLocal()
-    db_alert = db.query(Alert).filter(Alert.alertId == alert_id).first()
+async def update_alert(alert_id: int, alert: AlertIn, db: AsyncSession = Depends(get_db)) -> AlertOut:
+    db_alert = await db.scalar(select(Alert).where(Alert.alertId == alert_id))
     if not db_alert:
         raise HTTPException(status_code=404, detail="Alert Not Found")
+    await record_alerts(db, [alert_entry(db_alert)], sign=-1)
     db_alert.vin = alert.vin
     db_alert.alertTypeId = alert.alertTypeId
-    db.commit()
-    db.refresh(db_alert)
+    await record_alerts(db, [alert_entry(db_alert)])
+    await db.commit()
+    await db.refresh(db_alert)
     return db_alert
 
 @router.delete("/{alert_id}")
-async def delete_alert(alert_id: int):
-    db = SessionLocal()
-    db_alert = db.query(Alert).filter(Alert.alertId == alert_id).first()
+async def delete_alert(alert_id: int, db: AsyncSession = Depends(get_db)) -> dict[str, str]:
+    db_alert = await db.scalar(select(Alert).where(Alert.alertId == alert_id))
     if not db_alert:
         raise HTTPException(status_code=404, detail="Alert Not Found")
-    db.delete(db_alert)
-    db.commit()
+    await record_alerts(db, [alert_entry(db_alert)], sign=-1)
+    await db.delete(db_alert)
+    await db.commit()
     return {"message": "Alert deleted successfully"}
\ No newline at end of file
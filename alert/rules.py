@@ -0,0 +1,139 @@
+import operator
+from sqlalchemy import insert, select
+from ..cache import version_key
+from ..config import ALERT_QUEUE_SIZE, ALERT_BATCH_SIZE, ALERT_BATCH_WAIT
+from ..database import AsyncSessionLocal, redis_client
+from ..fanout import publish
+from ..worker import BatchWorker
+from ..alert_type.models import comparisons
+from ..alert_type.schemas import AlertType
+from .schemas import Alert
+from .summary import record_alerts
+
+FIRE = "fire"
+CLEAR = "clear"
+HOLD = "hold"
+
+OPERATORS = {
+    comparisons.gt: operator.gt,
+    comparisons.ge: operator.ge,
+    comparisons.lt: operator.lt,
+    comparisons.le: operator.le,
+    comparisons.eq: operator.eq,
+    comparisons.ne: operator.ne,
+}
+
+STATE_SCRIPT = redis_client.register_script("""
+local key = KEYS[1]
+local rule = ARGV[1]
+local transition = ARGV[2]
+local ts = tonumber(ARGV[3])
+local cooldown = tonumber(ARGV[4])
+
+if transition == 'clear' then
+    redis.call('HSET', key, rule .. ':active', 0)
+    return 0
+end
+
+local prev = redis.call('HMGET', key, rule .. ':active', rule .. ':fired')
+if prev[1] == '1' then
+    return 0
+end
+redis.call('HSET', key, rule .. ':active', 1)
+local fired = tonumber(prev[2])
+if fired and ts - fired < cooldown then
+    return 0
+end
+redis.call('HSET', key, rule .. ':fired', ts)
+return 1
+""")
+
+def state_key(vin: int):
+    return f"alert_state:{vin}"
+
+def clear_alert_state(vin: int):
+    redis_client.delete(state_key(vin))
+
+class Rule:
+    def __init__(self, alert_type: AlertType):
+        self.alertTypeId = alert_type.alertTypeId
+        self.field = alert_type.field.value
+        self.compare = OPERATORS[alert_type.comparison]
+        self.threshold = alert_type.threshold
+        self.cooldown = alert_type.cooldown or 0
+        hysteresis = alert_type.hysteresis or 0.0
+        if alert_type.comparison in (comparisons.gt, comparisons.ge):
+            self.release = self.threshold - hysteresis
+        elif alert_type.comparison in (comparisons.lt, comparisons.le):
+            self.release = self.threshold + hysteresis
+        else:
+            self.release = self.threshold
+
+    def transition(self, row: dict):
+        value = row[self.field]
+        if self.compare(value, self.threshold):
+            return FIRE
+        if not self.compare(value, self.release):
+            return CLEAR
+        return HOLD
+
+async def load_rules():
+    async with AsyncSessionLocal() as db:
+        alert_types = await db.scalars(select(AlertType).where(AlertType.field.is_not(None)))
+        return [Rule(alert_type) for alert_type in alert_types]
+
+def evaluate(rules, rows):
+    candidates = []
+    last = {}
+    for row in sorted(rows, key=lambda row: row["timestamp"]):
+        for rule in rules:
+            transition = rule.transition(row)
+            key = (row["vin"], rule.alertTypeId)
+            if transition == HOLD or last.get(key) == transition:
+                continue
+            last[key] = transition
+            candidates.append((row, rule, transition))
+    if not candidates:
+        return []
+
+    pipe = redis_client.pipeline(transaction=False)
+    for row, rule, transition in candidates:
+        STATE_SCRIPT(
+            keys=[state_key(row["vin"])],
+            args=[rule.alertTypeId, transition, row["timestamp"].timestamp(), rule.cooldown],
+            client=pipe
+        )
+    fired = pipe.execute()
+    return [
+        {"vin": row["vin"], "alertTypeId": rule.alertTypeId, "timestamp": row["timestamp"]}
+        for (row, rule, _), hit in zip(candidates, fired)
+        if hit
+    ]
+
+class AlertWorker(BatchWorker):
+    name = "alert rules engine"
+
+    def __init__(self):
+        super().__init__(ALERT_QUEUE_SIZE, ALERT_BATCH_SIZE, ALERT_BATCH_WAIT)
+        self.rules = None
+        self.rules_version = None
+
+    async def refresh_rules(self):
+        version = redis_client.get(version_key("alert_rules"))
+        if self.rules is None or version != self.rules_version:
+            self.rules = await load_rules()
+            self.rules_version = version
+
+    async def process(self, items):
+        await self.refresh_rules()
+        rows = [row for row, _ in items]
+        alerts = evaluate(self.rules, rows)
+        if alerts:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(Alert), alerts)
+                await record_alerts(db, alerts)
+                await db.commit()
+            publish("alert", alerts, {row["vin"]: fleet_id for row, fleet_id in items})
+        self.stats["fired"] += len(alerts)
+
+alert_worker = AlertWorker()
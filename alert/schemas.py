@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from ..database import Base
 
@@ -7,4 +7,16 @@ class Alert(Base):
     alertId = Column(Integer, primary_key=True, index=True, autoincrement="auto")
     vin = Column(Integer, ForeignKey("vehicles.vin"))
     alertTypeId = Column(Integer, ForeignKey("alertTypes.alertTypeId"))
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+Index("ix_alerts_vin_timestamp", Alert.vin, Alert.timestamp.desc())
+Index("ix_alerts_alertTypeId_timestamp", Alert.alertTypeId, Alert.timestamp)
+Index("ix_alerts_timestamp", Alert.timestamp)
+
+class AlertCount(Base):
+    __tablename__ = "alert_counts"
+    granularity = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    fleetId = Column(Integer, primary_key=True)
+    alertTypeId = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,117 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import and_, delete, func, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..telemetry.models import utc_naive
+from ..vehicle.schemas import Vehicle
+from .schemas import Alert, AlertCount
+
+HOUR = "hour"
+DAY = "day"
+NO_FLEET = 0
+
+def floor_hour(ts: datetime):
+    return utc_naive(ts).replace(minute=0, second=0, microsecond=0)
+
+def floor_day(ts: datetime):
+    return floor_hour(ts).replace(hour=0)
+
+def ceil_hour(ts: datetime):
+    floored = floor_hour(ts)
+    return floored if floored == utc_naive(ts) else floored + timedelta(hours=1)
+
+def ceil_day(ts: datetime):
+    floored = floor_day(ts)
+    return floored if floored == ts else floored + timedelta(days=1)
+
+def count_rows(counts: Counter):
+    return [
+        {"granularity": granularity, "bucket": bucket, "fleetId": fleet_id, "alertTypeId": alert_type_id, "count": count}
+        for (granularity, bucket, fleet_id, alert_type_id), count in counts.items()
+        if count
+    ]
+
+def bucket_counts(entries, sign: int = 1):
+    counts = Counter()
+    for timestamp, fleet_id, alert_type_id in entries:
+        fleet_id = fleet_id or NO_FLEET
+        counts[(HOUR, floor_hour(timestamp), fleet_id, alert_type_id)] += sign
+        counts[(DAY, floor_day(timestamp), fleet_id, alert_type_id)] += sign
+    return counts
+
+async def record_alerts(db: AsyncSession, alerts, sign: int = 1):
+    if not alerts:
+        return
+    vins = {alert["vin"] for alert in alerts}
+    fleets = dict((await db.execute(select(Vehicle.vin, Vehicle.fleetId).where(Vehicle.vin.in_(vins)))).all())
+    counts = bucket_counts(
+        ((alert["timestamp"], fleets.get(alert["vin"]), alert["alertTypeId"]) for alert in alerts),
+        sign
+    )
+    rows = count_rows(counts)
+    if not rows:
+        return
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    table = AlertCount.__table__
+    stmt = dialect.insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.granularity, table.c.bucket, table.c.fleetId, table.c.alertTypeId],
+        set_={"count": table.c.count + stmt.excluded["count"]}
+    )
+    await db.execute(stmt, rows)
+    if sign < 0:
+        key = tuple_(AlertCount.granularity, AlertCount.bucket, AlertCount.fleetId, AlertCount.alertTypeId)
+        await db.execute(delete(AlertCount).where(key.in_(list(counts)), AlertCount.count <= 0))
+
+def summary_ranges(since: Optional[datetime], until: Optional[datetime]):
+    low = floor_hour(since) if since is not None else None
+    high = ceil_hour(until) if until is not None else None
+    day_low = ceil_day(low) if low is not None else None
+    day_high = floor_day(high) if high is not None else None
+    if day_low is not None and day_high is not None and day_low >= day_high:
+        return [(HOUR, low, high)]
+    ranges = [(DAY, day_low, day_high)]
+    if low is not None and low < day_low:
+        ranges.append((HOUR, low, day_low))
+    if high is not None and day_high < high:
+        ranges.append((HOUR, day_high, high))
+    return ranges
+
+def range_condition(granularity: str, low: Optional[datetime], high: Optional[datetime]):
+    conditions = [AlertCount.granularity == granularity]
+    if low is not None:
+        conditions.append(AlertCount.bucket >= low)
+    if high is not None:
+        conditions.append(AlertCount.bucket < high)
+    return and_(*conditions)
+
+async def alert_summary(db: AsyncSession, since: Optional[datetime] = None, until: Optional[datetime] = None, fleet_id: Optional[int] = None):
+    stmt = (
+        select(AlertCount.alertTypeId, func.sum(AlertCount.count))
+        .where(or_(*[range_condition(*bucket_range) for bucket_range in summary_ranges(since, until)]))
+        .group_by(AlertCount.alertTypeId)
+    )
+    if fleet_id is not None:
+        stmt = stmt.where(AlertCount.fleetId == fleet_id)
+    return {alert_type_id: int(count) for alert_type_id, count in await db.execute(stmt) if count}
+
+def rebuild_alert_counts(db: Session):
+    entries = (
+        db.query(Alert.timestamp, Vehicle.fleetId, Alert.alertTypeId)
+        .outerjoin(Vehicle, Vehicle.vin == Alert.vin)
+        .yield_per(10000)
+    )
+    rows = count_rows(bucket_counts(entries))
+    db.query(AlertCount).delete()
+    if rows:
+        db.execute(AlertCount.__table__.insert(), rows)
+    db.commit()
+
+if __name__ == "__main__":
+    from ..database import SessionLocal
+
+    with SessionLocal() as db:
+        rebuild_alert_counts(db)
@@ -1,5 +1,38 @@
+from enum import Enum
+from typing import Optional
 from pydantic import BaseModel
 
+class ruleFields(str, Enum):
+    speed = "speed"
+    fuel = "fuel"
+    odometerReading = "odometerReading"
+    diagnosticCode = "diagnosticCode"
+    latitude = "latitude"
+    longitude = "longitude"
+
+class comparisons(str, Enum):
+    gt = "gt"
+    ge = "ge"
+    lt = "lt"
+    le = "le"
+    eq = "eq"
+    ne = "ne"
+
 class AlertTypeIn(BaseModel):
     alertTitle: str
-    alertDescription: str
\ No newline at end of file
+    alertDescription: str
+    field: Optional[ruleFields] = None
+    comparison: Optional[comparisons] = None
+    threshold: Optional[float] = None
+    hysteresis: float = 0.0
+    cooldown: int = 0
+
+class AlertTypeOut(BaseModel):
+    alertTypeId: int
+    alertTitle: str
+    alertDescription: str
+    field: Optional[ruleFields] = None
+    comparison: Optional[comparisons] = None
+    threshold: Optional[float] = None
+    hysteresis: Optional[float] = None
+    cooldown: Optional[int] = None
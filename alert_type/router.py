@@ -1,52 +1,58 @@
-from fastapi import APIRouter, HTTPException
-from ..database import SessionLocal
-from .models import AlertTypeIn
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from ..cache import bump
+from .models import AlertTypeIn, AlertTypeOut
 from .schemas import AlertType
 
 router = APIRouter()
 
+def check_rule(alertType: AlertTypeIn):
+    parts = (alertType.field, alertType.comparison, alertType.threshold)
+    if any(part is None for part in parts) and any(part is not None for part in parts):
+        raise HTTPException(status_code=400, detail="Rules need field, comparison and threshold together")
+
 @router.post("/alertTypes")
-async def create_alert_type(alertType: AlertTypeIn):
-    db = SessionLocal()
-    db_alertType = db.query(AlertType).filter(AlertType.alertTitle == alertType.alertTitle and AlertType.alertDescription == alertType.alertDescription).first()
+async def create_alert_type(alertType: AlertTypeIn, db: AsyncSession = Depends(get_db)) -> AlertTypeOut:
+    db_alertType = await db.scalar(select(AlertType).where(AlertType.alertTitle == alertType.alertTitle, AlertType.alertDescription == alertType.alertDescription))
     if db_alertType:
         raise HTTPException(status_code=409, detail="Alert Type Already Exists")
-    db_alertType = AlertType(
-        alertTitle = alertType.alertTitle,
-        alertDescription = alertType.alertDescription
-    )
+    check_rule(alertType)
+    db_alertType = AlertType(**alertType.model_dump())
 
     db.add(db_alertType)
-    db.commit()
-    db.refresh(db_alertType)
+    await db.commit()
+    bump("alert_rules")
+    await db.refresh(db_alertType)
     return db_alertType
 
 @router.get("/alertTypes/{alert_type_id}")
-async def get_alert_type(alert_type_id: int):
-    db = SessionLocal()
-    db_alertType = db.query(AlertType).filter(AlertType.alertTypeId == alert_type_id).first()
+async def get_alert_type(alert_type_id: int, db: AsyncSession = Depends(get_db)) -> AlertTypeOut:
+    db_alertType = await db.scalar(select(AlertType).where(AlertType.alertTypeId == alert_type_id))
     if not db_alertType:
         raise HTTPException(status_code=404, detail="Alert Type Not Found")
     return db_alertType
 
 @router.put("/alertTypes/{alert_type_id}")
-async def update_alert_type(alert_type_id: int, alertType: AlertTypeIn):
-    db = SessionLocal()
-    db_alertType = db.query(AlertType).filter(AlertType.alertTypeId == alert_type_id).first()
+async def update_alert_type(alert_type_id: int, alertType: AlertTypeIn, db: AsyncSession = Depends(get_db)) -> AlertTypeOut:
+    db_alertType = await db.scalar(select(AlertType).where(AlertType.alertTypeId == alert_type_id))
     if not db_alertType:
         raise HTTPException(status_code=404, detail="Alert Type Not Found")
-    db_alertType.alertTitle = alertType.alertTitle
-    db_alertType.alertDescription = alertType.alertDescription
-    db.commit()
-    db.refresh(db_alertType)
+    check_rule(alertType)
+    for key, value in alertType.model_dump().items():
+        setattr(db_alertType, key, value)
+    await db.commit()
+    bump("alert_rules")
+    await db.refresh(db_alertType)
     return db_alertType
 
 @router.delete("/alertTypes/{alert_type_id}")
-async def delete_alert_type(alert_type_id: int):
-    db = SessionLocal()
-    db_alertType = db.query(AlertType).filter(AlertType.alertTypeId == alert_type_id).first()
+async def delete_alert_type(alert_type_id: int, db: AsyncSession = Depends(get_db)) -> dict[str, str]:
+    db_alertType = await db.scalar(select(AlertType).where(AlertType.alertTypeId == alert_type_id))
     if not db_alertType:
         raise HTTPException(status_code=404, detail="Alert Type Not Found")
-    db.delete(db_alertType)
-    db.commit()
+    await db.delete(db_alertType)
+    await db.commit()
+    bump("alert_rules")
     return {"message": "Alert Type deleted successfully"}
\ No newline at end of file
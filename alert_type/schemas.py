@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Float, Enum
 from sqlalchemy.sql import func
+from .models import ruleFields, comparisons
 from ..database import Base
 
 class AlertType(Base):
     __tablename__ = "alertTypes"
     alertTypeId = Column(Integer, primary_key=True, index=True, autoincrement="auto")
     alertTitle = Column(String)
-    alertDescription = Column(String)
\ No newline at end of file
+    alertDescription = Column(String)
+    field = Column(Enum(ruleFields))
+    comparison = Column(Enum(comparisons))
+    threshold = Column(Float)
+    hysteresis = Column(Float, default=0.0)
+    cooldown = Column(Integer, default=0)
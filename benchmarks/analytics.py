@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from ..config import ANALYTICS_PERCENTILES, ANALYTICS_FUEL_BINS, ANALYTICS_TOP_CODES
+from ..database import Base, async_url
+from ..fleet.analytics import load_window, summarize
+from ..fleet.schemas import Fleet
+from ..human.schemas import Human
+from ..manufacturer.schemas import Manufacturer
+from ..telemetry.schemas import Telemetry
+from ..vehicle.schemas import Vehicle
+
+FLEET_ID = 1
+START = datetime(2025, 1, 1)
+
+def seed(url: str, vehicles: int, rows: int, span: timedelta):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine, tables=[table.__table__ for table in (Manufacturer, Fleet, Human, Vehicle, Telemetry)])
+    with engine.begin() as conn:
+        conn.execute(insert(Vehicle), [
+            {"vin": vin, "fleetId": FLEET_ID} for vin in range(1, vehicles + 1)
+        ])
+        step = span / max(1, rows // vehicles)
+        odometers = [random.randint(0, 300000) for _ in range(vehicles)]
+        for offset in range(0, rows, 10000):
+            batch = []
+            for i in range(offset, min(offset + 10000, rows)):
+                vin = i % vehicles + 1
+                odometers[vin - 1] += random.randint(0, 2)
+                batch.append({
+                    "vin": vin,
+                    "latitude": random.uniform(-60, 60),
+                    "longitude": random.uniform(-180, 180),
+                    "speed": random.uniform(0, 140),
+                    "engineStatus": random.choice(["on", "on", "idle", "off"]),
+                    "fuel": random.random(),
+                    "odometerReading": odometers[vin - 1],
+                    "diagnosticCode": random.choice([0] * 20 + list(range(100, 130))),
+                    "timestamp": START + step * (i // vehicles)
+                })
+            conn.execute(insert(Telemetry), batch)
+    engine.dispose()
+
+def percentile(ordered, p: float):
+    rank = (len(ordered) - 1) * p / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def python_distribution(values):
+    if not values:
+        return {"mean": 0.0, "max": 0.0, "percentiles": {}}
+    ordered = sorted(values)
+    return {
+        "mean": sum(values) / len(values),
+        "max": ordered[-1],
+        "percentiles": {f"p{p:g}": percentile(ordered, p) for p in ANALYTICS_PERCENTILES},
+    }
+
+async def per_vin_loop(db, fleet_id: int, since: datetime, until: datetime):
+    vins = list(await db.scalars(select(Vehicle.vin).where(Vehicle.fleetId == fleet_id)))
+    speeds, fuels, deltas, vehicle_on = [], [], [], []
+    statuses, codes = Counter(), Counter()
+    for vin in vins:
+        rows = await db.execute(
+            select(Telemetry.speed, Telemetry.fuel, Telemetry.odometerReading, Telemetry.engineStatus, Telemetry.diagnosticCode)
+            .where(Telemetry.vin == vin, Telemetry.timestamp > since, Telemetry.timestamp <= until)
+        )
+        odometers = []
+        on = samples = 0
+        for speed, fuel, odometer, status, code in rows:
+            speeds.append(speed)
+            fuels.append(fuel)
+            odometers.append(odometer)
+            statuses[status.value] += 1
+            codes[code] += 1
+            on += status.value == "on"
+            samples += 1
+        if samples:
+            deltas.append(float(max(odometers) - min(odometers)))
+            vehicle_on.append(on / samples)
+    top = max(1.0, max(fuels, default=1.0))
+    width = top / ANALYTICS_FUEL_BINS
+    histogram = [0] * ANALYTICS_FUEL_BINS
+    for fuel in fuels:
+        histogram[min(int(fuel / width), ANALYTICS_FUEL_BINS - 1)] += 1
+    samples = len(speeds)
+    return {
+        "samples": samples,
+        "vehicles": len(deltas),
+        "speed": python_distribution(speeds),
+        "fuel": {"edges": [width * i for i in range(ANALYTICS_FUEL_BINS + 1)], "counts": histogram},
+        "odometer": {**python_distribution(deltas), "total": sum(deltas)},
+        "engine": {
+            **{status: statuses[status] / samples if samples else 0.0 for status in ("on", "idle", "off")},
+            "vehicleOn": python_distribution(vehicle_on),
+        },
+        "diagnosticCodes": [{"code": code, "count": count} for code, count in codes.most_common(ANALYTICS_TOP_CODES)],
+    }
+
+async def vectorized(db, fleet_id: int, since: datetime, until: datetime):
+    return summarize(await load_window(db, fleet_id, since, until))
+
+def close(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(close(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(close(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    return a == b
+
+async def timed(func, db, repeat: int, since: datetime, until: datetime):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await func(db, FLEET_ID, since, until)
+        samples.append(time.perf_counter() - start)
+    return result, {"best_s": min(samples), "mean_s": sum(samples) / len(samples)}
+
+async def run(url: str, repeat: int, since: datetime, until: datetime):
+    engine = create_async_engine(async_url(url))
+    Session = async_sessionmaker(engine)
+    results = {}
+    async with Session() as db:
+        looped, results["per_vin_loop"] = await timed(per_vin_loop, db, repeat, since, until)
+        summary, results["vectorized"] = await timed(vectorized, db, repeat, since, until)
+    await engine.dispose()
+    results["speedup"] = results["per_vin_loop"]["best_s"] / results["vectorized"]["best_s"]
+    results["samples"] = summary["samples"]
+    results["vehicles"] = summary["vehicles"]
+    results["matches"] = close(
+        {**summary, "diagnosticCodes": sorted(summary["diagnosticCodes"], key=lambda c: (-c["count"], c["code"]))},
+        {**looped, "diagnosticCodes": sorted(looped["diagnosticCodes"], key=lambda c: (-c["count"], c["code"]))}
+    )
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet analytics: per-VIN query loop vs one columnar query with vectorized stats.")
+    parser.add_argument("--vehicles", type=int, default=10000)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--span-hours", type=float, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    span = timedelta(hours=args.span_hours)
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'analytics.db')}"
+        started = time.perf_counter()
+        seed(url, args.vehicles, args.rows, span)
+        seeded = time.perf_counter() - started
+        results = asyncio.run(run(url, args.repeat, START - timedelta(seconds=1), START + span))
+    results = {"vehicles_seeded": args.vehicles, "rows": args.rows, "seed_s": seeded, **results}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
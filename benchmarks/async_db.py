@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from ..database import Base, async_url
+from ..telemetry.schemas import Telemetry
+
+def seed(url: str, rows: int, vehicles: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine, tables=[Telemetry.__table__])
+    start = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, rows, 10000):
+            conn.execute(insert(Telemetry), [
+                {
+                    "vin": random.randint(1, vehicles),
+                    "latitude": random.uniform(-90, 90),
+                    "longitude": random.uniform(-180, 180),
+                    "speed": random.uniform(0, 140),
+                    "engineStatus": random.choice(["on", "off", "idle"]),
+                    "fuel": random.random(),
+                    "odometerReading": random.randint(0, 300000),
+                    "diagnosticCode": 0,
+                    "timestamp": start + timedelta(seconds=offset + i)
+                }
+                for i in range(min(10000, rows - offset))
+            ])
+    engine.dispose()
+
+SLOW_QUERY = (
+    select(Telemetry.vin, func.max(Telemetry.timestamp), func.avg(Telemetry.fuel), func.max(Telemetry.speed))
+    .group_by(Telemetry.vin)
+)
+
+def build_app(url: str):
+    SyncSession = sessionmaker(bind=create_engine(url, connect_args={"check_same_thread": False}))
+    AsyncSession = async_sessionmaker(create_async_engine(async_url(url)))
+    app = FastAPI()
+
+    @app.get("/sync/slow")
+    async def sync_slow():
+        with SyncSession() as db:
+            return len(db.execute(SLOW_QUERY).all())
+
+    @app.get("/async/slow")
+    async def async_slow():
+        async with AsyncSession() as db:
+            return len((await db.execute(SLOW_QUERY)).all())
+
+    @app.get("/fast/{telemetry_id}")
+    async def fast(telemetry_id: int):
+        async with AsyncSession() as db:
+            return await db.scalar(select(Telemetry.vin).where(Telemetry.telemetryId == telemetry_id))
+
+    return app
+
+async def timed(client: httpx.AsyncClient, path: str, scheduled: float = None):
+    if scheduled is not None:
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+    start = scheduled if scheduled is not None else time.perf_counter()
+    response = await client.get(path)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+async def run(app: FastAPI, mode: str, slow: int, fast: int, rows: int, interval: float):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await timed(client, f"/{mode}/slow")
+        start = time.perf_counter()
+        fast_tasks = [
+            asyncio.create_task(timed(client, f"/fast/{random.randint(1, rows)}", start + i * interval))
+            for i in range(fast)
+        ]
+        slow_tasks = [asyncio.create_task(timed(client, f"/{mode}/slow")) for _ in range(slow)]
+        fast_latencies = await asyncio.gather(*fast_tasks)
+        slow_latencies = await asyncio.gather(*slow_tasks)
+        elapsed = time.perf_counter() - start
+    fast_latencies.sort()
+    return {
+        "mode": mode,
+        "fast_p50_ms": statistics.median(fast_latencies) * 1000,
+        "fast_p95_ms": fast_latencies[int(len(fast_latencies) * 0.95) - 1] * 1000,
+        "fast_max_ms": fast_latencies[-1] * 1000,
+        "slow_mean_ms": statistics.mean(slow_latencies) * 1000 if slow_latencies else 0.0,
+        "wall_s": elapsed
+    }
+
+async def run_all(url: str, args):
+    app = build_app(url)
+    return [await run(app, mode, args.slow, args.fast, args.rows, args.interval) for mode in ("sync", "async")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of cheap requests while slow analytics queries run, sync vs async sessions.")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--vehicles", type=int, default=1000)
+    parser.add_argument("--slow", type=int, default=4)
+    parser.add_argument("--fast", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.005)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        seed(url, args.rows, args.vehicles)
+        results = asyncio.run(run_all(url, args))
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import json
+import time
+from ..credentials import CredentialPool
+from ..database import hash_password
+
+async def heartbeat(interval: float, stop: asyncio.Event):
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+    return max(lags, default=0.0)
+
+async def measure(count: int, hash_all):
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(0.001, stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await hash_all([f"password-{i}" for i in range(count)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return {"elapsed_s": elapsed, "hashes_per_s": count / elapsed, "max_loop_lag_ms": await monitor * 1000}
+
+async def run(count: int, kind: str, sizes):
+    async def inline(passwords):
+        return [hash_password(password) for password in passwords]
+
+    results = {"inline": await measure(count, inline)}
+    for size in sizes:
+        pool = CredentialPool(kind, size)
+
+        async def pooled(passwords):
+            return await asyncio.gather(*[pool.run(hash_password, password) for password in passwords])
+
+        results[f"{kind} pool x{size}"] = await measure(count, pooled)
+        pool.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt throughput and event-loop stall: inline in the loop vs on a credential pool.")
+    parser.add_argument("--hashes", type=int, default=16)
+    parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.hashes, args.pool, args.sizes))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
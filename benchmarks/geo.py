@@ -0,0 +1,85 @@
+import argparse
+import json
+import random
+import time
+from ..config import GEO_CELL_PRECISIONS
+from ..database import redis_client
+from ..fleet.geo import cell_density, cells_key, geo_key, position_args, vehicles_in_box, vehicles_nearby
+
+def populate(fleet_id: int, vehicles: int, center, spread: float):
+    pipe = redis_client.pipeline(transaction=False)
+    for vin in range(1, vehicles + 1):
+        longitude, latitude, cells = position_args(
+            center[0] + random.uniform(-spread, spread),
+            center[1] + random.uniform(-spread, spread)
+        )
+        pipe.geoadd(geo_key(fleet_id), [longitude, latitude, vin])
+        for cell in cells.split():
+            pipe.hincrby(cells_key(len(cell), fleet_id), cell, 1)
+        if vin % 10000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+def cleanup(fleet_id: int):
+    redis_client.delete(geo_key(fleet_id), *[cells_key(precision, fleet_id) for precision in GEO_CELL_PRECISIONS])
+
+def timed(func, repeat: int):
+    samples = []
+    results = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = len(func())
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "results": results,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000,
+    }
+
+def run(args):
+    center = (args.latitude, args.longitude)
+    fleet_id = args.fleet_id
+    cleanup(fleet_id)
+    start = time.perf_counter()
+    populate(fleet_id, args.vehicles, center, args.spread)
+    populated = time.perf_counter() - start
+
+    def box(half: float):
+        return lambda: vehicles_in_box(center[0] - half, center[1] - half, center[0] + half, center[1] + half, fleet_id, args.limit)
+
+    try:
+        queries = {
+            "nearby 1km": timed(lambda: vehicles_nearby(*center, 1, fleet_id, args.limit), args.repeat),
+            "nearby 10km": timed(lambda: vehicles_nearby(*center, 10, fleet_id, args.limit), args.repeat),
+            "box 0.01deg": timed(box(0.01), args.repeat),
+            "box 0.1deg": timed(box(0.1), args.repeat),
+        }
+        for precision in GEO_CELL_PRECISIONS:
+            queries[f"density p{precision}"] = timed(lambda: cell_density(precision, fleet_id, limit=args.limit), args.repeat)
+    finally:
+        cleanup(fleet_id)
+    return {"vehicles": args.vehicles, "populate_s": populated, "queries": queries}
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of radius, bounding-box and density queries against the Redis geo index.")
+    parser.add_argument("--vehicles", type=int, default=100000)
+    parser.add_argument("--latitude", type=float, default=52.52)
+    parser.add_argument("--longitude", type=float, default=13.405)
+    parser.add_argument("--spread", type=float, default=1.0, help="degrees around the center to scatter vehicles over")
+    parser.add_argument("--fleet-id", type=int, default=-1, help="synthetic fleet whose geo keys are populated and removed")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    results = run(args)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+import msgpack
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from ..telemetry.compact import COMPACT_COLUMNS, decode_records
+from ..telemetry.models import TelemetryInList, TelemetryOut
+from ..telemetry.router import telemetry_row
+
+def records(count: int, vehicles: int):
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "vin": random.randint(1, vehicles),
+            "password": "password123",
+            "latitude": random.uniform(-90, 90),
+            "longitude": random.uniform(-180, 180),
+            "speed": random.uniform(0, 140),
+            "engineStatus": random.choice(["on", "off", "idle"]),
+            "fuel": random.random(),
+            "odometerReading": random.randint(0, 300000),
+            "diagnosticCode": 0,
+            "timestamp": (start + timedelta(seconds=i)).isoformat()
+        }
+        for i in range(count)
+    ]
+
+def pydantic_rows(body: bytes):
+    return [(tel.password, telemetry_row(tel)) for tel in TelemetryInList.model_validate_json(body).tel]
+
+def timed(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def result(name: str, seconds: float, count: int, size: int = None):
+    entry = {"path": name, "median_ms": seconds * 1000, "records_per_s": count / seconds}
+    if size is not None:
+        entry["body_bytes"] = size
+    return entry
+
+def run(count: int, vehicles: int, repeat: int):
+    data = records(count, vehicles)
+    model_body = orjson.dumps({"tel": data})
+    rows = [[record[column] for column in COMPACT_COLUMNS] for record in data]
+    columnar_body = orjson.dumps({"columns": COMPACT_COLUMNS, "rows": rows})
+    msgpack_body = msgpack.packb(rows)
+
+    ingest = [
+        result("pydantic TelemetryInList", timed(lambda: pydantic_rows(model_body), repeat), count, len(model_body)),
+        result("columnar json", timed(lambda: decode_records(columnar_body, "application/json"), repeat), count, len(columnar_body)),
+        result("msgpack", timed(lambda: decode_records(msgpack_body, "application/msgpack"), repeat), count, len(msgpack_body)),
+    ]
+
+    outputs = [
+        {**record, "telemetryId": i, "timestamp": datetime.fromisoformat(record["timestamp"])}
+        for i, record in enumerate(data)
+    ]
+    adapter = TypeAdapter(List[TelemetryOut])
+    serialized = adapter.dump_python(adapter.validate_python(outputs), mode="json")
+    response = [
+        result("jsonable_encoder + json.dumps", timed(lambda: json.dumps(jsonable_encoder(outputs)).encode(), repeat), count),
+        result("response model + json.dumps", timed(lambda: json.dumps(adapter.dump_python(adapter.validate_python(outputs), mode="json")).encode(), repeat), count),
+        result("response model + orjson", timed(lambda: orjson.dumps(adapter.dump_python(adapter.validate_python(outputs), mode="json")), repeat), count),
+        result("orjson render only", timed(lambda: orjson.dumps(serialized), repeat), count),
+    ]
+    return {"records": count, "ingest": ingest, "response": response}
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode cost of pydantic vs compact telemetry batches, and JSON vs ORJSON response rendering.")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--vehicles", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = run(args.records, args.vehicles, args.repeat)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+import httpx
+
+def percentile(values, p: float):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.records = defaultdict(int)
+
+    def observe(self, label: str, seconds: float, status: int, records: int = 0):
+        self.latencies[label].append(seconds)
+        self.statuses[label][status] += 1
+        if 200 <= status < 300:
+            self.records[label] += records
+
+    def summary(self, elapsed: float):
+        endpoints = {}
+        for label, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            ok = sum(count for status, count in self.statuses[label].items() if 200 <= status < 300)
+            endpoints[label] = {
+                "requests": len(latencies),
+                "errors": len(latencies) - ok,
+                "statuses": {str(status): count for status, count in sorted(self.statuses[label].items())},
+                "p50_ms": percentile(latencies, 0.50) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "max_ms": latencies[-1] * 1000,
+                "throughput_rps": len(latencies) / elapsed,
+            }
+            if self.records[label]:
+                endpoints[label]["records_per_s"] = self.records[label] / elapsed
+        return endpoints
+
+def configure_environment(args):
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("RATE_LIMIT_REQUESTS", str(10 ** 9))
+    os.environ.setdefault("CHECK_QUERY_PLANS", "0")
+
+def seed_fleet(args):
+    from ..main import AlertType, Fleet, Human, Manufacturer, Model, Telemetry, Vehicle
+    from ..alert.summary import rebuild_alert_counts
+    from ..database import SessionLocal, hash_password, hash_token
+    from ..fleet.aggregates import rebuild_fleet_aggregates
+    from ..telemetry.latest import rebuild_latest_state
+    from ..vehicle.models import authModes
+
+    auth_mode = authModes(args.auth)
+    secret = hash_token(args.password) if auth_mode == authModes.token else hash_password(args.password)
+    start = datetime.utcnow() - timedelta(minutes=args.history)
+    vins = list(range(1, args.vehicles + 1))
+    with SessionLocal() as db:
+        db.add(Manufacturer(manufacturerName="Bench Motors"))
+        db.add(Model(modelName="Bench", manufactererId=1))
+        db.add_all([Fleet(fleetName=f"Fleet {i}", manufactererId=1) for i in range(1, args.fleets + 1)])
+        db.add(Human(humanName="Bench Operator"))
+        db.add(AlertType(alertTitle="Bench", alertDescription="Benchmark alert type."))
+        db.flush()
+        db.add_all([
+            Vehicle(vin=vin, modelId=1, fleetId=vin % args.fleets + 1, operatorId=1, ownerId=1,
+                    regStatus="active", password=secret, authMode=auth_mode)
+            for vin in vins
+        ])
+        db.commit()
+        rows = [
+            dict(vin=vin, latitude=random.uniform(-90, 90), longitude=random.uniform(-180, 180),
+                 speed=random.uniform(0, 140), engineStatus=random.choice(["on", "off", "idle"]),
+                 fuel=random.random(), odometerReading=vin * 1000 + minute, diagnosticCode=0,
+                 timestamp=start + timedelta(minutes=minute))
+            for vin in vins
+            for minute in range(args.history)
+        ]
+        for offset in range(0, len(rows), 10000):
+            db.execute(Telemetry.__table__.insert(), rows[offset:offset + 10000])
+        db.commit()
+        rebuild_latest_state(db)
+        rebuild_fleet_aggregates(db)
+        rebuild_alert_counts(db)
+    return vins
+
+class TrafficSource:
+    def __init__(self, args, vins):
+        self.password = args.password
+        self.replay = None
+        if args.replay:
+            with open(args.replay) as f:
+                self.replay = [json.loads(line) for line in f if line.strip()]
+        self.vins = vins
+        self.position = 0
+        self.odometers = {vin: vin * 1000 + args.history for vin in vins}
+
+    def next(self):
+        if self.replay:
+            record = self.replay[self.position % len(self.replay)]
+            self.position += 1
+            return record
+        vin = random.choice(self.vins)
+        self.odometers[vin] += random.randint(0, 3)
+        return {
+            "vin": vin,
+            "password": self.password,
+            "latitude": random.uniform(-90, 90),
+            "longitude": random.uniform(-180, 180),
+            "speed": random.uniform(0, 140),
+            "engineStatus": random.choice(["on", "off", "idle"]),
+            "fuel": random.random(),
+            "odometerReading": self.odometers[vin],
+            "diagnosticCode": 0,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+async def send(client: httpx.AsyncClient, recorder: Recorder, label: str, method: str, path: str, scheduled: float, records: int = 0, **kwargs):
+    await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+    response = await client.request(method, path, **kwargs)
+    recorder.observe(label, time.perf_counter() - scheduled, response.status_code, records)
+
+def analytics_paths(fleets: int):
+    fleet = random.randint(1, fleets)
+    return [
+        ("GET /allActiveAndInactive", "/allActiveAndInactive"),
+        ("GET /avgFuelLevels", f"/avgFuelLevels/{fleet}"),
+        ("GET /total_distance_traveled", f"/total_distance_traveled/{fleet}"),
+        ("GET /total_distance_traveled?breakdown", f"/total_distance_traveled/{fleet}?breakdown=true&window=7d"),
+        ("GET /alertSummary", "/alertSummary"),
+    ]
+
+async def drive(app, args, vins):
+    recorder = Recorder()
+    source = TrafficSource(args, vins)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            start = time.perf_counter()
+            tasks = []
+            for i in range(int(args.rate * args.duration)):
+                scheduled = start + i / args.rate
+                if random.random() < args.batch_fraction:
+                    tel = [source.next() for _ in range(args.batch_size)]
+                    tasks.append(send(client, recorder, "POST /telemetry/batch", "POST", "/telemetry/batch", scheduled, len(tel), json={"tel": tel}))
+                else:
+                    tasks.append(send(client, recorder, "POST /telemetry/", "POST", "/telemetry/", scheduled, 1, json=source.next()))
+            for i in range(int(args.analytics_rate * args.duration)):
+                scheduled = start + i / args.analytics_rate
+                for label, path in analytics_paths(args.fleets):
+                    tasks.append(send(client, recorder, label, "GET", path, scheduled))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+    return recorder.summary(elapsed), elapsed
+
+def compare(results, baseline_path: str, tolerance: float):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["endpoints"]
+    regressions = []
+    for label, current in results["endpoints"].items():
+        previous = baseline.get(label)
+        if not previous or not previous["p95_ms"]:
+            continue
+        change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"]
+        print(f"{label}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms ({change:+.0%})")
+        if change > tolerance:
+            regressions.append(label)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process load test of ingest and analytics endpoints against a seeded synthetic fleet.")
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--fleets", type=int, default=5)
+    parser.add_argument("--history", type=int, default=60, help="minutes of seeded telemetry per vehicle")
+    parser.add_argument("--auth", choices=["password", "token"], default="token")
+    parser.add_argument("--password", default="bench-secret")
+    parser.add_argument("--rate", type=float, default=200, help="ingest requests per second")
+    parser.add_argument("--batch-fraction", type=float, default=0.1)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--analytics-rate", type=float, default=5, help="polls per second of each analytics endpoint")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--replay", help="JSONL file of telemetry records to replay instead of generated traffic")
+    parser.add_argument("--database-url")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline", help="previous results JSON to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        args.database_url = args.database_url or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        configure_environment(args)
+        main_module = importlib.import_module(f"{__package__.rsplit('.', 1)[0]}.main")
+        vins = seed_fleet(args)
+        endpoints, elapsed = asyncio.run(drive(main_module.app, args, vins))
+
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "database_url")},
+        "finished_at": datetime.utcnow().isoformat(),
+        "elapsed_s": elapsed,
+        "endpoints": endpoints,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
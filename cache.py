@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import inspect
+import logging
+import time
+import uuid
+from collections import Counter, defaultdict
+from enum import Enum
+from pydantic import TypeAdapter
+from .database import redis_client
+from .telemetry.rollup import RELEASE_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 10
+LOCK_POLL = 0.05
+
+stats = defaultdict(Counter)
+local_locks = defaultdict(asyncio.Lock)
+local_waiters = Counter()
+refreshing = {}
+
+def version_key(namespace: str, scope=None):
+    if scope is None:
+        return f"cache:{namespace}:version"
+    return f"cache:{namespace}:{scope}:version"
+
+def bump(namespace: str, scope=None):
+    redis_client.incr(version_key(namespace, scope))
+
+def argument_key(arguments: dict):
+    parts = []
+    for name, value in sorted(arguments.items()):
+        if isinstance(value, Enum):
+            value = value.value
+        parts.append(f"{name}={value}")
+    return ",".join(parts)
+
+def encode(adapter: TypeAdapter, value):
+    return f"{time.time()}|".encode() + adapter.dump_json(value)
+
+def decode(adapter: TypeAdapter, raw: bytes):
+    stored_at, payload = raw.split(b"|", 1)
+    return float(stored_at), adapter.validate_json(payload)
+
+def acquire(key: str):
+    token = uuid.uuid4().hex
+    if redis_client.set(f"{key}:lock", token, nx=True, ex=LOCK_TIMEOUT):
+        return token
+    return None
+
+def release(key: str, token: str):
+    RELEASE_SCRIPT(keys=[f"{key}:lock"], args=[token])
+
+async def compute_and_store(key: str, adapter: TypeAdapter, ttl: int, func, args, kwargs):
+    value = await func(*args, **kwargs)
+    redis_client.set(key, encode(adapter, value), ex=ttl)
+    return value
+
+async def refresh(namespace: str, key: str, token: str, adapter: TypeAdapter, ttl: int, func, args, kwargs):
+    try:
+        await compute_and_store(key, adapter, ttl, func, args, kwargs)
+        stats[namespace]["refreshes"] += 1
+    finally:
+        release(key, token)
+        refreshing.pop(key, None)
+
+def refresh_done(namespace: str, task: asyncio.Task):
+    if task.cancelled() or task.exception() is None:
+        return
+    stats[namespace]["refresh_errors"] += 1
+    logger.error("Cache refresh for %s failed", namespace, exc_info=task.exception())
+
+async def load(namespace: str, key: str, adapter: TypeAdapter, ttl: int, func, args, kwargs):
+    raw = redis_client.get(key)
+    if raw is not None:
+        return decode(adapter, raw)[1]
+
+    token = acquire(key)
+    if token:
+        try:
+            return await compute_and_store(key, adapter, ttl, func, args, kwargs)
+        finally:
+            release(key, token)
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL)
+        raw = redis_client.get(key)
+        if raw is not None:
+            return decode(adapter, raw)[1]
+    stats[namespace]["lock_timeouts"] += 1
+    return await compute_and_store(key, adapter, ttl, func, args, kwargs)
+
+def cached(namespace: str, ttl: int, soft_ttl: int = None, scope: str = None):
+    def decorator(func):
+        signature = inspect.signature(func)
+        annotation = signature.return_annotation
+        adapter = TypeAdapter(object if annotation is inspect.Signature.empty else annotation)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            version = redis_client.get(version_key(namespace, bound.arguments.get(scope) if scope else None))
+            key = f"cache:{namespace}:v{int(version or 0)}:{argument_key(bound.arguments)}"
+
+            raw = redis_client.get(key)
+            if raw is not None:
+                stored_at, value = decode(adapter, raw)
+                stats[namespace]["hits"] += 1
+                if soft_ttl is not None and time.time() - stored_at > soft_ttl and key not in refreshing:
+                    token = acquire(key)
+                    if token:
+                        stats[namespace]["stale"] += 1
+                        task = asyncio.create_task(refresh(namespace, key, token, adapter, ttl, func, args, kwargs))
+                        task.add_done_callback(functools.partial(refresh_done, namespace))
+                        refreshing[key] = task
+                return value
+
+            stats[namespace]["misses"] += 1
+            local_waiters[key] += 1
+            try:
+                async with local_locks[key]:
+                    return await load(namespace, key, adapter, ttl, func, args, kwargs)
+            finally:
+                local_waiters[key] -= 1
+                if not local_waiters[key]:
+                    del local_waiters[key]
+                    local_locks.pop(key, None)
+        return wrapper
+    return decorator
+
+def cache_stats():
+    return {namespace: dict(counter) for namespace, counter in stats.items()}
@@ -1 +1,68 @@
-DATABASE_URL = "sqlite:///./test.db"
\ No newline at end of file
+import os
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "")
+TELEMETRY_PARTITIONS_AHEAD = int(os.getenv("TELEMETRY_PARTITIONS_AHEAD", "7"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
+CREDENTIAL_CACHE_SIZE = int(os.getenv("CREDENTIAL_CACHE_SIZE", "10000"))
+CREDENTIAL_CACHE_TTL = int(os.getenv("CREDENTIAL_CACHE_TTL", "300"))
+CREDENTIAL_POOL = os.getenv("CREDENTIAL_POOL", "thread")
+CREDENTIAL_POOL_SIZE = int(os.getenv("CREDENTIAL_POOL_SIZE", str(os.cpu_count() or 4)))
+CHECK_QUERY_PLANS = os.getenv("CHECK_QUERY_PLANS", "1") == "1"
+
+RATE_LIMIT_POLICY = os.getenv("RATE_LIMIT_POLICY", "sliding_window")
+RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "4"))
+RATE_LIMIT_WINDOW = float(os.getenv("RATE_LIMIT_WINDOW", "60"))
+RATE_LIMIT_FLEETS = os.getenv("RATE_LIMIT_FLEETS", "{}")
+
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "100000"))
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", "500"))
+ALERT_BATCH_WAIT = float(os.getenv("ALERT_BATCH_WAIT", "0.05"))
+
+TRIP_QUEUE_SIZE = int(os.getenv("TRIP_QUEUE_SIZE", "100000"))
+TRIP_BATCH_SIZE = int(os.getenv("TRIP_BATCH_SIZE", "500"))
+TRIP_BATCH_WAIT = float(os.getenv("TRIP_BATCH_WAIT", "0.05"))
+TRIP_MAX_GAP = float(os.getenv("TRIP_MAX_GAP", "600"))
+TRIP_BACKFILL_VINS = int(os.getenv("TRIP_BACKFILL_VINS", "1000"))
+
+INGEST_MODE = os.getenv("INGEST_MODE", "sync")
+INGEST_BUFFER_SIZE = int(os.getenv("INGEST_BUFFER_SIZE", "50000"))
+INGEST_FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "1000"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "0.05"))
+
+ANALYTICS_PERCENTILES = [float(p) for p in os.getenv("ANALYTICS_PERCENTILES", "50,90,95,99").split(",")]
+ANALYTICS_FUEL_BINS = int(os.getenv("ANALYTICS_FUEL_BINS", "10"))
+ANALYTICS_TOP_CODES = int(os.getenv("ANALYTICS_TOP_CODES", "20"))
+
+VEHICLE_STALE_SECONDS = float(os.getenv("VEHICLE_STALE_SECONDS", "300"))
+GEO_CELL_PRECISIONS = sorted(int(precision) for precision in os.getenv("GEO_CELL_PRECISIONS", "4,5,6").split(","))
+
+FANOUT_QUEUE_SIZE = int(os.getenv("FANOUT_QUEUE_SIZE", "256"))
+FANOUT_DROP_POLICY = os.getenv("FANOUT_DROP_POLICY", "drop_oldest")
+FANOUT_KEEPALIVE = float(os.getenv("FANOUT_KEEPALIVE", "15"))
+
+ROLLUP_INTERVAL = float(os.getenv("ROLLUP_INTERVAL", "60"))
+ROLLUP_LAG = float(os.getenv("ROLLUP_LAG", "120"))
+ROLLUP_MIN_POINTS = int(os.getenv("ROLLUP_MIN_POINTS", "24"))
+ROLLUP_DELETE_BATCH = int(os.getenv("ROLLUP_DELETE_BATCH", "5000"))
+ROLLUP_LOCK_TTL = int(os.getenv("ROLLUP_LOCK_TTL", "600"))
+ROLLUP_REROLL_BATCH = int(os.getenv("ROLLUP_REROLL_BATCH", "1000"))
+TELEMETRY_RETENTION_DAYS = float(os.getenv("TELEMETRY_RETENTION_DAYS", "0"))
+ROLLUP_MINUTE_RETENTION_DAYS = float(os.getenv("ROLLUP_MINUTE_RETENTION_DAYS", "30"))
+ROLLUP_HOUR_RETENTION_DAYS = float(os.getenv("ROLLUP_HOUR_RETENTION_DAYS", "365"))
+ROLLUP_DAY_RETENTION_DAYS = float(os.getenv("ROLLUP_DAY_RETENTION_DAYS", "0"))
+
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+
+SENTRY_DSN = os.getenv("SENTRY_DSN", "")
+SENTRY_ENVIRONMENT = os.getenv("SENTRY_ENVIRONMENT", "development")
+SENTRY_TRACES_SAMPLE_RATE = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0"))
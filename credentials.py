@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .config import SECRET_KEY, CREDENTIAL_CACHE_SIZE, CREDENTIAL_CACHE_TTL, CREDENTIAL_POOL, CREDENTIAL_POOL_SIZE
+from .database import hash_password, hash_token, verify_password, verify_token
+from .profiling import phase
+from .vehicle.models import authModes
+
+class CredentialCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, secret: str, stored):
+        if isinstance(stored, str):
+            stored = stored.encode('utf-8')
+        return hmac.new(SECRET_KEY.encode('utf-8'), secret.encode('utf-8') + b"\0" + stored, hashlib.sha256).digest()
+
+    def get(self, vin: int, secret: str, stored) -> bool:
+        digest = self._digest(secret, stored)
+        with self._lock:
+            entry = self._entries.get(vin)
+            if entry is None:
+                return False
+            cached, expires = entry
+            if expires < time.monotonic():
+                del self._entries[vin]
+                return False
+            self._entries.move_to_end(vin)
+        return hmac.compare_digest(cached, digest)
+
+    def put(self, vin: int, secret: str, stored):
+        digest = self._digest(secret, stored)
+        with self._lock:
+            self._entries[vin] = (digest, time.monotonic() + self.ttl)
+            self._entries.move_to_end(vin)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, vin: int):
+        with self._lock:
+            self._entries.pop(vin, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class CredentialPool:
+    def __init__(self, kind: str, size: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown credential pool {kind!r}, expected thread or process")
+        self.kind = kind
+        self.size = size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(self.size)
+                else:
+                    self._executor = ThreadPoolExecutor(self.size, thread_name_prefix="bcrypt")
+            return self._executor
+
+    async def run(self, func, *args):
+        with phase("bcrypt"):
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+credential_cache = CredentialCache(CREDENTIAL_CACHE_SIZE, CREDENTIAL_CACHE_TTL)
+credential_pool = CredentialPool(CREDENTIAL_POOL, CREDENTIAL_POOL_SIZE)
+
+async def hash_credential(secret: str, auth_mode: authModes):
+    if auth_mode == authModes.token:
+        return hash_token(secret)
+    return await credential_pool.run(hash_password, secret)
+
+async def hash_credentials(credentials):
+    return await asyncio.gather(*[hash_credential(secret, auth_mode) for secret, auth_mode in credentials])
+
+async def check_credential(vin: int, secret: str, stored, auth_mode) -> bool:
+    if stored is None:
+        return False
+    if auth_mode == authModes.token:
+        return verify_token(secret, stored)
+    if credential_cache.get(vin, secret, stored):
+        return True
+    if await credential_pool.run(verify_password, secret, stored):
+        credential_cache.put(vin, secret, stored)
+        return True
+    return False
@@ -1,17 +1,144 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL, STORAGE_BACKEND, SECRET_KEY, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+import hashlib
+import hmac
+import time
 import redis
+import redis.asyncio as aioredis
+from .storage import backend_for
+from .profiling import instrument_engine, instrument_redis
 from bcrypt import checkpw, gensalt, hashpw
-redis_client = redis.Redis(host='localhost', port=6379, db=0)
+redis_client = instrument_redis(redis.Redis(host='localhost', port=6379, db=0))
+async_redis_client = aioredis.Redis(host='localhost', port=6379, db=0)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+def engine_options(url: str):
+    url = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE
+    )
+    return options
+
+class PoolMetrics:
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.pools = {}
+
+    def attach(self, name: str, engine):
+        self.pools[name] = engine.pool
+        event.listen(engine, "connect", self.on_connect)
+        event.listen(engine, "checkout", self.on_checkout)
+        event.listen(engine, "checkin", self.on_checkin)
+        event.listen(engine, "invalidate", self.on_invalidate)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def observe_wait(self, seconds: float):
+        self.waits += 1
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def snapshot(self):
+        pools = {}
+        for name, pool in self.pools.items():
+            pools[name] = {
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            }
+        return {
+            "pools": pools,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "wait_seconds_total": self.wait_seconds,
+            "wait_seconds_max": self.max_wait_seconds,
+            "wait_seconds_avg": self.wait_seconds / self.waits if self.waits else 0.0,
+        }
+
+pool_metrics = PoolMetrics()
+storage_backend = backend_for(DATABASE_URL, STORAGE_BACKEND)
+
+def make_engine(url: str = DATABASE_URL):
+    engine = create_engine(url, **engine_options(url))
+    storage_backend.configure(engine)
+    pool_metrics.attach("sync", engine)
+    instrument_engine(engine)
+    return engine
+
+def make_async_engine(url: str = DATABASE_URL):
+    engine = create_async_engine(async_url(url), **engine_options(url))
+    storage_backend.configure(engine.sync_engine)
+    pool_metrics.attach("async", engine.sync_engine)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-salt = gensalt()
 
+async_engine = make_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+Base = declarative_base()
 def verify_password(password: str, hashed):
+    if isinstance(hashed, str):
+        hashed = hashed.encode('utf-8')
     return checkpw(password.encode('utf-8'), hashed)
 
 def hash_password(password: str):
-    return hashpw(password.encode('utf-8'), salt)
\ No newline at end of file
+    return hashpw(password.encode('utf-8'), gensalt()).decode('utf-8')
+
+def hash_token(token: str):
+    return hmac.new(SECRET_KEY.encode('utf-8'), token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def verify_token(token: str, digest):
+    if isinstance(digest, bytes):
+        digest = digest.decode('utf-8')
+    return hmac.compare_digest(hash_token(token), digest)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        await db.connection()
+        pool_metrics.observe_wait(time.perf_counter() - start)
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
\ No newline at end of file
@@ -0,0 +1,80 @@
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal
+from .telemetry.models import utc_naive
+
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+STREAM_CHUNK = 1000
+
+class exportFormats(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+    csv = "csv"
+
+MEDIA_TYPES = {
+    exportFormats.ndjson: "application/x-ndjson",
+    exportFormats.csv: "text/csv",
+}
+
+def keyset_query(table, key: str, after: Optional[int], vin: Optional[int], since: Optional[datetime], until: Optional[datetime]):
+    columns = table.c
+    stmt = select(table)
+    if after is not None:
+        stmt = stmt.where(columns[key] > after)
+    if vin is not None:
+        stmt = stmt.where(columns.vin == vin)
+    if since is not None:
+        stmt = stmt.where(columns.timestamp >= utc_naive(since))
+    if until is not None:
+        stmt = stmt.where(columns.timestamp < utc_naive(until))
+    return stmt.order_by(columns[key])
+
+def row_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def ndjson_lines(columns, rows):
+    return b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([row_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+async def stream_rows(stmt, fmt: exportFormats):
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=STREAM_CHUNK))
+        columns = list(result.keys())
+        if fmt == exportFormats.csv:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(columns)
+            yield buffer.getvalue()
+        async for rows in result.partitions():
+            yield ndjson_lines(columns, rows) if fmt == exportFormats.ndjson else csv_lines(rows)
+
+async def export(db: AsyncSession, table, key: str, fmt: exportFormats, after, limit, vin, since, until, filename: str):
+    stmt = keyset_query(table, key, after, vin, since, until)
+    if fmt != exportFormats.json:
+        return StreamingResponse(
+            stream_rows(stmt, fmt),
+            media_type=MEDIA_TYPES[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt.value}"'}
+        )
+
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    rows = (await db.execute(stmt.limit(limit))).mappings().all()
+    next_cursor = rows[-1][key] if len(rows) == limit else None
+    return ORJSONResponse({"items": [dict(row) for row in rows], "next_cursor": next_cursor})
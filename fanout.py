@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+import orjson
+from redis.exceptions import RedisError
+from .config import FANOUT_QUEUE_SIZE, FANOUT_DROP_POLICY
+from .database import async_redis_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+CLOSED = object()
+
+def vin_channel(vin: int):
+    return f"stream:vin:{vin}"
+
+def fleet_channel(fleet_id: int):
+    return f"stream:fleet:{fleet_id}"
+
+def publish(event: str, records, fleets: dict):
+    if not records:
+        return
+    by_channel = defaultdict(list)
+    for record in records:
+        by_channel[vin_channel(record["vin"])].append(record)
+        fleet_id = fleets.get(record["vin"])
+        if fleet_id is not None:
+            by_channel[fleet_channel(fleet_id)].append(record)
+    pipe = redis_client.pipeline(transaction=False)
+    for channel, items in by_channel.items():
+        pipe.publish(channel, orjson.dumps({"type": event, "records": items}))
+    try:
+        pipe.execute()
+    except RedisError:
+        fanout_hub.stats["publish_errors"] += 1
+        logger.warning("Failed to publish %d %s records", len(records), event, exc_info=True)
+
+class Subscriber:
+    def __init__(self, channels, queue_size: int, policy: str):
+        self.channels = channels
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.unreported = 0
+        self.closed = False
+
+    def push(self, message: bytes):
+        if self.closed:
+            return False
+        if self.queue.full():
+            self.queue.get_nowait()
+            if self.policy == DISCONNECT:
+                self.closed = True
+                self.queue.put_nowait(CLOSED)
+                return False
+            self.dropped += 1
+            self.unreported += 1
+        self.queue.put_nowait(message)
+        return True
+
+    async def next(self, timeout: float = None):
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return message
+
+    def take_dropped(self):
+        dropped, self.unreported = self.unreported, 0
+        return dropped
+
+class FanoutHub:
+    def __init__(self, queue_size: int, policy: str):
+        if policy not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f"Unknown fan-out drop policy {policy!r}, expected {DROP_OLDEST} or {DISCONNECT}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.subscribers = defaultdict(set)
+        self.pubsub = None
+        self.task = None
+        self.listening = asyncio.Event()
+        self.stopping = False
+        self.stats = Counter()
+
+    def start(self):
+        self.pubsub = async_redis_client.pubsub(ignore_subscribe_messages=True)
+        self.listening = asyncio.Event()
+        self.stopping = False
+        self.task = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.stopping = True
+        self.listening.set()
+        await self.task
+        await self.pubsub.aclose()
+        self.pubsub = None
+        self.task = None
+
+    async def listen(self):
+        while True:
+            await self.listening.wait()
+            if self.stopping:
+                return
+            try:
+                message = await self.pubsub.get_message(timeout=1.0)
+            except RedisError:
+                self.stats["listen_errors"] += 1
+                logger.warning("Fan-out listener lost its Redis connection", exc_info=True)
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            for subscriber in list(self.subscribers.get(message["channel"].decode(), ())):
+                if subscriber.push(message["data"]):
+                    self.stats["delivered"] += 1
+
+    @asynccontextmanager
+    async def subscription(self, vins, fleet_ids):
+        if self.task is None or self.stopping:
+            raise RuntimeError("Fan-out hub is not running")
+        channels = {vin_channel(vin) for vin in vins} | {fleet_channel(fleet_id) for fleet_id in fleet_ids}
+        subscriber = Subscriber(channels, self.queue_size, self.policy)
+        new = [channel for channel in channels if not self.subscribers[channel]]
+        for channel in channels:
+            self.subscribers[channel].add(subscriber)
+        try:
+            if new:
+                await self.pubsub.subscribe(*new)
+                self.listening.set()
+            yield subscriber
+        finally:
+            self.stats["dropped"] += subscriber.dropped
+            self.stats["disconnected"] += subscriber.closed
+            unused = []
+            for channel in channels:
+                self.subscribers[channel].discard(subscriber)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+                    unused.append(channel)
+            if not self.subscribers:
+                self.listening.clear()
+            if unused and self.pubsub is not None:
+                try:
+                    # Shielded so a handler cancelled mid-cleanup still drops the Redis subscription.
+                    await asyncio.shield(self.pubsub.unsubscribe(*unused))
+                except RedisError:
+                    logger.warning("Failed to unsubscribe from %d channels", len(unused), exc_info=True)
+
+    def snapshot(self):
+        clients = {subscriber for subscribers in self.subscribers.values() for subscriber in subscribers}
+        return {
+            **self.stats,
+            "subscribers": len(clients),
+            "channels": len(self.subscribers),
+            "queued": sum(subscriber.queue.qsize() for subscriber in clients),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+        }
+
+fanout_hub = FanoutHub(FANOUT_QUEUE_SIZE, FANOUT_DROP_POLICY)
@@ -0,0 +1,317 @@
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from ..database import redis_client
+from ..telemetry.models import engineStatuses, utc_naive
+from ..telemetry.rollup import RAW, RELEASE_SCRIPT, odometer_before
+from ..telemetry.schemas import Telemetry, VehicleLatestState
+from ..vehicle.schemas import Vehicle
+from .geo import CELLS_KEY, cells_key, geo_key, position_args
+
+BUCKET_SECONDS = 3600
+BUCKET_TTL = 8 * 24 * 3600
+BUILT_KEY = "fleet_stats:built:v3"
+REBUILD_KEY = "fleet_stats:rebuilding"
+PENDING_KEY = "fleet_stats:pending"
+REBUILD_TTL = 600
+REFRESH_BATCH = 1000
+STATUS_FLEETS_KEY = "vehicle_status:fleets"
+
+CELLS_LUA = """
+local function adjust_cells(fleet, cells, delta)
+    for cell in string.gmatch(cells, '%S+') do
+        for _, key in ipairs({'vehicle_cells:' .. #cell, 'fleet:' .. fleet .. ':cells:' .. #cell}) do
+            if redis.call('HINCRBY', key, cell, delta) <= 0 then
+                redis.call('HDEL', key, cell)
+            end
+        end
+    end
+end
+"""
+
+RECORD_SCRIPT = redis_client.register_script(CELLS_LUA + """
+local vkey = KEYS[1]
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('SADD', KEYS[3], ARGV[9])
+    return 0
+end
+local ts = tonumber(ARGV[1])
+local fuel = tonumber(ARGV[2])
+local active = tonumber(ARGV[3])
+local odo = tonumber(ARGV[4])
+local fleet = ARGV[5]
+local bucket = ARGV[6]
+local ttl = tonumber(ARGV[7])
+local status = ARGV[8]
+local vin = ARGV[9]
+local lon = ARGV[10]
+local lat = ARGV[11]
+local cells = ARGV[12]
+
+local prev = redis.call('HMGET', vkey, 'ts', 'fuel', 'active', 'odo', 'fleet', 'status', 'cells')
+if prev[1] and tonumber(prev[1]) > ts then
+    return 0
+end
+
+if prev[5] and prev[5] ~= fleet then
+    redis.call('ZREM', 'fleet:' .. prev[5] .. ':geo', vin)
+end
+if cells ~= '' then
+    redis.call('GEOADD', 'vehicle_geo', lon, lat, vin)
+    redis.call('GEOADD', 'fleet:' .. fleet .. ':geo', lon, lat, vin)
+else
+    redis.call('ZREM', 'vehicle_geo', vin)
+    redis.call('ZREM', 'fleet:' .. fleet .. ':geo', vin)
+end
+if prev[7] ~= cells or prev[5] ~= fleet then
+    if prev[7] then
+        adjust_cells(prev[5], prev[7], -1)
+    end
+    adjust_cells(fleet, cells, 1)
+end
+
+if prev[6] then
+    redis.call('ZREM', 'fleet:' .. prev[5] .. ':status:' .. prev[6], vin)
+    redis.call('ZREM', 'vehicle_status:' .. prev[6], vin)
+end
+redis.call('ZADD', 'fleet:' .. fleet .. ':status:' .. status, ts, vin)
+redis.call('ZADD', 'vehicle_status:' .. status, ts, vin)
+redis.call('SADD', 'vehicle_status:fleets', fleet)
+
+if prev[1] then
+    local pkey = 'fleet:' .. prev[5] .. ':stats'
+    redis.call('HINCRBYFLOAT', pkey, 'fuel_sum', -tonumber(prev[2]))
+    redis.call('HINCRBY', pkey, 'vehicles', -1)
+    redis.call('HINCRBY', pkey, 'active', -tonumber(prev[3]))
+    local delta = odo - tonumber(prev[4])
+    if delta ~= 0 then
+        local dkey = 'fleet:' .. fleet .. ':dist:' .. bucket
+        redis.call('INCRBYFLOAT', dkey, delta)
+        redis.call('EXPIRE', dkey, ttl)
+    end
+end
+
+local fkey = 'fleet:' .. fleet .. ':stats'
+redis.call('HINCRBYFLOAT', fkey, 'fuel_sum', fuel)
+redis.call('HINCRBY', fkey, 'vehicles', 1)
+redis.call('HINCRBY', fkey, 'active', active)
+local last = tonumber(redis.call('HGET', fkey, 'last_ts') or '0')
+if ts > last then
+    redis.call('HSET', fkey, 'last_ts', ts)
+end
+redis.call('HSET', vkey, 'ts', ts, 'fuel', fuel, 'active', active, 'odo', odo, 'fleet', fleet, 'status', status, 'cells', cells)
+return 1
+""")
+
+REMOVE_SCRIPT = redis_client.register_script(CELLS_LUA + """
+local vkey = KEYS[1]
+local vin = ARGV[1]
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('SADD', KEYS[3], vin)
+    return 0
+end
+local prev = redis.call('HMGET', vkey, 'fuel', 'active', 'fleet', 'status', 'cells')
+if not prev[3] then
+    return 0
+end
+redis.call('ZREM', 'vehicle_geo', vin)
+redis.call('ZREM', 'fleet:' .. prev[3] .. ':geo', vin)
+if prev[5] then
+    adjust_cells(prev[3], prev[5], -1)
+end
+if prev[4] then
+    redis.call('ZREM', 'fleet:' .. prev[3] .. ':status:' .. prev[4], vin)
+    redis.call('ZREM', 'vehicle_status:' .. prev[4], vin)
+end
+local pkey = 'fleet:' .. prev[3] .. ':stats'
+redis.call('HINCRBYFLOAT', pkey, 'fuel_sum', -tonumber(prev[1]))
+redis.call('HINCRBY', pkey, 'vehicles', -1)
+redis.call('HINCRBY', pkey, 'active', -tonumber(prev[2]))
+redis.call('DEL', vkey)
+return 1
+""")
+
+def vehicle_key(vin: int):
+    return f"vehicle:{vin}:agg"
+
+def stats_key(fleet_id: int):
+    return f"fleet:{fleet_id}:stats"
+
+def distance_key(fleet_id: int, bucket: int):
+    return f"fleet:{fleet_id}:dist:{bucket}"
+
+def status_key(status: str, fleet_id: int = None):
+    if fleet_id is None:
+        return f"vehicle_status:{status}"
+    return f"fleet:{fleet_id}:status:{status}"
+
+def epoch(ts: datetime):
+    return utc_naive(ts).replace(tzinfo=timezone.utc).timestamp()
+
+def from_epoch(seconds: float):
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+def record_args(row: dict, fleet_id: int):
+    ts = epoch(row["timestamp"])
+    status = engineStatuses(row["engineStatus"])
+    active = 1 if status == engineStatuses.on else 0
+    return [
+        ts, row["fuel"], active, row["odometerReading"], fleet_id,
+        int(ts // BUCKET_SECONDS), BUCKET_TTL, status.value, row["vin"],
+        *position_args(row["latitude"], row["longitude"])
+    ]
+
+def record_telemetry(rows, fleets: dict):
+    pipe = redis_client.pipeline(transaction=False)
+    for row in sorted(rows, key=lambda row: row["timestamp"]):
+        RECORD_SCRIPT(keys=[vehicle_key(row["vin"]), REBUILD_KEY, PENDING_KEY], args=record_args(row, fleets[row["vin"]]), client=pipe)
+    pipe.execute()
+
+def remove_vehicle(vin: int):
+    REMOVE_SCRIPT(keys=[vehicle_key(vin), REBUILD_KEY, PENDING_KEY], args=[vin])
+
+def state_row(state: VehicleLatestState):
+    return {
+        "vin": state.vin, "timestamp": state.timestamp, "engineStatus": state.engineStatus, "fuel": state.fuel,
+        "odometerReading": state.odometerReading, "latitude": state.latitude, "longitude": state.longitude
+    }
+
+def refresh_vehicles(db: Session, vins):
+    states = (
+        db.query(VehicleLatestState, Vehicle.fleetId)
+        .join(Vehicle, Vehicle.vin == VehicleLatestState.vin)
+        .filter(VehicleLatestState.vin.in_(vins))
+        .all()
+    )
+    for vin in set(vins) - {state.vin for state, _ in states}:
+        remove_vehicle(vin)
+    record_telemetry([state_row(state) for state, _ in states], {state.vin: fleet_id for state, fleet_id in states})
+
+def fleet_stats(fleet_id: int):
+    stats = redis_client.hgetall(stats_key(fleet_id))
+    return {
+        "fuel_sum": float(stats.get(b"fuel_sum", 0)),
+        "vehicles": int(stats.get(b"vehicles", 0)),
+        "active": int(stats.get(b"active", 0)),
+        "last_ts": float(stats.get(b"last_ts", 0))
+    }
+
+def window_buckets(last_ts: float, window: timedelta):
+    last_bucket = int(last_ts // BUCKET_SECONDS)
+    return range(last_bucket - int(window.total_seconds() // BUCKET_SECONDS) + 1, last_bucket + 1)
+
+def window_start(latest: datetime, window: timedelta):
+    return from_epoch(window_buckets(epoch(latest), window)[0] * BUCKET_SECONDS)
+
+def fleet_distance(fleet_id: int, window: timedelta):
+    last_ts = fleet_stats(fleet_id)["last_ts"]
+    if not last_ts:
+        return 0.0
+    values = redis_client.mget([distance_key(fleet_id, bucket) for bucket in window_buckets(last_ts, window)])
+    return sum((float(value) for value in values if value is not None), 0.0)
+
+def status_counts(fleet_ids, staleness: float = 300):
+    cutoff = time.time() - staleness
+    pipe = redis_client.pipeline(transaction=False)
+    for fleet_id in fleet_ids:
+        for status in engineStatuses:
+            pipe.zcount(status_key(status.value, fleet_id), f"({cutoff}", "+inf")
+            pipe.zcount(status_key(status.value, fleet_id), "-inf", cutoff)
+    counts = pipe.execute()
+    width = 2 * len(engineStatuses)
+    results = []
+    for i in range(len(fleet_ids)):
+        chunk = counts[i * width:(i + 1) * width]
+        statuses = {status.value: chunk[2 * j] for j, status in enumerate(engineStatuses)}
+        statuses["offline"] = sum(chunk[1::2])
+        results.append(statuses)
+    return results
+
+def status_fleets():
+    return sorted(int(fleet_id) for fleet_id in redis_client.smembers(STATUS_FLEETS_KEY))
+
+def ensure_fleet_aggregates(db: Session):
+    if redis_client.exists(BUILT_KEY):
+        return
+    token = uuid.uuid4().hex
+    if not redis_client.set(REBUILD_KEY, token, nx=True, ex=REBUILD_TTL):
+        return
+    try:
+        rebuild_fleet_aggregates(db)
+        redis_client.set(BUILT_KEY, 1)
+    finally:
+        RELEASE_SCRIPT(keys=[REBUILD_KEY], args=[token])
+    while vins := redis_client.spop(PENDING_KEY, REFRESH_BATCH):
+        refresh_vehicles(db, [int(vin) for vin in vins])
+
+def rebuild_fleet_aggregates(db: Session, window: timedelta = timedelta(days=7)):
+    pipe = redis_client.pipeline(transaction=False)
+    for key in redis_client.scan_iter("fleet:*"):
+        pipe.delete(key)
+    for key in redis_client.scan_iter("vehicle:*:agg"):
+        pipe.delete(key)
+    for key in redis_client.scan_iter("vehicle_status:*"):
+        pipe.delete(key)
+    for key in redis_client.scan_iter(f"{CELLS_KEY}:*"):
+        pipe.delete(key)
+    pipe.delete(geo_key())
+    pipe.execute()
+
+    states = (
+        db.query(VehicleLatestState, Vehicle.fleetId)
+        .join(Vehicle, Vehicle.vin == VehicleLatestState.vin)
+        .all()
+    )
+    if not states:
+        return
+
+    fleets = {state.vin: fleet_id for state, fleet_id in states}
+    cutoff = window_start(max(state.timestamp for state, _ in states), window)
+    distances = defaultdict(float)
+    previous = {
+        vin: odometer
+        for vin, odometer in db.query(VehicleLatestState.vin, odometer_before(RAW, cutoff)).filter(VehicleLatestState.vin.in_(list(fleets)))
+        if odometer is not None
+    }
+    history = (
+        db.query(Telemetry.vin, Telemetry.odometerReading, Telemetry.timestamp)
+        .filter(Telemetry.timestamp >= cutoff, Telemetry.vin.in_(list(fleets)))
+        .order_by(Telemetry.vin, Telemetry.timestamp)
+        .yield_per(10000)
+    )
+    for vin, odometer, timestamp in history:
+        if vin in previous:
+            bucket = int(epoch(timestamp) // BUCKET_SECONDS)
+            distances[(fleets[vin], bucket)] += odometer - previous[vin]
+        previous[vin] = odometer
+
+    last_seen = {}
+    for state, fleet_id in states:
+        last_seen[fleet_id] = max(last_seen.get(fleet_id, state.timestamp), state.timestamp)
+        active = 1 if state.engineStatus == engineStatuses.on else 0
+        ts = epoch(state.timestamp)
+        status = state.engineStatus.value
+        longitude, latitude, cells = position_args(state.latitude, state.longitude)
+        pipe.hset(vehicle_key(state.vin), mapping={
+            "ts": ts, "fuel": state.fuel, "active": active, "odo": state.odometerReading, "fleet": fleet_id, "status": status,
+            "cells": cells
+        })
+        if cells:
+            pipe.geoadd(geo_key(), [longitude, latitude, state.vin])
+            pipe.geoadd(geo_key(fleet_id), [longitude, latitude, state.vin])
+            for cell in cells.split():
+                pipe.hincrby(cells_key(len(cell)), cell, 1)
+                pipe.hincrby(cells_key(len(cell), fleet_id), cell, 1)
+        pipe.zadd(status_key(status, fleet_id), {state.vin: ts})
+        pipe.zadd(status_key(status), {state.vin: ts})
+        pipe.sadd(STATUS_FLEETS_KEY, fleet_id)
+        pipe.hincrbyfloat(stats_key(fleet_id), "fuel_sum", state.fuel)
+        pipe.hincrby(stats_key(fleet_id), "vehicles", 1)
+        pipe.hincrby(stats_key(fleet_id), "active", active)
+    for fleet_id, timestamp in last_seen.items():
+        pipe.hset(stats_key(fleet_id), "last_ts", epoch(timestamp))
+    for (fleet_id, bucket), distance in distances.items():
+        pipe.set(distance_key(fleet_id, bucket), distance, ex=BUCKET_TTL)
+    pipe.execute()
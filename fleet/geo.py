@@ -0,0 +1,130 @@
+import math
+from collections import Counter
+from functools import lru_cache
+from ..config import GEO_CELL_PRECISIONS
+from ..database import redis_client
+
+GEO_KEY = "vehicle_geo"
+CELLS_KEY = "vehicle_cells"
+MAX_LATITUDE = 85.05112878
+EARTH_RADIUS_KM = 6372.797560856
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+BASE32_BITS = {char: i for i, char in enumerate(BASE32)}
+
+def geo_key(fleet_id: int = None):
+    if fleet_id is None:
+        return GEO_KEY
+    return f"fleet:{fleet_id}:geo"
+
+def cells_key(precision: int, fleet_id: int = None):
+    if fleet_id is None:
+        return f"{CELLS_KEY}:{precision}"
+    return f"fleet:{fleet_id}:cells:{precision}"
+
+def geohash(latitude: float, longitude: float, precision: int):
+    lat_low, lat_high = -90.0, 90.0
+    lon_low, lon_high = -180.0, 180.0
+    chars = []
+    bits = 0
+    even = True
+    for i in range(precision * 5):
+        if even:
+            mid = (lon_low + lon_high) / 2
+            if longitude >= mid:
+                bits = bits * 2 + 1
+                lon_low = mid
+            else:
+                bits = bits * 2
+                lon_high = mid
+        else:
+            mid = (lat_low + lat_high) / 2
+            if latitude >= mid:
+                bits = bits * 2 + 1
+                lat_low = mid
+            else:
+                bits = bits * 2
+                lat_high = mid
+        even = not even
+        if i % 5 == 4:
+            chars.append(BASE32[bits])
+            bits = 0
+    return "".join(chars)
+
+@lru_cache(maxsize=1 << 18)
+def cell_bounds(cell: str):
+    lat_low, lat_high = -90.0, 90.0
+    lon_low, lon_high = -180.0, 180.0
+    even = True
+    for char in cell:
+        bits = BASE32_BITS[char]
+        for shift in range(4, -1, -1):
+            bit = (bits >> shift) & 1
+            if even:
+                mid = (lon_low + lon_high) / 2
+                lon_low, lon_high = (mid, lon_high) if bit else (lon_low, mid)
+            else:
+                mid = (lat_low + lat_high) / 2
+                lat_low, lat_high = (mid, lat_high) if bit else (lat_low, mid)
+            even = not even
+    return lat_low, lon_low, lat_high, lon_high
+
+def position_args(latitude: float, longitude: float):
+    if not (-MAX_LATITUDE <= latitude <= MAX_LATITUDE and -180.0 <= longitude <= 180.0):
+        return ["", "", ""]
+    cell = geohash(latitude, longitude, max(GEO_CELL_PRECISIONS))
+    return [longitude, latitude, " ".join(cell[:precision] for precision in GEO_CELL_PRECISIONS)]
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def vehicle_positions(results, with_distance: bool):
+    positions = []
+    for result in results:
+        if with_distance:
+            member, distance, (longitude, latitude) = result
+        else:
+            member, (longitude, latitude) = result
+            distance = None
+        positions.append({"vin": int(member), "latitude": latitude, "longitude": longitude, "distance": distance})
+    return positions
+
+def vehicles_nearby(latitude: float, longitude: float, radius_km: float, fleet_id: int = None, limit: int = 1000):
+    results = redis_client.geosearch(
+        geo_key(fleet_id), longitude=longitude, latitude=latitude, radius=radius_km, unit="km",
+        sort="ASC", count=limit, withcoord=True, withdist=True
+    )
+    return vehicle_positions(results, with_distance=True)
+
+def vehicles_in_box(min_lat: float, min_lon: float, max_lat: float, max_lon: float, fleet_id: int = None, limit: int = 1000):
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2
+    widest_lat = 0.0 if min_lat <= 0.0 <= max_lat else min(abs(min_lat), abs(max_lat))
+    width = math.radians(max_lon - min_lon) * math.cos(math.radians(widest_lat)) * EARTH_RADIUS_KM * 1.01
+    height = haversine_km(min_lat, center_lon, max_lat, center_lon) * 1.01
+    results = redis_client.geosearch(
+        geo_key(fleet_id), longitude=center_lon, latitude=center_lat, width=width, height=height, unit="km",
+        withcoord=True
+    )
+    inside = [
+        position for position in vehicle_positions(results, with_distance=False)
+        if min_lat <= position["latitude"] <= max_lat and min_lon <= position["longitude"] <= max_lon
+    ]
+    return inside[:limit]
+
+def cell_density(precision: int, fleet_id: int = None, bbox=None, limit: int = None):
+    cells = Counter()
+    for cell, count in redis_client.hgetall(cells_key(precision, fleet_id)).items():
+        cells[cell.decode()] = int(count)
+    density = []
+    for cell, count in cells.most_common():
+        if limit is not None and len(density) >= limit:
+            break
+        lat_low, lon_low, lat_high, lon_high = cell_bounds(cell)
+        if bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            if lat_high < min_lat or lat_low > max_lat or lon_high < min_lon or lon_low > max_lon:
+                continue
+        density.append({"cell": cell, "latitude": (lat_low + lat_high) / 2, "longitude": (lon_low + lon_high) / 2, "count": count})
+    return density
@@ -1,5 +1,81 @@
+from datetime import datetime
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 class FleetIn(BaseModel):
     name: str
-    manufacturerId: int
\ No newline at end of file
+    manufacturerId: int
+
+class FleetOut(BaseModel):
+    fleetId: int
+    fleetName: str
+    manufactererId: int
+
+class VehicleDistance(BaseModel):
+    vin: int
+    distance: float
+
+class FleetDistanceOut(BaseModel):
+    total_distance: float
+    vehicles: Optional[List[VehicleDistance]] = None
+
+class StatusCounts(BaseModel):
+    active: int
+    inactive: int
+    offline: int
+    statuses: Dict[str, int]
+
+class VehicleStatusOut(StatusCounts):
+    fleets: Optional[Dict[int, StatusCounts]] = None
+
+class VehiclePosition(BaseModel):
+    vin: int
+    latitude: float
+    longitude: float
+    distance: Optional[float] = None
+
+class DensityCell(BaseModel):
+    cell: str
+    latitude: float
+    longitude: float
+    count: int
+
+class DensityOut(BaseModel):
+    precision: int
+    vehicles: int
+    cells: List[DensityCell]
+
+class Distribution(BaseModel):
+    mean: float
+    max: float
+    percentiles: Dict[str, float]
+
+class OdometerStats(Distribution):
+    total: float
+
+class FuelHistogram(BaseModel):
+    edges: List[float]
+    counts: List[int]
+
+class EngineRatios(BaseModel):
+    on: float
+    idle: float
+    off: float
+    vehicleOn: Distribution
+
+class DiagnosticCount(BaseModel):
+    code: int
+    count: int
+
+class FleetAnalyticsOut(BaseModel):
+    fleetId: int
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    truncated: bool = False
+    samples: int
+    vehicles: int
+    speed: Distribution
+    fuel: FuelHistogram
+    odometer: OdometerStats
+    engine: EngineRatios
+    diagnosticCodes: List[DiagnosticCount]
@@ -1,21 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from ..database import SessionLocal
-from .models import FleetIn
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from .models import FleetIn, FleetOut
 from .schemas import Fleet
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/")
-async def create_fleet(fleet: FleetIn):
-    db = SessionLocal()
-    db_fleet = db.query(Fleet).filter(Fleet.manufacturerId == fleet.manufacturerId and Fleet.fleetName == fleet.name).first()
+async def create_fleet(fleet: FleetIn, db: AsyncSession = Depends(get_db)) -> FleetOut:
+    db_fleet = await db.scalar(select(Fleet).where(Fleet.manufactererId == fleet.manufacturerId, Fleet.fleetName == fleet.name))
     if db_fleet:
         raise HTTPException(status_code=409, detail="Fleet Already Exists")
     db_fleet = Fleet(
@@ -23,36 +17,33 @@ async def create_fleet(fleet: FleetIn):
         manufactererId = fleet.manufacturerId
     )
     db.add(db_fleet)
-    db.commit()
-    db.refresh(db_fleet)
+    await db.commit()
+    await db.refresh(db_fleet)
     return db_fleet
 
 @router.get("/{fleet_id}")
-async def get_fleet(fleet_id: int):
-    db = SessionLocal()
-    db_fleet = db.query(Fleet).filter(Fleet.fleetId == fleet_id).first()
+async def get_fleet(fleet_id: int, db: AsyncSession = Depends(get_db)) -> FleetOut:
+    db_fleet = await db.scalar(select(Fleet).where(Fleet.fleetId == fleet_id))
     if not db_fleet:
         raise HTTPException(status_code=404, detail="Fleet not found")
     return db_fleet
 
 @router.put("/{fleet_id}")
-async def update_fleet(fleet_id: int, fleet: FleetIn):
-    db = SessionLocal()
-    db_fleet = db.query(Fleet).filter(Fleet.fleetId == fleet_id).first()
+async def update_fleet(fleet_id: int, fleet: FleetIn, db: AsyncSession = Depends(get_db)) -> FleetOut:
+    db_fleet = await db.scalar(select(Fleet).where(Fleet.fleetId == fleet_id))
     if not db_fleet:
         raise HTTPException(status_code=404, detail="Fleet not found")
     db_fleet.fleetName = fleet.name
-    db_fleet.manufacturerId = fleet.manufacturerId
-    db.commit()
-    db.refresh(db_fleet)
+    db_fleet.manufactererId = fleet.manufacturerId
+    await db.commit()
+    await db.refresh(db_fleet)
     return db_fleet
 
 @router.delete("/{fleet_id}")
-async def delete_fleet(fleet_id: int):
-    db = SessionLocal()
-    db_fleet = db.query(Fleet).filter(Fleet.fleetId == fleet_id).first()
+async def delete_fleet(fleet_id: int, db: AsyncSession = Depends(get_db)) -> dict[str, str]:
+    db_fleet = await db.scalar(select(Fleet).where(Fleet.fleetId == fleet_id))
     if not db_fleet:
         raise HTTPException(status_code=404, detail="Fleet not found")
-    db.delete(db_fleet)
-    db.commit()
+    await db.delete(db_fleet)
+    await db.commit()
     return {"message": "Fleet deleted successfully"}
\ No newline at end of file
@@ -1,4 +1,8 @@
 from pydantic import BaseModel
 
 class HumanIn(BaseModel):
-    name: str
\ No newline at end of file
+    name: str
+
+class HumanOut(BaseModel):
+    humanId: int
+    humanName: str
@@ -1,46 +1,44 @@
-from fastapi import APIRouter, HTTPException
-from ..database import SessionLocal
-from .models import HumanIn
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from .models import HumanIn, HumanOut
 from .schemas import Human
 
 router = APIRouter()
 
 @router.post("/")
-async def create_human(human: HumanIn):
-    db = SessionLocal()
+async def create_human(human: HumanIn, db: AsyncSession = Depends(get_db)) -> HumanOut:
     db_human = Human(
         humanName = human.name
     )
     db.add(db_human)
-    db.commit()
-    db.refresh(db_human)
+    await db.commit()
+    await db.refresh(db_human)
     return db_human
 
 @router.get("/{human_id}")
-async def get_human(human_id: int):
-    db = SessionLocal()
-    db_human = db.query(Human).filter(Human.humanId == human_id).first()
+async def get_human(human_id: int, db: AsyncSession = Depends(get_db)) -> HumanOut:
+    db_human = await db.scalar(select(Human).where(Human.humanId == human_id))
     if not db_human:
         raise HTTPException(status_code=404, detail="Human not found")
     return db_human
 
 @router.put("/{human_id}")
-async def update_human(human_id: int, human: HumanIn):
-    db = SessionLocal()
-    db_human = db.query(Human).filter(Human.humanId == human_id).first()
+async def update_human(human_id: int, human: HumanIn, db: AsyncSession = Depends(get_db)) -> HumanOut:
+    db_human = await db.scalar(select(Human).where(Human.humanId == human_id))
     if not db_human:
         raise HTTPException(status_code=404, detail="Human not found")
     db_human.humanName = human.name
-    db.commit()
-    db.refresh(db_human)
+    await db.commit()
+    await db.refresh(db_human)
     return db_human
 
 @router.delete("/{human_id}")
-async def delete_human(human_id: int):
-    db = SessionLocal()
-    db_human = db.query(Human).filter(Human.humanId == human_id).first()
+async def delete_human(human_id: int, db: AsyncSession = Depends(get_db)) -> dict[str, str]:
+    db_human = await db.scalar(select(Human).where(Human.humanId == human_id))
     if not db_human:
         raise HTTPException(status_code=404, detail="Human not found")
-    db.delete(db_human)
-    db.commit()
+    await db.delete(db_human)
+    await db.commit()
     return {"message": "Human deleted successfully"}
\ No newline at end of file
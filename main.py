@@ -1,4 +1,11 @@
-from fastapi import FastAPI
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+import sentry_sdk
+import asyncio
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, WebSocket
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from .manufacturer.router import router as manufacturer_router
 from .model.router import router as model_router
 from .fleet.router import router as fleet_router
@@ -7,23 +14,83 @@ from .alert.router import router as alert_router
 from .alert_type.router import router as alert_type_router
 from .vehicle.router import router as vehicle_router
 from .telemetry.router import router as telemetry_router
-from .alert.schemas import Alert
-from .telemetry.models import engineStatuses
-from .telemetry.schemas import Telemetry
+from .alert.schemas import Alert, AlertCount
+from .alert.rules import alert_worker
+from .alert.summary import alert_summary, rebuild_alert_counts, record_alerts
+from .telemetry.models import engineStatuses, distanceWindows, WINDOW_DELTAS
+from .telemetry.schemas import Telemetry, VehicleLatestState
+from .telemetry.writer import telemetry_writer
+from .telemetry.latest import rebuild_latest_state, upsert_latest_state
+from .telemetry.rollup import odometer_before, odometer_from, point_tier, rollup_scheduler
+from .telemetry.trips import trip_worker
+from .fleet.aggregates import ensure_fleet_aggregates, fleet_stats, fleet_distance, record_telemetry, status_counts, status_fleets, window_start
+from .fleet.models import DensityOut, FleetAnalyticsOut, FleetDistanceOut, StatusCounts, VehicleDistance, VehiclePosition, VehicleStatusOut
+from .fleet.geo import cell_density, vehicles_in_box, vehicles_nearby
+from .fleet.analytics import fleet_analytics
+from .cache import bump, cached, cache_stats
+from .fanout import CLOSED, fanout_hub
+from .credentials import credential_pool, hash_credentials
 from .vehicle.schemas import Vehicle
+from .vehicle.models import authModes
 from .manufacturer.schemas import Manufacturer
 from .model.schemas import Model
 from .fleet.schemas import Fleet
 from .human.schemas import Human
+from .alert_type.models import comparisons, ruleFields
 from .alert_type.schemas import AlertType
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from .database import Base, engine, SessionLocal, hash_password
-from .database import redis_client
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional
+from .database import Base, engine, SessionLocal, AsyncSessionLocal, get_db, pool_metrics
+from .migrations import run_migrations, check_query_plans
+from .profiling import RequestProfile, SamplingProfiler, current_profile, metrics
+from .config import (
+    CHECK_QUERY_PLANS, INGEST_MODE, VEHICLE_STALE_SECONDS, ROLLUP_INTERVAL, FANOUT_KEEPALIVE, GEO_CELL_PRECISIONS, PROFILE_SLOW_MS, PROFILE_INTERVAL, PROFILE_DIR,
+    SENTRY_DSN, SENTRY_ENVIRONMENT, SENTRY_TRACES_SAMPLE_RATE
+)
+
+logger = logging.getLogger(__name__)
+
+if SENTRY_DSN:
+    sentry_sdk.init(dsn=SENTRY_DSN, environment=SENTRY_ENVIRONMENT, traces_sample_rate=SENTRY_TRACES_SAMPLE_RATE)
+
+sampling_profiler = SamplingProfiler(PROFILE_INTERVAL) if PROFILE_SLOW_MS else None
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+if CHECK_QUERY_PLANS:
+    check_query_plans(engine)
+
+with SessionLocal() as db:
+    if db.query(VehicleLatestState).first() is None and db.query(Telemetry).first() is not None:
+        rebuild_latest_state(db)
+    ensure_fleet_aggregates(db)
+    if db.query(AlertCount).first() is None and db.query(Alert).first() is not None:
+        rebuild_alert_counts(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if sampling_profiler:
+        sampling_profiler.start(threading.get_ident())
+    fanout_hub.start()
+    alert_worker.start()
+    trip_worker.start()
+    if INGEST_MODE == "buffered":
+        telemetry_writer.start()
+    if ROLLUP_INTERVAL > 0:
+        rollup_scheduler.start()
+    yield
+    await rollup_scheduler.stop()
+    await telemetry_writer.stop()
+    await alert_worker.stop()
+    await trip_worker.stop()
+    await fanout_hub.stop()
+    credential_pool.shutdown()
+    if sampling_profiler:
+        sampling_profiler.stop()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(manufacturer_router, prefix="/manufacturer")
 app.include_router(model_router, prefix="/model")
 app.include_router(fleet_router, prefix="/fleet")
@@ -33,165 +100,327 @@ app.include_router(alert_type_router, prefix="/alert_type")
 app.include_router(alert_router, prefix="/alert")
 app.include_router(telemetry_router, prefix="/telemetry")
 
-@app.get("/allActiveAndInactive")
-async def get_all_active_inactive():
-    db = SessionLocal()
-    active = db.query(Telemetry.vin).distinct().filter(Telemetry.engineStatus == engineStatuses.on).count()
-    total = db.query(Telemetry.vin).distinct().count()
-    return {
-        "active" : active,
-        "inactive": total-active
-    }
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    profile = RequestProfile()
+    token = current_profile.set(profile)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        current_profile.reset(token)
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.observe_request(request.method, path, status, elapsed, profile)
+        if sampling_profiler and elapsed * 1000 >= PROFILE_SLOW_MS:
+            dumped = sampling_profiler.dump(PROFILE_DIR, f"{request.method} {path}", start, start + elapsed)
+            if dumped:
+                logger.warning("Slow request %s %s took %.0f ms, stacks in %s", request.method, path, elapsed * 1000, dumped)
+
+metrics.register_gauge("worker_queue_depth", "Items waiting in background worker queues.", lambda: {
+    (("worker", "alert_rules"),): alert_worker.snapshot()["depth"],
+    (("worker", "trip_detector"),): trip_worker.snapshot()["depth"],
+    (("worker", "telemetry_writer"),): telemetry_writer.snapshot()["depth"],
+})
+metrics.register_gauge("db_pool_checked_out", "Connections currently checked out per pool.", lambda: {
+    (("pool", name),): stats["checked_out"] or 0 for name, stats in pool_metrics.snapshot()["pools"].items()
+})
+
+def status_summary(statuses: dict) -> StatusCounts:
+    return StatusCounts(
+        active=statuses[engineStatuses.on.value],
+        inactive=statuses[engineStatuses.off.value] + statuses[engineStatuses.idle.value],
+        offline=statuses["offline"],
+        statuses=statuses
+    )
+
+@app.get("/allActiveAndInactive", response_model_exclude_none=True)
+async def get_all_active_inactive(fleet_id: Optional[int] = None, breakdown: bool = False, staleness: float = VEHICLE_STALE_SECONDS) -> VehicleStatusOut:
+    fleet_ids = []
+    if breakdown:
+        fleet_ids = [fleet_id] if fleet_id is not None else status_fleets()
+    total, *per_fleet = status_counts([fleet_id] + fleet_ids, staleness)
+    fleets = {fleet: status_summary(counts) for fleet, counts in zip(fleet_ids, per_fleet)} if breakdown else None
+    return VehicleStatusOut(**status_summary(total).model_dump(), fleets=fleets)
+
+MAX_GEO_RESULTS = 10000
+
+def check_box(min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+        raise HTTPException(status_code=400, detail="Box must satisfy -90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180")
+
+@app.get("/vehiclesNearby", response_model_exclude_none=True)
+async def get_vehicles_nearby(
+    latitude: float = Query(ge=-90, le=90),
+    longitude: float = Query(ge=-180, le=180),
+    radius_km: float = Query(gt=0),
+    fleet_id: Optional[int] = None,
+    limit: int = Query(1000, gt=0, le=MAX_GEO_RESULTS)
+) -> List[VehiclePosition]:
+    return vehicles_nearby(latitude, longitude, radius_km, fleet_id, limit)
+
+@app.get("/vehiclesInBox", response_model_exclude_none=True)
+async def get_vehicles_in_box(
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    fleet_id: Optional[int] = None,
+    limit: int = Query(1000, gt=0, le=MAX_GEO_RESULTS)
+) -> List[VehiclePosition]:
+    check_box(min_lat, min_lon, max_lat, max_lon)
+    return vehicles_in_box(min_lat, min_lon, max_lat, max_lon, fleet_id, limit)
+
+@app.get("/fleetDensity")
+async def get_fleet_density(
+    precision: int = GEO_CELL_PRECISIONS[0],
+    fleet_id: Optional[int] = None,
+    min_lat: Optional[float] = None,
+    min_lon: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    max_lon: Optional[float] = None,
+    limit: int = Query(1000, gt=0, le=MAX_GEO_RESULTS)
+) -> DensityOut:
+    if precision not in GEO_CELL_PRECISIONS:
+        raise HTTPException(status_code=400, detail=f"Precision must be one of {', '.join(map(str, GEO_CELL_PRECISIONS))}")
+    box = (min_lat, min_lon, max_lat, max_lon)
+    if any(value is not None for value in box):
+        if any(value is None for value in box):
+            raise HTTPException(status_code=400, detail="Give all of min_lat, min_lon, max_lat and max_lon, or none")
+        check_box(*box)
+    else:
+        box = None
+    cells = cell_density(precision, fleet_id, box, limit)
+    return DensityOut(precision=precision, vehicles=sum(cell["count"] for cell in cells), cells=cells)
 
 @app.get("/avgFuelLevels/{fleet_id}")
 async def get_avg_fuel_levels(fleet_id: int):
-    cache = redis_client.get("{fleet_id}avgFuel")
-    if cache != -1:
-        return cache
-    db = SessionLocal()
-    total_fuel: float = 0
-    count: int = 0
-    for vin in db.query(Vehicle.vin).filter(Vehicle.fleetId == fleet_id).all():
-        value = db.query(Telemetry.fuel).distinct().filter(Telemetry.vin == vin[0]).order_by(Telemetry.timestamp.desc()).first()
-        total_fuel += value[0]
-        count += 1
-    redis_client.set("{fleet_id}avgFuel", total_fuel/count)
-    return {"avg": total_fuel/count}
-
-@app.get("/total_distance_traveled/{fleet_id}")
-async def get_total_distance_traveled(fleet_id: int):
-    cache = redis_client.get(f"{fleet_id}distTot")
-    if cache is not None:
-        try:
-            return {"total_distance": float(cache)}
-        except ValueError:
-            pass
-
-    db: Session = SessionLocal()
-
-    vins = db.query(Vehicle.vin).filter(Vehicle.fleetId == fleet_id).all()
-    vins = [vin for (vin,) in vins]
-
-    latest_timestamp = (
-        db.query(Telemetry.timestamp)
-        .filter(Telemetry.vin.in_(vins))
-        .order_by(Telemetry.timestamp.desc())
-        .first()
-    )
+    stats = fleet_stats(fleet_id)
+    if not stats["vehicles"]:
+        return {"avg": 0.0}
+    return {"avg": stats["fuel_sum"] / stats["vehicles"]}
+
+@app.get("/total_distance_traveled/{fleet_id}", response_model_exclude_none=True)
+async def get_total_distance_traveled(fleet_id: int, window: distanceWindows = distanceWindows.day, breakdown: bool = False) -> FleetDistanceOut:
+    if breakdown:
+        return await get_distance_breakdown(fleet_id, window)
+    return FleetDistanceOut(total_distance=fleet_distance(fleet_id, WINDOW_DELTAS[window]))
 
-    if not latest_timestamp:
-        return {"total_distance": 0.0}
+@cached("fleet_distance", ttl=300, soft_ttl=60, scope="fleet_id")
+async def get_distance_breakdown(fleet_id: int, window: distanceWindows) -> FleetDistanceOut:
+    async with AsyncSessionLocal() as db:
+        return await distance_breakdown(fleet_id, window, db)
+
+async def distance_breakdown(fleet_id: int, window: distanceWindows, db: AsyncSession):
+    latest_timestamp = await db.scalar(
+        select(func.max(VehicleLatestState.timestamp))
+        .join(Vehicle, Vehicle.vin == VehicleLatestState.vin)
+        .where(Vehicle.fleetId == fleet_id)
+    )
 
-    latest_timestamp = latest_timestamp[0]
-    cutoff_time = latest_timestamp - timedelta(hours=24)
+    if latest_timestamp is None:
+        return FleetDistanceOut(total_distance=0.0, vehicles=[])
 
-    total_distance = 0.0
+    cutoff_time = window_start(latest_timestamp, WINDOW_DELTAS[window])
 
-    for vin in vins:
-        latest = (
-            db.query(Telemetry.odometerReading)
-            .filter(Telemetry.vin == vin)
-            .order_by(Telemetry.timestamp.desc())
-            .first()
-        )
+    tier = await point_tier(db, cutoff_time)
+    before_cutoff = func.coalesce(odometer_before(tier, cutoff_time), odometer_from(tier, cutoff_time))
 
-        before_24hr = (
-            db.query(Telemetry.odometerReading)
-            .filter(
-                Telemetry.vin == vin,
-                Telemetry.timestamp <= cutoff_time
-            )
-            .order_by(Telemetry.timestamp.desc())
-            .first()
-        )
+    rows = await db.execute(
+        select(VehicleLatestState.vin, VehicleLatestState.odometerReading, before_cutoff)
+        .join(Vehicle, Vehicle.vin == VehicleLatestState.vin)
+        .where(Vehicle.fleetId == fleet_id)
+    )
 
-        if latest and before_24hr:
-            total_distance += latest[0] - before_24hr[0]
+    vehicles = [
+        VehicleDistance(vin=vin, distance=latest - before)
+        for vin, latest, before in rows
+        if before is not None
+    ]
+    total_distance = sum((vehicle.distance for vehicle in vehicles), 0.0)
+    return FleetDistanceOut(total_distance=total_distance, vehicles=vehicles)
 
-    redis_client.set(f"{fleet_id}distTot", total_distance, ex=86400)
-    return {"total_distance": total_distance}
 
+@app.get("/fleetAnalytics/{fleet_id}")
+async def get_fleet_analytics(fleet_id: int, window: distanceWindows = distanceWindows.day) -> FleetAnalyticsOut:
+    return await fleet_analytics(fleet_id, window)
 
 @app.get("/alertSummary")
-async def get_alert_summary():
-    db = SessionLocal()
-
-    summary = {}
-    for alert in db.query(Alert).all():
-        if alert.alertTypeId not in summary:
-            summary[alert.alertTypeId] = 1
-        else:
-            summary[alert.alertTypeId] += 1
-        
-    return summary
+async def get_alert_summary(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fleet_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+) -> dict[int, int]:
+    return await alert_summary(db, since, until, fleet_id)
+
+def dropped_notice(count: int):
+    return f'{{"type":"dropped","count":{count}}}'
+
+@app.websocket("/subscribe")
+async def subscribe_websocket(websocket: WebSocket, vin: List[int] = Query([]), fleet_id: List[int] = Query([])):
+    if not vin and not fleet_id:
+        await websocket.close(code=1008, reason="Subscribe to at least one vin or fleet_id")
+        return
+    await websocket.accept()
+    async with fanout_hub.subscription(vin, fleet_id) as subscriber:
+        async def forward():
+            while True:
+                message = await subscriber.next()
+                if message is CLOSED:
+                    await websocket.close(code=1013, reason="Slow consumer")
+                    return
+                dropped = subscriber.take_dropped()
+                if dropped:
+                    await websocket.send_text(dropped_notice(dropped))
+                await websocket.send_text(message.decode())
+
+        async def drain():
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+
+        tasks = [asyncio.create_task(forward()), asyncio.create_task(drain())]
+        _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def event_stream(vins: List[int], fleet_ids: List[int]):
+    async with fanout_hub.subscription(vins, fleet_ids) as subscriber:
+        yield ": subscribed\n\n"
+        while True:
+            message = await subscriber.next(FANOUT_KEEPALIVE)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            if message is CLOSED:
+                yield 'data: {"type":"closed","reason":"slow consumer"}\n\n'
+                return
+            dropped = subscriber.take_dropped()
+            if dropped:
+                yield f"data: {dropped_notice(dropped)}\n\n"
+            yield b"data: " + message + b"\n\n"
+
+@app.get("/subscribe/events")
+async def subscribe_events(vin: List[int] = Query([]), fleet_id: List[int] = Query([])):
+    if not vin and not fleet_id:
+        raise HTTPException(status_code=400, detail="Subscribe to at least one vin or fleet_id")
+    return StreamingResponse(
+        event_stream(vin, fleet_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/streamStats")
+async def get_stream_stats():
+    return fanout_hub.snapshot()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cacheStats")
+async def get_cache_stats():
+    return cache_stats()
+
+@app.get("/poolStats")
+async def get_pool_stats():
+    return pool_metrics.snapshot()
+
+@app.get("/alertEngineStats")
+async def get_alert_engine_stats():
+    return alert_worker.snapshot()
+
+@app.get("/tripStats")
+async def get_trip_stats():
+    return trip_worker.snapshot()
+
+@app.get("/ingestStats")
+async def get_ingest_stats():
+    return {"mode": INGEST_MODE, **telemetry_writer.snapshot()}
+
+@app.get("/rollupStats")
+async def get_rollup_stats():
+    return await rollup_scheduler.snapshot()
 
 @app.post("/seed")
-async def seed_data():
-    db = SessionLocal()
+async def seed_data(db: AsyncSession = Depends(get_db)):
     # Create Manufacturers
     manufacturers = [
-        Manufacturer(name="Toyota"),
-        Manufacturer(name="Ford"),
-        Manufacturer(name="Honda"),
+        Manufacturer(manufacturerName="Toyota"),
+        Manufacturer(manufacturerName="Ford"),
+        Manufacturer(manufacturerName="Honda"),
     ]
     db.add_all(manufacturers)
-    db.commit()
+    await db.commit()
 
     # Create Models
     models = [
-        Model(name="Camry", manufacturerId=1),
-        Model(name="F-150", manufacturerId=2),
-        Model(name="Civic", manufacturerId=3),
+        Model(modelName="Camry", manufactererId=1),
+        Model(modelName="F-150", manufactererId=2),
+        Model(modelName="Civic", manufactererId=3),
     ]
     db.add_all(models)
-    db.commit()
+    await db.commit()
 
     # Create Fleets
     fleets = [
-        Fleet(name="West Coast Fleet", manufacturerId=1),
-        Fleet(name="East Coast Fleet", manufacturerId=2),
+        Fleet(fleetName="West Coast Fleet", manufactererId=1),
+        Fleet(fleetName="East Coast Fleet", manufactererId=2),
     ]
     db.add_all(fleets)
-    db.commit()
+    await db.commit()
 
     # Create Humans
     humans = [
-        Human(name="John Doe"),
-        Human(name="Jane Smith"),
+        Human(humanName="John Doe"),
+        Human(humanName="Jane Smith"),
     ]
     db.add_all(humans)
-    db.commit()
+    await db.commit()
 
     # Create AlertTypes
     alert_types = [
-        AlertType(alertTitle="Low Fuel", alertDescription="Fuel level is critically low."),
+        AlertType(alertTitle="Speeding", alertDescription="Vehicle exceeded the speed limit.",
+                  field=ruleFields.speed, comparison=comparisons.gt, threshold=120, hysteresis=10, cooldown=300),
+        AlertType(alertTitle="Low Fuel", alertDescription="Fuel level is critically low.",
+                  field=ruleFields.fuel, comparison=comparisons.lt, threshold=0.15, hysteresis=0.05, cooldown=600),
         AlertType(alertTitle="Engine Overheating", alertDescription="Engine temperature is too high."),
     ]
     db.add_all(alert_types)
-    db.commit()
+    await db.commit()
+    bump("alert_rules")
 
     # Create Vehicles
+    passwords = await hash_credentials([("password123", authModes.password), ("password456", authModes.password)])
     vehicles = [
-        Vehicle(vin=12345, modelId=1, fleetId=1, operatorId=1, ownerId=2, regStatus="active", password="password123"),
-        Vehicle(vin=67890, modelId=2, fleetId=2, operatorId=2, ownerId=1, regStatus="maintenance", password="password456"),
+        Vehicle(vin=12345, modelId=1, fleetId=1, operatorId=1, ownerId=2, regStatus="active", password=passwords[0]),
+        Vehicle(vin=67890, modelId=2, fleetId=2, operatorId=2, ownerId=1, regStatus="maintenance", password=passwords[1]),
     ]
     db.add_all(vehicles)
-    db.commit()
+    await db.commit()
 
     # Create Telemetry
     telemetry_data = [
-        Telemetry(vin=12345, latitude=34.0522, longitude=-118.2437, speed=65, engineStatus="on", fuel=0.25, odometerReading=50000, diagnosticCode=100, timestamp=datetime.utcnow()),
-        Telemetry(vin=67890, latitude=40.7128, longitude=-74.0060, speed=0, engineStatus="off", fuel=0.75, odometerReading=120000, diagnosticCode=0, timestamp=datetime.utcnow()),
+        dict(vin=12345, latitude=34.0522, longitude=-118.2437, speed=65, engineStatus="on", fuel=0.25, odometerReading=50000, diagnosticCode=100, timestamp=datetime.utcnow()),
+        dict(vin=67890, latitude=40.7128, longitude=-74.0060, speed=0, engineStatus="off", fuel=0.75, odometerReading=120000, diagnosticCode=0, timestamp=datetime.utcnow()),
     ]
-    db.add_all(telemetry_data)
-    db.commit()
+    await db.execute(insert(Telemetry), telemetry_data)
+    await upsert_latest_state(db, telemetry_data)
+    await db.commit()
+    record_telemetry(telemetry_data, {vehicle.vin: vehicle.fleetId for vehicle in vehicles})
 
     # Create Alerts
     alerts = [
-        Alert(vin=12345, alertTypeId=1),
-        Alert(vin=67890, alertTypeId=2),
+        dict(vin=12345, alertTypeId=1, timestamp=datetime.utcnow()),
+        dict(vin=67890, alertTypeId=2, timestamp=datetime.utcnow()),
     ]
-    db.add_all(alerts)
-    db.commit()
+    await db.execute(insert(Alert), alerts)
+    await record_alerts(db, alerts)
+    await db.commit()
 
-    return {"message": "Database seeded successfully."}
+    return {"message": "Database seeded successfully."}
\ No newline at end of file
@@ -1,4 +1,8 @@
 from pydantic import BaseModel
 
 class ManufactererIn(BaseModel):
-    name: str
\ No newline at end of file
+    name: str
+
+class ManufacturerOut(BaseModel):
+    manufacturerId: int
+    manufacturerName: str
@@ -1,54 +1,45 @@
-from fastapi import APIRouter, HTTPException
-from ..database import SessionLocal
-from .models import ManufactererIn
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from .models import ManufactererIn, ManufacturerOut
 from .schemas import Manufacturer
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/")
-async def create_manufacturer(manufacturer: ManufactererIn):
-    db = SessionLocal()
-    db_manu = db.query(Manufacturer).filter(Manufacturer.manufacturerName == manufacturer.name).first()
+async def create_manufacturer(manufacturer: ManufactererIn, db: AsyncSession = Depends(get_db)) -> ManufacturerOut:
+    db_manu = await db.scalar(select(Manufacturer).where(Manufacturer.manufacturerName == manufacturer.name))
     if db_manu:
         raise HTTPException(status_code=409, detail="Manufacturer Already Exists")
     db_manu = Manufacturer(manufacturerName=manufacturer.name)
     db.add(db_manu)
-    db.commit()
-    db.refresh(db_manu)
+    await db.commit()
+    await db.refresh(db_manu)
     return db_manu
 
 @router.get("/{manufacturer_id}")
-async def get_manufacturer(manufacturer_id: int):
-    db = SessionLocal()
-    manufacturer = db.query(Manufacturer).filter(Manufacturer.manufacturerId == manufacturer_id).first()
+async def get_manufacturer(manufacturer_id: int, db: AsyncSession = Depends(get_db)) -> ManufacturerOut:
+    manufacturer = await db.scalar(select(Manufacturer).where(Manufacturer.manufacturerId == manufacturer_id))
     if not manufacturer:
         raise HTTPException(status_code=404, detail="Manufacturer not found")
     return manufacturer
 
 @router.put("/{manufacturer_id}")
-async def update_manufacturer(manufacturer_id: int, manufacturer: ManufactererIn):
-    db = SessionLocal()
-    db_manu = db.query(Manufacturer).filter(Manufacturer.manufacturerId == manufacturer_id).first()
+async def update_manufacturer(manufacturer_id: int, manufacturer: ManufactererIn, db: AsyncSession = Depends(get_db)) -> ManufacturerOut:
+    db_manu = await db.scalar(select(Manufacturer).where(Manufacturer.manufacturerId == manufacturer_id))
     if not db_manu:
         raise HTTPException(status_code=404, detail="Manufacturer not found")
     db_manu.manufacturerName = manufacturer.name
-    db.commit()
-    db.refresh(db_manu)
+    await db.commit()
+    await db.refresh(db_manu)
     return db_manu
 
 @router.delete("/{manufacturer_id}")
-async def delete_manufacturer(manufacturer_id: int):
-    db = SessionLocal()
-    db_manu = db.query(Manufacturer).filter(Manufacturer.manufacturerId == manufacturer_id).first()
+async def delete_manufacturer(manufacturer_id: int, db: AsyncSession = Depends(get_db)) -> dict[str, str]:
+    db_manu = await db.scalar(select(Manufacturer).where(Manufacturer.manufacturerId == manufacturer_id))
     if not db_manu:
         raise HTTPException(status_code=404, detail="Manufacturer not found")
-    db.delete(db_manu)
-    db.commit()
+    await db.delete(db_manu)
+    await db.commit()
     return {"message": "Manufacturer deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Engine
+from .database import storage_backend
+from .alert.schemas import Alert
+from .alert_type.models import comparisons, ruleFields
+from .alert_type.schemas import AlertType
+from .fleet.analytics import window_query
+from .telemetry.schemas import Telemetry, TelemetryRollup, Trip
+from .vehicle.models import authModes
+from .vehicle.schemas import Vehicle
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String),
+    Column("appliedAt", DateTime(timezone=True), server_default=func.now())
+)
+
+def add_column(conn, table, column):
+    if column.name in {c["name"] for c in inspect(conn).get_columns(table.name)}:
+        return
+    if hasattr(column.type, "create"):
+        column.type.create(conn, checkfirst=True)
+    preparer = conn.dialect.identifier_preparer
+    conn.execute(text(
+        f"ALTER TABLE {preparer.format_table(table)} "
+        f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=conn.dialect)}"
+    ))
+
+def create_indexes(conn, table):
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+def add_vehicle_auth_mode(conn):
+    table = Vehicle.__table__
+    add_column(conn, table, table.c.authMode)
+    conn.execute(table.update().where(table.c.authMode.is_(None)).values(authMode=authModes.password))
+
+def add_telemetry_indexes(conn):
+    create_indexes(conn, Telemetry.__table__)
+
+def add_alert_indexes(conn):
+    create_indexes(conn, Alert.__table__)
+
+def add_vehicle_fleet_index(conn):
+    create_indexes(conn, Vehicle.__table__)
+
+def prepare_telemetry_storage(conn):
+    storage_backend.prepare_time_series(conn, Telemetry.__table__, "timestamp")
+
+def add_alert_type_rules(conn):
+    table = AlertType.__table__
+    for column in (table.c.field, table.c.comparison, table.c.threshold, table.c.hysteresis, table.c.cooldown):
+        add_column(conn, table, column)
+    legacy_rules = [
+        (1, ruleFields.speed, comparisons.gt, 120.0),
+        (2, ruleFields.fuel, comparisons.lt, 0.15),
+    ]
+    for alert_type_id, field, comparison, threshold in legacy_rules:
+        conn.execute(
+            table.update()
+            .where(table.c.alertTypeId == alert_type_id, table.c.field.is_(None))
+            .values(field=field, comparison=comparison, threshold=threshold, hysteresis=0.0, cooldown=0)
+        )
+
+def add_rollup_telemetry_indexes(conn):
+    create_indexes(conn, Telemetry.__table__)
+
+MIGRATIONS = [
+    (1, "add_vehicle_auth_mode", add_vehicle_auth_mode),
+    (2, "add_telemetry_indexes", add_telemetry_indexes),
+    (3, "add_alert_indexes", add_alert_indexes),
+    (4, "add_vehicle_fleet_index", add_vehicle_fleet_index),
+    (5, "prepare_telemetry_storage", prepare_telemetry_storage),
+    (6, "add_alert_type_rules", add_alert_type_rules),
+    (7, "add_rollup_telemetry_indexes", add_rollup_telemetry_indexes),
+]
+
+def run_migrations(engine: Engine):
+    metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name))
+
+def hot_queries():
+    now = datetime.utcnow()
+    return {
+        "latest telemetry per vin": select(Telemetry.odometerReading)
+            .where(Telemetry.vin == 1, Telemetry.timestamp <= now)
+            .order_by(Telemetry.timestamp.desc())
+            .limit(1),
+        "telemetry window per vin": select(Telemetry.telemetryId)
+            .where(Telemetry.vin == 1, Telemetry.timestamp >= now - timedelta(hours=24)),
+        "telemetry time range": select(Telemetry.telemetryId)
+            .where(Telemetry.timestamp >= now - timedelta(hours=1), Telemetry.timestamp < now),
+        "rollup before cutoff per vin": select(TelemetryRollup.odometerLast)
+            .where(TelemetryRollup.tier == "1h", TelemetryRollup.vin == 1, TelemetryRollup.bucket <= now)
+            .order_by(TelemetryRollup.bucket.desc())
+            .limit(1),
+        "rollups in range": select(TelemetryRollup.vin)
+            .where(TelemetryRollup.tier == "1m", TelemetryRollup.bucket < now - timedelta(days=30)),
+        "trips per vin": select(Trip.tripId)
+            .where(Trip.vin == 1, Trip.startTime >= now - timedelta(days=7))
+            .order_by(Trip.startTime.desc()),
+        "active vins": select(Telemetry.vin)
+            .where(Telemetry.engineStatus == "on")
+            .distinct(),
+        "fleet vehicles": select(Vehicle.vin).where(Vehicle.fleetId == 1),
+        "fleet telemetry window": window_query(1, now - timedelta(days=1), now),
+        "alerts per vin": select(Alert.alertId)
+            .where(Alert.vin == 1)
+            .order_by(Alert.timestamp.desc()),
+        "alerts per type": select(Alert.alertId)
+            .where(Alert.alertTypeId == 1, Alert.timestamp >= now - timedelta(days=1)),
+        "alerts in range": select(Alert.alertId)
+            .where(Alert.timestamp >= now - timedelta(days=1)),
+    }
+
+def explain(conn, prefix, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return conn.exec_driver_sql(f"{prefix} {compiled}", params).all()
+
+def full_scans(conn, stmt):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = explain(conn, "EXPLAIN", stmt)
+        return [row[0].strip() for row in plan if "Seq Scan" in row[0]]
+    plan = explain(conn, "EXPLAIN QUERY PLAN", stmt)
+    return [row[-1] for row in plan if row[-1].startswith("SCAN") and "INDEX" not in row[-1]]
+
+def check_query_plans(engine: Engine):
+    failures = {}
+    for name, stmt in hot_queries().items():
+        with engine.begin() as conn:
+            scans = full_scans(conn, stmt)
+        if scans:
+            failures[name] = scans
+    if failures:
+        details = "; ".join(f"{name}: {', '.join(scans)}" for name, scans in failures.items())
+        raise RuntimeError(f"Hot queries fall back to full table scans: {details}")
@@ -4,3 +4,7 @@ class ModelIn(BaseModel):
     name: str
     manufacturerId: int
 
+class ModelOut(BaseModel):
+    modelId: int
+    modelName: str
+    manufactererId: int
@@ -1,21 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from ..database import SessionLocal
-from .models import ModelIn
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from .models import ModelIn, ModelOut
 from .schemas import Model
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/")
-async def create_model(model: ModelIn):
-    db = SessionLocal()
-    db_model = db.query(Model).filter(Model.manufactererId == model.manufacturerId and Model.modelName == model.name).first()
+async def create_model(model: ModelIn, db: AsyncSession = Depends(get_db)) -> ModelOut:
+    db_model = await db.scalar(select(Model).where(Model.manufactererId == model.manufacturerId, Model.modelName == model.name))
     if db_model:
         raise HTTPException(status_code=409, detail="Model Already Exists")
     db_model = Model(
@@ -23,36 +17,33 @@ async def create_model(model: ModelIn):
         manufactererId = model.manufacturerId
     )
     db.add(db_model)
-    db.commit()
-    db.refresh(db_model)
+    await db.commit()
+    await db.refresh(db_model)
     return db_model
 
 @router.get("/{model_id}")
-async def get_model(model_id: int):
-    db = SessionLocal()
-    db_model = db.query(Model).filter(Model.modelId == model_id).first()
+async def get_model(model_id: int, db: AsyncSession = Depends(get_db)) -> ModelOut:
+    db_model = await db.scalar(select(Model).where(Model.modelId == model_id))
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
     return db_model
 
 @router.put("/{model_id}")
-async def update_model(model_id: int, model: ModelIn):
-    db = SessionLocal()
-    db_model = db.query(Model).filter(Model.modelId == model_id).first()
+async def update_model(model_id: int, model: ModelIn, db: AsyncSession = Depends(get_db)) -> ModelOut:
+    db_model = await db.scalar(select(Model).where(Model.modelId == model_id))
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
     db_model.modelName = model.name
     db_model.manufactererId = model.manufacturerId
-    db.commit()
-    db.refresh(db_model)
+    await db.commit()
+    await db.refresh(db_model)
     return db_model
 
 @router.delete("/{model_id}")
-async def delete_model(model_id: int):
-    db = SessionLocal()
-    db_model = db.query(Model).filter(Model.modelId == model_id).first()
+async def delete_model(model_id: int, db: AsyncSession = Depends(get_db)) -> dict[str, str]:
+    db_model = await db.scalar(select(Model).where(Model.modelId == model_id))
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
-    db.delete(db_model)
-    db.commit()
+    await db.delete(db_model)
+    await db.commit()
     return {"message": "Model deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,183 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from sqlalchemy import event
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+class RequestProfile:
+    def __init__(self):
+        self.calls = Counter()
+        self.seconds = defaultdict(float)
+
+    def add(self, phase: str, seconds: float):
+        self.calls[phase] += 1
+        self.seconds[phase] += seconds
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self.durations = defaultdict(float)
+        self.counts = Counter()
+        self.phase_calls = Counter()
+        self.phase_seconds = defaultdict(float)
+        self.gauges = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, profile: RequestProfile):
+        with self.lock:
+            self.requests[(method, route, str(status))] += 1
+            key = (method, route)
+            self.counts[key] += 1
+            self.durations[key] += seconds
+            buckets = self.buckets[key]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            for phase, calls in profile.calls.items():
+                self.phase_calls[(route, phase)] += calls
+                self.phase_seconds[(route, phase)] += profile.seconds[phase]
+
+    def observe_phase(self, phase: str, seconds: float):
+        profile = current_profile.get()
+        if profile is not None:
+            profile.add(phase, seconds)
+            return
+        with self.lock:
+            self.phase_calls[("background", phase)] += 1
+            self.phase_seconds[("background", phase)] += seconds
+
+    def register_gauge(self, name: str, help: str, collect):
+        self.gauges[name] = (help, collect)
+
+    # Counters are kept per process. With several uvicorn workers each scrape reaches one of them,
+    # so every series is labelled with the worker's pid and dashboards sum across pids.
+    def render(self):
+        lines = []
+        pid = os.getpid()
+        def labels(**values):
+            return "{" + ",".join(f'{key}="{value}"' for key, value in {"pid": pid, **values}.items()) + "}"
+
+        with self.lock:
+            lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{labels(method=method, route=route, status=status)} {count}")
+
+            lines += ["# HELP http_request_duration_seconds Request latency.", "# TYPE http_request_duration_seconds histogram"]
+            for (method, route), buckets in sorted(self.buckets.items()):
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f"http_request_duration_seconds_bucket{labels(method=method, route=route, le=bound)} {count}")
+                lines.append(f"http_request_duration_seconds_bucket{labels(method=method, route=route, le='+Inf')} {self.counts[(method, route)]}")
+                lines.append(f"http_request_duration_seconds_sum{labels(method=method, route=route)} {self.durations[(method, route)]}")
+                lines.append(f"http_request_duration_seconds_count{labels(method=method, route=route)} {self.counts[(method, route)]}")
+
+            lines += ["# HELP phase_calls_total SQL statements, Redis round trips and bcrypt calls per route.", "# TYPE phase_calls_total counter"]
+            for (route, phase), calls in sorted(self.phase_calls.items()):
+                lines.append(f"phase_calls_total{labels(route=route, phase=phase)} {calls}")
+            lines += ["# HELP phase_seconds_total Time spent per phase per route.", "# TYPE phase_seconds_total counter"]
+            for (route, phase), seconds in sorted(self.phase_seconds.items()):
+                lines.append(f"phase_seconds_total{labels(route=route, phase=phase)} {seconds}")
+
+        for name, (help, collect) in sorted(self.gauges.items()):
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            for label_values, value in collect().items():
+                lines.append(f"{name}{labels(**dict(label_values))} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+@contextmanager
+def phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe_phase(name, time.perf_counter() - start)
+
+def instrument_engine(engine):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        metrics.observe_phase("sql", time.perf_counter() - conn.info["query_start"].pop())
+
+    def handle_error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            metrics.observe_phase("sql", time.perf_counter() - starts.pop())
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+def timed_call(name: str, func):
+    def wrapper(*args, **kwargs):
+        with phase(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+def instrument_redis(client):
+    client.execute_command = timed_call("redis", client.execute_command)
+    pipeline = client.pipeline
+
+    def instrumented_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        pipe.execute = timed_call("redis", pipe.execute)
+        return pipe
+
+    client.pipeline = instrumented_pipeline
+    return client
+
+class SamplingProfiler:
+    def __init__(self, interval: float, retention: float = 60.0):
+        self.interval = interval
+        self.samples = deque(maxlen=max(1, int(retention / interval)))
+        self.thread = None
+        self.target = None
+        self.stopped = threading.Event()
+
+    def start(self, target_thread_id: int):
+        self.target = target_thread_id
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples.append((time.perf_counter(), ";".join(reversed(stack))))
+
+    def collapsed(self, start: float, end: float):
+        stacks = Counter(stack for ts, stack in list(self.samples) if start <= ts <= end)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def dump(self, directory: str, route: str, start: float, end: float):
+        folded = self.collapsed(start, end)
+        if not folded:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        name = "".join(c if c.isalnum() else "_" for c in route).strip("_") or "root"
+        path = os.path.join(directory, f"{int(time.time() * 1000)}-{name}.folded")
+        with open(path, "w") as f:
+            f.write(folded)
+        return path
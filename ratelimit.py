@@ -0,0 +1,133 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from redis.exceptions import RedisError
+from .config import RATE_LIMIT_POLICY, RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW, RATE_LIMIT_FLEETS
+from .database import redis_client
+
+logger = logging.getLogger(__name__)
+
+SLIDING_WINDOW = "sliding_window"
+TOKEN_BUCKET = "token_bucket"
+
+class RatePolicy:
+    def __init__(self, kind: str = SLIDING_WINDOW, limit: int = 4, window: float = 60):
+        if kind not in (SLIDING_WINDOW, TOKEN_BUCKET):
+            raise ValueError(f"Unknown rate limit policy: {kind}")
+        self.kind = kind
+        self.limit = int(limit)
+        self.window = float(window)
+
+    def describe(self):
+        if self.kind == TOKEN_BUCKET:
+            return f"Max {self.limit} requests per {self.window:g} seconds (burst {self.limit})"
+        return f"Max {self.limit} requests per {self.window:g} seconds"
+
+DEFAULT_POLICY = RatePolicy(RATE_LIMIT_POLICY, RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW)
+FLEET_POLICIES = {int(fleet_id): RatePolicy(**policy) for fleet_id, policy in json.loads(RATE_LIMIT_FLEETS).items()}
+
+def policy_for(fleet_id):
+    return FLEET_POLICIES.get(fleet_id, DEFAULT_POLICY)
+
+def rate_key(vin: int, policy: RatePolicy):
+    return f"ratelimit:{policy.kind}:{vin}"
+
+RATE_LIMIT_SCRIPT = redis_client.register_script("""
+local now = tonumber(ARGV[1])
+local result = {}
+for i, key in ipairs(KEYS) do
+    local base = 1 + (i - 1) * 3
+    local kind = ARGV[base + 1]
+    local limit = tonumber(ARGV[base + 2])
+    local window = tonumber(ARGV[base + 3])
+    local allowed = 0
+    local retry = 0
+
+    if kind == 'token_bucket' then
+        local rate = limit / window
+        local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+        local tokens = tonumber(bucket[1]) or limit
+        local ts = tonumber(bucket[2]) or now
+        tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        else
+            retry = math.ceil((1 - tokens) / rate)
+        end
+        redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+        redis.call('PEXPIRE', key, math.ceil(window))
+    else
+        redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+        if redis.call('ZCARD', key) < limit then
+            local seq = redis.call('INCR', key .. ':seq')
+            redis.call('PEXPIRE', key .. ':seq', math.ceil(window))
+            redis.call('ZADD', key, now, now .. ':' .. seq)
+            allowed = 1
+        else
+            local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+            retry = math.ceil(tonumber(oldest[2]) + window - now)
+        end
+        redis.call('PEXPIRE', key, math.ceil(window))
+    end
+
+    table.insert(result, allowed)
+    table.insert(result, retry)
+end
+return result
+""")
+
+class LocalLimiter:
+    def __init__(self):
+        self.windows = {}
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def check(self, key: str, policy: RatePolicy, now: float):
+        window = policy.window * 1000
+        with self.lock:
+            if policy.kind == TOKEN_BUCKET:
+                rate = policy.limit / window
+                tokens, ts = self.buckets.get(key, (policy.limit, now))
+                tokens = min(policy.limit, tokens + max(0, now - ts) * rate)
+                if tokens >= 1:
+                    self.buckets[key] = (tokens - 1, now)
+                    return True, 0
+                self.buckets[key] = (tokens, now)
+                return False, math.ceil((1 - tokens) / rate)
+
+            hits = self.windows.setdefault(key, deque())
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) < policy.limit:
+                hits.append(now)
+                return True, 0
+            return False, math.ceil(hits[0] + window - now)
+
+local_limiter = LocalLimiter()
+
+def check_rate_limits(requests):
+    if not requests:
+        return []
+    now = time.time() * 1000
+    policies = [policy_for(fleet_id) for _, fleet_id in requests]
+    keys = [rate_key(vin, policy) for (vin, _), policy in zip(requests, policies)]
+    args = [now]
+    for policy in policies:
+        args.extend([policy.kind, policy.limit, policy.window * 1000])
+
+    try:
+        flat = RATE_LIMIT_SCRIPT(keys=keys, args=args)
+        results = [(bool(flat[i]), flat[i + 1]) for i in range(0, len(flat), 2)]
+    except RedisError:
+        logger.warning("Redis unavailable, falling back to in-process rate limiting", exc_info=True)
+        results = [local_limiter.check(key, policy, now) for key, policy in zip(keys, policies)]
+
+    return [(allowed, math.ceil(retry / 1000)) for allowed, retry in results]
+
+def is_rate_limited(vin: int, fleet_id):
+    allowed, retry_after = check_rate_limits([(vin, fleet_id)])[0]
+    return not allowed, retry_after
@@ -0,0 +1,168 @@
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from sqlalchemy import event, insert, make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.schema import AddConstraint
+from .config import TELEMETRY_PARTITIONS_AHEAD
+
+PARTITION_WIDTH = timedelta(days=1)
+
+def utc(value: datetime):
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+class StorageBackend:
+    name = "default"
+
+    def configure(self, engine):
+        pass
+
+    def prepare_time_series(self, conn, table, time_column: str):
+        pass
+
+    def maintain_time_series(self, conn, table, time_column: str, now: datetime):
+        pass
+
+    async def bulk_insert(self, db: AsyncSession, table, rows):
+        if rows:
+            await db.execute(insert(table), rows)
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, in_memory: bool):
+        self.in_memory = in_memory
+
+    def configure(self, engine):
+        event.listen(engine, "connect", self.on_connect)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not self.in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+class PostgresBackend(StorageBackend):
+    name = "postgresql"
+
+    def copy_value(self, value):
+        if isinstance(value, Enum):
+            return value.value
+        if isinstance(value, datetime) and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+    async def bulk_insert(self, db: AsyncSession, table, rows):
+        if not rows:
+            return
+        columns = list(rows[0])
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        if not hasattr(driver, "copy_records_to_table"):
+            await super().bulk_insert(db, table, rows)
+            return
+        if not driver.is_in_transaction():
+            # asyncpg's adapter sends BEGIN lazily with the first statement; without one the COPY would
+            # autocommit outside the session and survive a rollback.
+            await conn.exec_driver_sql("SELECT 1")
+        if not (conn.in_transaction() and driver.is_in_transaction()):
+            await super().bulk_insert(db, table, rows)
+            return
+        await driver.copy_records_to_table(
+            table.name,
+            columns=columns,
+            records=[tuple(self.copy_value(row[column]) for column in columns) for row in rows]
+        )
+
+class TimescaleBackend(PostgresBackend):
+    name = "timescale"
+
+    def prepare_time_series(self, conn, table, time_column: str):
+        preparer = conn.dialect.identifier_preparer
+        table_name = preparer.format_table(table)
+        key_columns = ", ".join(preparer.quote(column.name) for column in table.primary_key.columns)
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb"))
+        conn.execute(text(
+            f"ALTER TABLE {table_name} DROP CONSTRAINT IF EXISTS {preparer.quote(table.name + '_pkey')}, "
+            f"ADD PRIMARY KEY ({key_columns}, {preparer.quote(time_column)})"
+        ))
+        conn.execute(
+            text("SELECT create_hypertable(:table, :column, if_not_exists => TRUE, migrate_data => TRUE)"),
+            {"table": table.name, "column": time_column}
+        )
+
+class PartitionedPostgresBackend(PostgresBackend):
+    name = "partitioned"
+
+    def is_partitioned(self, conn, table):
+        return conn.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+            {"table": table.fullname}
+        ).first() is not None
+
+    def prepare_time_series(self, conn, table, time_column: str):
+        if not self.is_partitioned(conn, table):
+            self.partition_table(conn, table, time_column)
+        self.maintain_time_series(conn, table, time_column, datetime.utcnow())
+
+    def partition_table(self, conn, table, time_column: str):
+        preparer = conn.dialect.identifier_preparer
+        table_name = preparer.format_table(table)
+        legacy_name = table.name + "_unpartitioned"
+        legacy = preparer.quote(legacy_name)
+        time = preparer.quote(time_column)
+        key_columns = ", ".join(preparer.quote(column.name) for column in table.primary_key.columns)
+        conn.execute(text(f"ALTER TABLE {table_name} RENAME TO {legacy}"))
+        conn.execute(text(
+            f"CREATE TABLE {table_name} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS, "
+            f"PRIMARY KEY ({key_columns}, {time})) PARTITION BY RANGE ({time})"
+        ))
+        conn.execute(text(f"CREATE TABLE {preparer.quote(table.name + '_default')} PARTITION OF {table_name} DEFAULT"))
+        first, last = conn.execute(text(f"SELECT min({time}), max({time}) FROM {legacy}")).one()
+        if first is not None:
+            self.ensure_partitions(conn, table, first, last)
+        conn.execute(text(f"INSERT INTO {table_name} SELECT * FROM {legacy}"))
+        for column in table.columns:
+            sequence = conn.execute(
+                text("SELECT pg_get_serial_sequence(:table, :column)"), {"table": legacy_name, "column": column.name}
+            ).scalar()
+            if sequence:
+                conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table_name}.{preparer.quote(column.name)}"))
+        conn.execute(text(f"DROP TABLE {legacy}"))
+        for constraint in table.foreign_key_constraints:
+            conn.execute(AddConstraint(constraint))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+    def ensure_partitions(self, conn, table, start: datetime, end: datetime):
+        preparer = conn.dialect.identifier_preparer
+        day = utc(start).replace(hour=0, minute=0, second=0, microsecond=0)
+        end = utc(end)
+        while day <= end:
+            upper = day + PARTITION_WIDTH
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {preparer.quote(table.name + day.strftime('_%Y%m%d'))} "
+                f"PARTITION OF {preparer.format_table(table)} "
+                f"FOR VALUES FROM ('{day.isoformat()}+00:00') TO ('{upper.isoformat()}+00:00')"
+            ))
+            day = upper
+
+    def maintain_time_series(self, conn, table, time_column: str, now: datetime):
+        self.ensure_partitions(conn, table, now, now + PARTITION_WIDTH * TELEMETRY_PARTITIONS_AHEAD)
+
+def backend_for(url: str, name: str = ""):
+    url = make_url(url)
+    name = name or url.get_backend_name()
+    if name == "sqlite":
+        return SQLiteBackend(in_memory=url.database in (None, "", ":memory:"))
+    if name == "timescale":
+        return TimescaleBackend()
+    if name == "partitioned":
+        return PartitionedPostgresBackend()
+    if name == "postgresql":
+        return PostgresBackend()
+    return StorageBackend()
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+import msgpack
+import orjson
+from .models import engineStatuses, utc_naive
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+ENGINE_STATUSES = {status.value: status for status in engineStatuses}
+
+def parse_timestamp(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif isinstance(value, (int, float)):
+        value = datetime.fromtimestamp(value, tz=timezone.utc)
+    elif not isinstance(value, datetime):
+        raise TypeError("Invalid timestamp")
+    return value if value.tzinfo is None else utc_naive(value)
+
+COLUMN_TYPES = {
+    "vin": int,
+    "password": str,
+    "latitude": float,
+    "longitude": float,
+    "speed": float,
+    "engineStatus": ENGINE_STATUSES.__getitem__,
+    "fuel": float,
+    "odometerReading": float,
+    "diagnosticCode": int,
+    "timestamp": parse_timestamp,
+}
+COMPACT_COLUMNS = list(COLUMN_TYPES)
+
+class CompactFormatError(ValueError):
+    pass
+
+def decode_body(body: bytes, content_type: str):
+    try:
+        if content_type.split(";")[0].strip() in MSGPACK_TYPES:
+            payload = msgpack.unpackb(body, timestamp=3)
+        else:
+            payload = orjson.loads(body)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise CompactFormatError(f"Malformed body: {e}")
+
+    if isinstance(payload, list):
+        columns, rows = COMPACT_COLUMNS, payload
+    elif isinstance(payload, dict) and isinstance(payload.get("rows"), list):
+        columns, rows = payload.get("columns") or COMPACT_COLUMNS, payload["rows"]
+    else:
+        raise CompactFormatError("Body must be an array of rows or an object with columns and rows")
+    if sorted(columns) != sorted(COMPACT_COLUMNS):
+        raise CompactFormatError(f"Columns must be exactly {', '.join(COMPACT_COLUMNS)}")
+    return columns, rows
+
+def decode_records(body: bytes, content_type: str):
+    columns, rows = decode_body(body, content_type)
+    converters = [(column, COLUMN_TYPES[column]) for column in columns]
+    width = len(columns)
+    records = []
+    for values in rows:
+        if not isinstance(values, list) or len(values) != width:
+            records.append(None)
+            continue
+        try:
+            row = {column: convert(value) for (column, convert), value in zip(converters, values)}
+        except (KeyError, TypeError, ValueError):
+            records.append(None)
+            continue
+        records.append((row.pop("password"), row))
+    return records
@@ -0,0 +1,52 @@
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .schemas import Telemetry, VehicleLatestState
+
+LATEST_STATE_COLUMNS = ["latitude", "longitude", "speed", "odometerReading", "fuel", "engineStatus", "timestamp"]
+
+def latest_state_row(row: dict):
+    state = {column: row[column] for column in LATEST_STATE_COLUMNS}
+    state["vin"] = row["vin"]
+    return state
+
+def newest_per_vin(rows):
+    newest = {}
+    for row in rows:
+        current = newest.get(row["vin"])
+        if current is None or current["timestamp"] <= row["timestamp"]:
+            newest[row["vin"]] = row
+    return [latest_state_row(row) for row in newest.values()]
+
+async def upsert_latest_state(db: AsyncSession, rows):
+    if not rows:
+        return
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    table = VehicleLatestState.__table__
+    stmt = dialect.insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.vin],
+        set_={column: stmt.excluded[column] for column in LATEST_STATE_COLUMNS},
+        where=table.c.timestamp <= stmt.excluded.timestamp
+    )
+    await db.execute(stmt, newest_per_vin(rows))
+
+def rebuild_latest_state(db: Session):
+    ranked = select(
+        Telemetry.vin,
+        *[getattr(Telemetry, column) for column in LATEST_STATE_COLUMNS],
+        func.row_number().over(
+            partition_by=Telemetry.vin,
+            order_by=(Telemetry.timestamp.desc(), Telemetry.telemetryId.desc())
+        ).label("rank")
+    ).subquery()
+    columns = ["vin"] + LATEST_STATE_COLUMNS
+    db.query(VehicleLatestState).delete()
+    db.execute(
+        insert(VehicleLatestState).from_select(
+            columns,
+            select(*[ranked.c[column] for column in columns]).where(ranked.c.rank == 1)
+        )
+    )
+    db.commit()
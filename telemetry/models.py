@@ -1,13 +1,40 @@
 from enum import Enum    
-from typing import List
-from pydantic import BaseModel
-from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, field_validator
+from datetime import datetime, timedelta, timezone
 
 class engineStatuses(str, Enum):
     on = "on"
     off = "off"
     idle = "idle"
 
+class distanceWindows(str, Enum):
+    hour = "1h"
+    day = "24h"
+    week = "7d"
+
+WINDOW_DELTAS = {
+    distanceWindows.hour: timedelta(hours=1),
+    distanceWindows.day: timedelta(hours=24),
+    distanceWindows.week: timedelta(days=7),
+}
+
+class rollupTiers(str, Enum):
+    minute = "1m"
+    hour = "1h"
+    day = "1d"
+
+TIER_WIDTHS = {
+    rollupTiers.minute.value: timedelta(minutes=1),
+    rollupTiers.hour.value: timedelta(hours=1),
+    rollupTiers.day.value: timedelta(days=1),
+}
+
+def utc_naive(ts: datetime):
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
 class TelemetryIn(BaseModel):
     vin: int
     latitude: float
@@ -20,5 +47,64 @@ class TelemetryIn(BaseModel):
     password: str
     timestamp: datetime
 
+    @field_validator("timestamp")
+    @classmethod
+    def normalize_timestamp(cls, value: datetime):
+        return utc_naive(value)
+
 class TelemetryInList(BaseModel):
     tel: List[TelemetryIn]
+
+class TelemetryOut(BaseModel):
+    telemetryId: int
+    vin: int
+    latitude: float
+    longitude: float
+    speed: float
+    engineStatus: engineStatuses
+    fuel: float
+    odometerReading: int
+    diagnosticCode: int
+    timestamp: datetime
+
+class TelemetryResult(BaseModel):
+    index: int
+    vin: Optional[int] = None
+    accepted: bool
+    detail: Optional[str] = None
+
+class TelemetryBatchOut(BaseModel):
+    success: bool
+    accepted: int
+    rejected: int
+    results: List[TelemetryResult]
+
+class RollupOut(BaseModel):
+    tier: rollupTiers
+    vin: int
+    bucket: datetime
+    samples: int
+    speedMin: float
+    speedMax: float
+    speedAvg: float
+    fuelFirst: float
+    fuelLast: float
+    odometerFirst: int
+    odometerLast: int
+    onSeconds: float
+
+class TripOut(BaseModel):
+    tripId: Optional[int] = None
+    vin: int
+    open: bool = False
+    startTime: datetime
+    endTime: datetime
+    samples: int
+    odometerStart: float
+    odometerEnd: float
+    odometerDistance: float
+    haversineDistance: float
+    maxSpeed: float
+    avgSpeed: float
+    idleSeconds: float
+    fuelUsed: float
@@ -0,0 +1,397 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import (
+    ROLLUP_INTERVAL, ROLLUP_LAG, ROLLUP_MIN_POINTS, ROLLUP_DELETE_BATCH, ROLLUP_LOCK_TTL, ROLLUP_REROLL_BATCH, VEHICLE_STALE_SECONDS,
+    TELEMETRY_RETENTION_DAYS, ROLLUP_MINUTE_RETENTION_DAYS, ROLLUP_HOUR_RETENTION_DAYS, ROLLUP_DAY_RETENTION_DAYS
+)
+from ..database import AsyncSessionLocal, redis_client, storage_backend
+from .models import TIER_WIDTHS, engineStatuses, rollupTiers, utc_naive
+from .schemas import RollupWatermark, Telemetry, TelemetryRollup, VehicleLatestState
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+RAW = "raw"
+MINUTE, HOUR, DAY = rollupTiers.minute.value, rollupTiers.hour.value, rollupTiers.day.value
+TIERS = [MINUTE, HOUR, DAY]
+SOURCES = {MINUTE: RAW, HOUR: MINUTE, DAY: HOUR}
+CHUNKS = {MINUTE: timedelta(hours=1), HOUR: timedelta(days=1), DAY: timedelta(days=30)}
+RETENTION_DAYS = {
+    RAW: TELEMETRY_RETENTION_DAYS,
+    MINUTE: ROLLUP_MINUTE_RETENTION_DAYS,
+    HOUR: ROLLUP_HOUR_RETENTION_DAYS,
+    DAY: ROLLUP_DAY_RETENTION_DAYS,
+}
+ROLLUP_COLUMNS = [
+    "samples", "speedMin", "speedMax", "speedSum", "fuelFirst", "fuelLast",
+    "odometerFirst", "odometerLast", "firstAt", "lastAt", "onSeconds"
+]
+STREAM_CHUNK = 10000
+LEADER_KEY = "rollup:leader"
+ROLLING_KEY = "rollup:rolling_until"
+LATE_KEY = "rollup:late"
+
+RELEASE_SCRIPT = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+def floor_to(ts: datetime, width: timedelta):
+    return ts - (ts - EPOCH) % width
+
+def epoch_seconds(ts: datetime):
+    return (ts - EPOCH).total_seconds()
+
+def retained_since(tier: str, now: datetime):
+    days = RETENTION_DAYS[tier]
+    return now - timedelta(days=days) if days > 0 else None
+
+def merge(into: dict, other: dict):
+    into["samples"] += other["samples"]
+    into["speedMin"] = min(into["speedMin"], other["speedMin"])
+    into["speedMax"] = max(into["speedMax"], other["speedMax"])
+    into["speedSum"] += other["speedSum"]
+    into["onSeconds"] += other["onSeconds"]
+    if other["firstAt"] < into["firstAt"]:
+        into["firstAt"], into["fuelFirst"], into["odometerFirst"] = other["firstAt"], other["fuelFirst"], other["odometerFirst"]
+    if other["lastAt"] >= into["lastAt"]:
+        into["lastAt"], into["fuelLast"], into["odometerLast"] = other["lastAt"], other["fuelLast"], other["odometerLast"]
+
+def fold_into(buckets: dict, rollup: dict, tier: str):
+    bucket = floor_to(rollup["bucket"], TIER_WIDTHS[tier])
+    current = buckets.get(bucket)
+    if current is None:
+        buckets[bucket] = {**rollup, "tier": tier, "bucket": bucket}
+    else:
+        merge(current, rollup)
+
+async def raw_samples(db: AsyncSession, start: datetime, end: datetime, vins=None):
+    gap = timedelta(seconds=VEHICLE_STALE_SECONDS)
+    stmt = (
+        select(Telemetry.vin, Telemetry.timestamp, Telemetry.speed, Telemetry.fuel, Telemetry.odometerReading, Telemetry.engineStatus)
+        .where(Telemetry.timestamp >= start - gap, Telemetry.timestamp < end)
+    )
+    if vins is not None:
+        stmt = stmt.where(Telemetry.vin.in_(vins))
+    result = await db.stream(
+        stmt.order_by(Telemetry.vin, Telemetry.timestamp).execution_options(yield_per=STREAM_CHUNK)
+    )
+    previous = None
+    async for vin, timestamp, speed, fuel, odometer, status in result:
+        timestamp = utc_naive(timestamp)
+        on_seconds = 0.0
+        if previous is not None and previous[0] == vin and previous[2] == engineStatuses.on and timestamp - previous[1] <= gap:
+            on_seconds = (timestamp - previous[1]).total_seconds()
+        previous = (vin, timestamp, status)
+        if timestamp < start:
+            continue
+        yield {
+            "vin": vin, "bucket": timestamp, "samples": 1,
+            "speedMin": speed, "speedMax": speed, "speedSum": speed,
+            "fuelFirst": fuel, "fuelLast": fuel,
+            "odometerFirst": odometer, "odometerLast": odometer,
+            "firstAt": timestamp, "lastAt": timestamp, "onSeconds": on_seconds
+        }
+
+def rollup_row(rollup: TelemetryRollup):
+    return {"vin": rollup.vin, "bucket": rollup.bucket, **{column: getattr(rollup, column) for column in ROLLUP_COLUMNS}}
+
+async def source_rows(db: AsyncSession, tier: str, start: datetime, end: datetime, vins=None):
+    if tier == MINUTE:
+        async for sample in raw_samples(db, start, end, vins):
+            yield sample
+        return
+    stmt = (
+        select(TelemetryRollup)
+        .where(TelemetryRollup.tier == SOURCES[tier], TelemetryRollup.bucket >= start, TelemetryRollup.bucket < end)
+    )
+    if vins is not None:
+        stmt = stmt.where(TelemetryRollup.vin.in_(vins))
+    result = await db.stream(
+        stmt.order_by(TelemetryRollup.vin, TelemetryRollup.bucket).execution_options(yield_per=STREAM_CHUNK)
+    )
+    async for rollup in result.scalars():
+        yield rollup_row(rollup)
+
+async def source_rollups(db: AsyncSession, tier: str, start: datetime, end: datetime, vins=None):
+    vin = None
+    buckets = {}
+    async for row in source_rows(db, tier, start, end, vins):
+        if row["vin"] != vin:
+            if buckets:
+                yield list(buckets.values())
+            buckets = {}
+            vin = row["vin"]
+        fold_into(buckets, row, tier)
+    if buckets:
+        yield list(buckets.values())
+
+def dialect_for(db: AsyncSession):
+    return postgresql if db.bind.dialect.name == "postgresql" else sqlite
+
+async def upsert_rollups(db: AsyncSession, rows):
+    if not rows:
+        return
+    table = TelemetryRollup.__table__
+    stmt = dialect_for(db).insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.tier, table.c.vin, table.c.bucket],
+        set_={column: stmt.excluded[column] for column in ROLLUP_COLUMNS}
+    )
+    await db.execute(stmt, rows)
+
+async def roll_range(db: AsyncSession, tier: str, start: datetime, end: datetime, vins=None):
+    rolled = 0
+    async for rows in source_rollups(db, tier, start, end, vins):
+        await upsert_rollups(db, rows)
+        rolled += len(rows)
+    return rolled
+
+async def set_watermark(db: AsyncSession, tier: str, until: datetime):
+    table = RollupWatermark.__table__
+    stmt = dialect_for(db).insert(table).values(tier=tier, until=until)
+    await db.execute(stmt.on_conflict_do_update(index_elements=[table.c.tier], set_={"until": stmt.excluded.until}))
+
+async def load_watermarks(db: AsyncSession):
+    return {tier: until for tier, until in await db.execute(select(RollupWatermark.tier, RollupWatermark.until))}
+
+async def first_bucket(db: AsyncSession, tier: str, after: Optional[datetime] = None):
+    if SOURCES[tier] == RAW:
+        stmt = select(func.min(Telemetry.timestamp))
+        if after is not None:
+            stmt = stmt.where(Telemetry.timestamp >= after)
+    else:
+        stmt = select(func.min(TelemetryRollup.bucket)).where(TelemetryRollup.tier == SOURCES[tier])
+        if after is not None:
+            stmt = stmt.where(TelemetryRollup.bucket >= after)
+    first = await db.scalar(stmt)
+    return floor_to(utc_naive(first), TIER_WIDTHS[tier]) if first is not None else None
+
+async def roll_tier(db: AsyncSession, tier: str, now: datetime):
+    width = TIER_WIDTHS[tier]
+    watermarks = await load_watermarks(db)
+    if SOURCES[tier] == RAW:
+        limit = floor_to(now - timedelta(seconds=ROLLUP_LAG), width)
+    elif SOURCES[tier] in watermarks:
+        limit = floor_to(watermarks[SOURCES[tier]], width)
+    else:
+        return 0
+    start = watermarks.get(tier) or await first_bucket(db, tier)
+    if SOURCES[tier] == RAW:
+        redis_client.set(ROLLING_KEY, epoch_seconds(limit))
+    rolled = 0
+    while start is not None and start < limit:
+        end = min(start + CHUNKS[tier], limit)
+        rows = await roll_range(db, tier, start, end)
+        await set_watermark(db, tier, end)
+        await db.commit()
+        rolled += rows
+        start = end
+        if not rows and start < limit:
+            following = await first_bucket(db, tier, after=start)
+            start = max(start, following) if following is not None else None
+            if start is None:
+                await set_watermark(db, tier, limit)
+                await db.commit()
+    return rolled
+
+def mark_late(rows):
+    rolling = redis_client.get(ROLLING_KEY)
+    if rolling is None or not rows:
+        return
+    rolling = float(rolling)
+    late = set()
+    for row in rows:
+        timestamp = utc_naive(row["timestamp"])
+        if epoch_seconds(timestamp) < rolling:
+            late.add(f"{row['vin']}:{int(epoch_seconds(floor_to(timestamp, TIER_WIDTHS[HOUR])))}")
+    if late:
+        redis_client.sadd(LATE_KEY, *late)
+
+async def reroll_late(db: AsyncSession, now: datetime):
+    hours = defaultdict(set)
+    for member in redis_client.spop(LATE_KEY, ROLLUP_REROLL_BATCH) or []:
+        vin, hour = member.decode().split(":")
+        hours[EPOCH + timedelta(seconds=int(hour))].add(int(vin))
+    watermarks = await load_watermarks(db)
+    rerolled = 0
+    for hour, vins in sorted(hours.items()):
+        for tier in TIERS:
+            start = floor_to(hour, TIER_WIDTHS[tier])
+            retained = retained_since(SOURCES[tier], now)
+            if tier not in watermarks or watermarks[tier] <= start or (retained is not None and start < retained):
+                break
+            rerolled += await roll_range(db, tier, start, start + max(TIER_WIDTHS[tier], TIER_WIDTHS[HOUR]), list(vins))
+            await db.commit()
+    return rerolled
+
+async def prune_batch(db: AsyncSession, tier: str, cutoff: datetime):
+    if tier == RAW:
+        batch = select(Telemetry.telemetryId).where(Telemetry.timestamp < cutoff).limit(ROLLUP_DELETE_BATCH)
+        stmt = delete(Telemetry).where(Telemetry.telemetryId.in_(batch))
+    else:
+        key = tuple_(TelemetryRollup.tier, TelemetryRollup.vin, TelemetryRollup.bucket)
+        batch = (
+            select(TelemetryRollup.tier, TelemetryRollup.vin, TelemetryRollup.bucket)
+            .where(TelemetryRollup.tier == tier, TelemetryRollup.bucket < cutoff)
+            .limit(ROLLUP_DELETE_BATCH)
+        )
+        stmt = delete(TelemetryRollup).where(key.in_(batch))
+    result = await db.execute(stmt.execution_options(synchronize_session=False))
+    await db.commit()
+    return result.rowcount
+
+async def prune(db: AsyncSession, now: datetime):
+    watermarks = await load_watermarks(db)
+    pruned = Counter()
+    for tier, rolled_into in [(RAW, MINUTE), (MINUTE, HOUR), (HOUR, DAY), (DAY, None)]:
+        cutoff = retained_since(tier, now)
+        if cutoff is None:
+            continue
+        if rolled_into is not None:
+            if rolled_into not in watermarks:
+                continue
+            cutoff = min(cutoff, watermarks[rolled_into])
+        while True:
+            deleted = await prune_batch(db, tier, cutoff)
+            pruned[tier] += deleted
+            if deleted < ROLLUP_DELETE_BATCH:
+                break
+            await asyncio.sleep(0)
+    return pruned
+
+async def pick_tier(db: AsyncSession, since: datetime, span: timedelta, needed_until: Optional[datetime] = None):
+    now = datetime.utcnow()
+    watermarks = await load_watermarks(db)
+    for tier in reversed(TIERS):
+        if TIER_WIDTHS[tier] * ROLLUP_MIN_POINTS > span:
+            continue
+        retained = retained_since(tier, now)
+        if retained is not None and since < retained:
+            continue
+        if tier not in watermarks or (needed_until is not None and watermarks[tier] < needed_until):
+            continue
+        return tier
+    return RAW
+
+async def point_tier(db: AsyncSession, cutoff: datetime):
+    retained = retained_since(RAW, datetime.utcnow())
+    if retained is None or cutoff >= retained:
+        return RAW
+    watermarks = await load_watermarks(db)
+    for tier in TIERS:
+        retained = retained_since(tier, datetime.utcnow())
+        if (retained is None or cutoff >= retained) and tier in watermarks and watermarks[tier] >= cutoff:
+            return tier
+    return RAW
+
+def odometer_before(tier: str, cutoff: datetime):
+    if tier == RAW:
+        stmt = (
+            select(Telemetry.odometerReading)
+            .where(Telemetry.vin == VehicleLatestState.vin, Telemetry.timestamp < cutoff)
+            .order_by(Telemetry.timestamp.desc())
+        )
+    else:
+        stmt = (
+            select(TelemetryRollup.odometerLast)
+            .where(
+                TelemetryRollup.tier == tier,
+                TelemetryRollup.vin == VehicleLatestState.vin,
+                TelemetryRollup.bucket <= cutoff - TIER_WIDTHS[tier]
+            )
+            .order_by(TelemetryRollup.bucket.desc())
+        )
+    return stmt.limit(1).correlate(VehicleLatestState).scalar_subquery()
+
+def odometer_from(tier: str, cutoff: datetime):
+    if tier == RAW:
+        stmt = (
+            select(Telemetry.odometerReading)
+            .where(Telemetry.vin == VehicleLatestState.vin, Telemetry.timestamp >= cutoff)
+            .order_by(Telemetry.timestamp)
+        )
+    else:
+        stmt = (
+            select(TelemetryRollup.odometerFirst)
+            .where(TelemetryRollup.tier == tier, TelemetryRollup.vin == VehicleLatestState.vin, TelemetryRollup.bucket >= cutoff)
+            .order_by(TelemetryRollup.bucket)
+        )
+    return stmt.limit(1).correlate(VehicleLatestState).scalar_subquery()
+
+class RollupScheduler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.task = None
+        self.stats = Counter()
+        self.last_run_ms = 0.0
+
+    @property
+    def running(self):
+        return self.task is not None
+
+    async def run_once(self):
+        token = uuid.uuid4().hex
+        if not redis_client.set(LEADER_KEY, token, nx=True, ex=ROLLUP_LOCK_TTL):
+            self.stats["skipped"] += 1
+            return False
+        try:
+            now = datetime.utcnow()
+            async with AsyncSessionLocal() as db:
+                await db.run_sync(lambda session: storage_backend.maintain_time_series(
+                    session.connection(), Telemetry.__table__, "timestamp", now
+                ))
+                await db.commit()
+                for tier in TIERS:
+                    self.stats[f"rolled_{tier}"] += await roll_tier(db, tier, now)
+                self.stats["rerolled"] += await reroll_late(db, now)
+                for tier, deleted in (await prune(db, now)).items():
+                    self.stats[f"pruned_{tier}"] += deleted
+        finally:
+            RELEASE_SCRIPT(keys=[LEADER_KEY], args=[token])
+        return True
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            try:
+                if await self.run_once():
+                    self.stats["runs"] += 1
+            except Exception:
+                self.stats["failed"] += 1
+                logger.exception("Telemetry rollup failed")
+            self.last_run_ms = (time.perf_counter() - started) * 1000
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def snapshot(self):
+        async with AsyncSessionLocal() as db:
+            watermarks = await load_watermarks(db)
+        return {**self.stats, "last_run_ms": self.last_run_ms, "watermarks": watermarks}
+
+rollup_scheduler = RollupScheduler(ROLLUP_INTERVAL)
+
+if __name__ == "__main__":
+    asyncio.run(rollup_scheduler.run_once())
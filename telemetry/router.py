@@ -1,156 +1,268 @@
-from fastapi import APIRouter, HTTPException
-from ..database import SessionLocal
-from .models import TelemetryIn, TelemetryInList
-from .schemas import Telemetry
-from ..alert.schemas import Alert
-from sqlalchemy.orm import Session
-from ..database import redis_client, verify_password
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from ..config import INGEST_MODE
+from .models import RollupOut, TelemetryBatchOut, TelemetryIn, TelemetryInList, TelemetryOut, TripOut, TIER_WIDTHS, rollupTiers, utc_naive
+from .compact import CompactFormatError, decode_records
+from .schemas import Telemetry, TelemetryRollup, Trip
+from .rollup import MINUTE, RAW, pick_tier
+from .trips import current_trip
+from ..credentials import check_credential
+from ..ratelimit import check_rate_limits, is_rate_limited, policy_for
+from .writer import publish_telemetry, telemetry_writer, write_telemetry
+from ..export import PAGE_SIZE, export, exportFormats
 from ..vehicle.schemas import Vehicle
 
-def is_rate_limited(vin: str) -> bool:
-    key = f"rate_limit:{vin}"
-    current = redis_client.get(key)
+router = APIRouter()
 
-    if current is None:
-        redis_client.set(key, 1, ex=60)
-        return False
-    elif int(current) >= 4:
-        return True
-    else:
-        redis_client.incr(key)
-        return False
+def buffered():
+    return INGEST_MODE == "buffered" and telemetry_writer.running
 
-router = APIRouter()
+def telemetry_row(telemetry: TelemetryIn):
+    return {
+        "vin": telemetry.vin,
+        "latitude": telemetry.latitude,
+        "longitude": telemetry.longitude,
+        "speed": telemetry.speed,
+        "engineStatus": telemetry.engineStatus,
+        "fuel": telemetry.fuel,
+        "odometerReading": telemetry.odometerReading,
+        "diagnosticCode": telemetry.diagnosticCode,
+        "timestamp": telemetry.timestamp
+    }
 
-def check_speed_limis(telemtry: TelemetryIn, db):
-    if telemtry.speed > 120:
-        db_alert = Alert(
-            vin = telemtry.vin,
-            alertTypeId = 1
-        )
-        db.add(db_alert)
-        db.commit()
-
-def check_fuel(telemtry: TelemetryIn, db):
-    if telemtry.fuel < 0.15:
-        db_alert = Alert(
-            vin = telemtry.vin,
-            alertTypeId = 2
-        )
-        db.add(db_alert)
-        db.commit()
-    
-def validateRequest(telemetry: TelemetryIn, db: Session):
-    password = db.query(Vehicle.password).filter(Vehicle.vin).first()[0]
-    return verify_password(telemetry.password,password)
+async def validateRequest(telemetry: TelemetryIn, db: AsyncSession):
+    vehicle = (await db.execute(select(Vehicle.password, Vehicle.authMode, Vehicle.fleetId).where(Vehicle.vin == telemetry.vin))).first()
+    if not vehicle or not await check_credential(telemetry.vin, telemetry.password, vehicle.password, vehicle.authMode):
+        return None
+    return vehicle
 
-def handle_telemetry(telemetry, db: Session):
-    if not validateRequest(telemetry, db):
+async def handle_telemetry(telemetry, db: AsyncSession):
+    vehicle = await validateRequest(telemetry, db)
+    if not vehicle:
         raise HTTPException(status_code=401, detail="Wrong Password for Vehicle")
     
-    if is_rate_limited(telemetry.vin):
-        raise HTTPException(status_code=429, detail="Rate limit exceeded: Max 2 requests per minute.")
+    limited, retry_after = is_rate_limited(telemetry.vin, vehicle.fleetId)
+    if limited:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded: {policy_for(vehicle.fleetId).describe()}.",
+            headers={"Retry-After": str(retry_after)}
+        )
     
-    check_speed_limis(telemetry, db)
-    check_fuel(telemetry, db)
-
-    db_telemetry = Telemetry(
-        vin = telemetry.vin,
-        latitude = telemetry.latitude,
-        longitude = telemetry.longitude,
-        speed = telemetry.speed,
-        engineStatus = telemetry.engineStatus,
-        fuel = telemetry.fuel,
-        odometerReading = telemetry.odometerReading,
-        diagnosticCode = telemetry.diagnosticCode,
-        timestamp = telemetry.timestamp
-    )
+    row = telemetry_row(telemetry)
+    if buffered():
+        if not telemetry_writer.submit([(row, vehicle.fleetId)]):
+            raise HTTPException(status_code=503, detail="Ingest buffer full", headers={"Retry-After": "1"})
+        return
 
-    fleet_id = db.query(Vehicle.fleetId).filter(Vehicle.vin == telemetry.vin).first()[0]
-    redis_client.set(f"{fleet_id}avgFuel", -1)
-    redis_client.set(f"{fleet_id}distTot", -1)
-    
-    db.add(db_telemetry)
-    db.commit()
-    db.refresh(db_telemetry)
+    await write_telemetry(db, [row])
+    publish_telemetry([row], {telemetry.vin: vehicle.fleetId})
+
+async def handle_telemetry_batch(records, db: AsyncSession):
+    results = [None] * len(records)
+    by_vin = defaultdict(list)
+    for index, record in enumerate(records):
+        if record is None:
+            results[index] = {"index": index, "accepted": False, "detail": "Invalid record"}
+            continue
+        by_vin[record[1]["vin"]].append((index, record))
+
+    vehicles = {
+        vin: (password, auth_mode, fleet_id)
+        for vin, password, auth_mode, fleet_id in await db.execute(
+            select(Vehicle.vin, Vehicle.password, Vehicle.authMode, Vehicle.fleetId)
+            .where(Vehicle.vin.in_(list(by_vin)))
+        )
+    }
+
+    telemetry_rows = []
+    fleets = {}
+
+    credentials = list({
+        (vin, password)
+        for vin, entries in by_vin.items() if vin in vehicles
+        for _, (password, _) in entries
+    })
+    verified = dict(zip(credentials, await asyncio.gather(*[
+        check_credential(vin, password, vehicles[vin][0], vehicles[vin][1]) for vin, password in credentials
+    ])))
+
+    verified_vins = {}
+    for vin, entries in by_vin.items():
+        if vin not in vehicles:
+            for index, _ in entries:
+                results[index] = {"index": index, "vin": vin, "accepted": False, "detail": "Vehicle Not Found"}
+            continue
+
+        fleet_id = vehicles[vin][2]
+        accepted = []
+        for index, (password, row) in entries:
+            if verified[(vin, password)]:
+                accepted.append((index, row))
+            else:
+                results[index] = {"index": index, "vin": vin, "accepted": False, "detail": "Wrong Password for Vehicle"}
+        if accepted:
+            verified_vins[vin] = (fleet_id, accepted)
+
+    limits = check_rate_limits([(vin, fleet_id) for vin, (fleet_id, _) in verified_vins.items()])
+    for (vin, (fleet_id, accepted)), (allowed, retry_after) in zip(verified_vins.items(), limits):
+        if not allowed:
+            for index, _ in accepted:
+                results[index] = {
+                    "index": index, "vin": vin, "accepted": False,
+                    "detail": f"Rate limit exceeded: retry after {retry_after}s"
+                }
+            continue
+
+        for index, row in accepted:
+            telemetry_rows.append(row)
+            results[index] = {"index": index, "vin": vin, "accepted": True}
+        fleets[vin] = fleet_id
+
+    if buffered():
+        if telemetry_rows and not telemetry_writer.submit([(row, fleets[row["vin"]]) for row in telemetry_rows]):
+            raise HTTPException(status_code=503, detail="Ingest buffer full", headers={"Retry-After": "1"})
+        return results
+
+    await write_telemetry(db, telemetry_rows)
+    publish_telemetry(telemetry_rows, fleets)
+    return results
     
-@router.post("/batch")
-async def create_telemetry(telemetry: TelemetryInList):
-    db = SessionLocal()
+def batch_response(results):
+    accepted = sum(1 for result in results if result["accepted"])
+    return {
+        "success": accepted == len(results),
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results
+    }
+
+@router.post("/batch", response_model_exclude_none=True)
+async def create_telemetry_batch(telemetry: TelemetryInList, db: AsyncSession = Depends(get_db)) -> TelemetryBatchOut:
+    records = [(tel.password, telemetry_row(tel)) for tel in telemetry.tel]
+    return batch_response(await handle_telemetry_batch(records, db))
+
+@router.post("/batch/compact", response_model_exclude_none=True)
+async def create_telemetry_batch_compact(request: Request, db: AsyncSession = Depends(get_db)) -> TelemetryBatchOut:
     try:
-        processed_vins = set()
-        for tel in telemetry:
-            handle_telemetry(tel, db)
-            processed_vins.add(tel.vin)
-        
-        return {"success": True}
-    finally:
-        db.close()
+        records = decode_records(await request.body(), request.headers.get("content-type", ""))
+    except CompactFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return batch_response(await handle_telemetry_batch(records, db))
 
 @router.post("/")
-async def create_telemetry(telemetry: TelemetryIn):
-    db = SessionLocal()
-    try:
-        handle_telemetry(telemetry, db)
-        return {"success": True}
-    finally:
-        db.close()
+async def create_telemetry(telemetry: TelemetryIn, db: AsyncSession = Depends(get_db)) -> dict[str, bool]:
+    await handle_telemetry(telemetry, db)
+    return {"success": True}
+
+@router.get("/rollups/{vin}")
+async def get_rollups(
+    vin: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    tier: Optional[rollupTiers] = None,
+    db: AsyncSession = Depends(get_db)
+) -> List[RollupOut]:
+    until = utc_naive(until) if until is not None else datetime.utcnow()
+    since = utc_naive(since) if since is not None else until - timedelta(days=1)
+    if tier is None:
+        picked = await pick_tier(db, since, until - since)
+        tier = rollupTiers(MINUTE if picked == RAW else picked)
+    rollups = await db.scalars(
+        select(TelemetryRollup)
+        .where(
+            TelemetryRollup.tier == tier.value,
+            TelemetryRollup.vin == vin,
+            TelemetryRollup.bucket > since - TIER_WIDTHS[tier.value],
+            TelemetryRollup.bucket < until
+        )
+        .order_by(TelemetryRollup.bucket)
+    )
+    return [
+        RollupOut(
+            tier=tier, vin=rollup.vin, bucket=rollup.bucket, samples=rollup.samples,
+            speedMin=rollup.speedMin, speedMax=rollup.speedMax, speedAvg=rollup.speedSum / rollup.samples,
+            fuelFirst=rollup.fuelFirst, fuelLast=rollup.fuelLast,
+            odometerFirst=rollup.odometerFirst, odometerLast=rollup.odometerLast, onSeconds=rollup.onSeconds
+        )
+        for rollup in rollups
+    ]
+
+@router.get("/trips/{vin}")
+async def get_trips(
+    vin: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = PAGE_SIZE,
+    db: AsyncSession = Depends(get_db)
+) -> List[TripOut]:
+    stmt = select(Trip).where(Trip.vin == vin)
+    if since is not None:
+        stmt = stmt.where(Trip.endTime >= utc_naive(since))
+    if until is not None:
+        stmt = stmt.where(Trip.startTime < utc_naive(until))
+    trips = await db.scalars(stmt.order_by(Trip.startTime.desc()).limit(limit))
+    return trips.all()
+
+@router.get("/trips/{vin}/current")
+async def get_current_trip(vin: int) -> TripOut:
+    trip = current_trip(vin)
+    if trip is None:
+        raise HTTPException(status_code=404, detail="No Trip In Progress")
+    return trip
 
 @router.get("/all")
-async def get_telemetry():
-    db = SessionLocal()
-    try:
-        db_telemetry = db.query(Telemetry).all()
-        return db_telemetry
-    finally:
-        db.close()
+async def get_all_telemetry(
+    after: Optional[int] = None,
+    limit: int = PAGE_SIZE,
+    vin: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    format: exportFormats = exportFormats.json,
+    db: AsyncSession = Depends(get_db)
+):
+    return await export(db, Telemetry.__table__, "telemetryId", format, after, limit, vin, since, until, "telemetry")
 
 @router.get("/{telemetry_id}")
-async def get_telemetry(telemetry_id: int):
-    db = SessionLocal()
-    try:
-        db_telemetry = db.query(Telemetry).filter(Telemetry.telemetryId == telemetry_id).first()
-        if not db_telemetry:
-            raise HTTPException(status_code=404, detail="Telemetry Not Found")
-        return db_telemetry
-    finally:
-        db.close()
+async def get_telemetry(telemetry_id: int, db: AsyncSession = Depends(get_db)) -> TelemetryOut:
+    db_telemetry = await db.scalar(select(Telemetry).where(Telemetry.telemetryId == telemetry_id))
+    if not db_telemetry:
+        raise HTTPException(status_code=404, detail="Telemetry Not Found")
+    return db_telemetry
 
 @router.put("/{telemetry_id}")
-async def update_telemetry(telemetry_id: int, telemetry: TelemetryIn):
-    db = SessionLocal()
-    try:
-        db_telemetry = db.query(Telemetry).filter(Telemetry.telemetryId == telemetry_id).first()
-        if not db_telemetry:
-            raise HTTPException(status_code=404, detail="Telemetry Not Found")
-        
-        handle_telemetry(telemetry, db)
-
-        db_telemetry.vin = telemetry.vin
-        db_telemetry.latitude = telemetry.latitude
-        db_telemetry.longitude = telemetry.longitude
-        db_telemetry.speed = telemetry.speed
-        db_telemetry.engineStatus = telemetry.engineStatus
-        db_telemetry.fuel = telemetry.fuel
-        db_telemetry.odometerReading = telemetry.odometerReading
-        db_telemetry.diagnosticCode = telemetry.diagnosticCode
-        db_telemetry.timestamp = telemetry.timestamp
-        
-        db.commit()
-        db.refresh(db_telemetry)
-        return db_telemetry
-    finally:
-        db.close()
+async def update_telemetry(telemetry_id: int, telemetry: TelemetryIn, db: AsyncSession = Depends(get_db)) -> TelemetryOut:
+    db_telemetry = await db.scalar(select(Telemetry).where(Telemetry.telemetryId == telemetry_id))
+    if not db_telemetry:
+        raise HTTPException(status_code=404, detail="Telemetry Not Found")
+    
+    await handle_telemetry(telemetry, db)
+
+    db_telemetry.vin = telemetry.vin
+    db_telemetry.latitude = telemetry.latitude
+    db_telemetry.longitude = telemetry.longitude
+    db_telemetry.speed = telemetry.speed
+    db_telemetry.engineStatus = telemetry.engineStatus
+    db_telemetry.fuel = telemetry.fuel
+    db_telemetry.odometerReading = telemetry.odometerReading
+    db_telemetry.diagnosticCode = telemetry.diagnosticCode
+    db_telemetry.timestamp = telemetry.timestamp
+    
+    await db.commit()
+    await db.refresh(db_telemetry)
+    return db_telemetry
 
 @router.delete("/{telemetry_id}")
-async def delete_telemetry(telemetry_id: int):
-    db = SessionLocal()
-    try:
-        db_telemetry = db.query(Telemetry).filter(Telemetry.telemetryId == telemetry_id).first()
-        if not db_telemetry:
-            raise HTTPException(status_code=404, detail="Telemetry Not Found")
-        db.delete(db_telemetry)
-        db.commit()
-        return {"message": "Telemetry deleted successfully"}
-    finally:
-        db.close()
\ No newline at end of file
+async def delete_telemetry(telemetry_id: int, db: AsyncSession = Depends(get_db)) -> dict[str, str]:
+    db_telemetry = await db.scalar(select(Telemetry).where(Telemetry.telemetryId == telemetry_id))
+    if not db_telemetry:
+        raise HTTPException(status_code=404, detail="Telemetry Not Found")
+    await db.delete(db_telemetry)
+    await db.commit()
+    return {"message": "Telemetry deleted successfully"}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Enum, Float, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, Enum, Float, DateTime, Index, String
 from sqlalchemy.sql import func
 from .models import engineStatuses
 from ..database import Base
@@ -14,4 +14,62 @@ class Telemetry(Base):
     fuel = Column(Float)
     engineStatus = Column(Enum(engineStatuses))
     diagnosticCode = Column(Integer)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+
+Index("ix_telemetries_vin_timestamp", Telemetry.vin, Telemetry.timestamp.desc())
+Index("ix_telemetries_engineStatus_vin", Telemetry.engineStatus, Telemetry.vin)
+Index("ix_telemetries_timestamp", Telemetry.timestamp)
+
+class VehicleLatestState(Base):
+    __tablename__ = "vehicle_latest_state"
+    vin = Column(Integer, ForeignKey("vehicles.vin"), primary_key=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    speed = Column(Float)
+    odometerReading = Column(Integer)
+    fuel = Column(Float)
+    engineStatus = Column(Enum(engineStatuses))
+    timestamp = Column(DateTime(timezone=True))
+
+class TelemetryRollup(Base):
+    __tablename__ = "telemetry_rollups"
+    tier = Column(String, primary_key=True)
+    vin = Column(Integer, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    samples = Column(Integer, nullable=False)
+    speedMin = Column(Float)
+    speedMax = Column(Float)
+    speedSum = Column(Float)
+    fuelFirst = Column(Float)
+    fuelLast = Column(Float)
+    odometerFirst = Column(Integer)
+    odometerLast = Column(Integer)
+    firstAt = Column(DateTime)
+    lastAt = Column(DateTime)
+    onSeconds = Column(Float, nullable=False, default=0.0)
+
+Index("ix_telemetry_rollups_tier_bucket", TelemetryRollup.tier, TelemetryRollup.bucket)
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+    tier = Column(String, primary_key=True)
+    until = Column(DateTime, nullable=False)
+
+class Trip(Base):
+    __tablename__ = "trips"
+    tripId = Column(Integer, primary_key=True, index=True, autoincrement="auto")
+    vin = Column(Integer, ForeignKey("vehicles.vin"))
+    startTime = Column(DateTime, nullable=False)
+    endTime = Column(DateTime, nullable=False)
+    samples = Column(Integer, nullable=False)
+    odometerStart = Column(Float)
+    odometerEnd = Column(Float)
+    odometerDistance = Column(Float)
+    haversineDistance = Column(Float)
+    maxSpeed = Column(Float)
+    avgSpeed = Column(Float)
+    idleSeconds = Column(Float, nullable=False, default=0.0)
+    fuelUsed = Column(Float, nullable=False, default=0.0)
+
+Index("ix_trips_vin_startTime", Trip.vin, Trip.startTime.desc())
+Index("ix_trips_endTime", Trip.endTime)
@@ -0,0 +1,298 @@
+import numpy as np
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, delete, func, insert, select
+from sqlalchemy.orm import Session
+from ..config import TRIP_QUEUE_SIZE, TRIP_BATCH_SIZE, TRIP_BATCH_WAIT, TRIP_MAX_GAP, TRIP_BACKFILL_VINS
+from ..database import AsyncSessionLocal, redis_client
+from ..fanout import publish
+from ..fleet.geo import EARTH_RADIUS_KM
+from ..worker import BatchWorker
+from ..vehicle.schemas import Vehicle
+from .models import engineStatuses, utc_naive
+from .schemas import Telemetry, Trip
+
+EPOCH = datetime(1970, 1, 1)
+OFF = engineStatuses.off.value
+IDLE = engineStatuses.idle.value
+TRIP_TOTALS = ["samples", "distance", "speedMax", "speedSum", "idle", "fuelUsed"]
+
+TRIP_SCRIPT = redis_client.register_script("""
+local key = KEYS[1]
+local ts = tonumber(ARGV[1])
+local status = ARGV[2]
+local lat = tonumber(ARGV[3])
+local lon = tonumber(ARGV[4])
+local odometer = tonumber(ARGV[5])
+local speed = tonumber(ARGV[6])
+local fuel = tonumber(ARGV[7])
+local max_gap = tonumber(ARGV[8])
+local radius = tonumber(ARGV[9])
+
+local flat = redis.call('HGETALL', key)
+local state = {}
+for i = 1, #flat, 2 do
+    state[flat[i]] = flat[i + 1]
+end
+local last_ts = tonumber(state['ts'])
+if last_ts and ts <= last_ts then
+    return false
+end
+
+local function closed_trip(trip, end_ts, end_odometer)
+    local values = {
+        trip.start, end_ts, trip.odometerStart, end_odometer, trip.samples,
+        trip.distance, trip.speedMax, trip.speedSum, trip.idle, trip.fuelUsed
+    }
+    for i, value in ipairs(values) do
+        values[i] = string.format('%.17g', value)
+    end
+    return values
+end
+
+local closed = false
+local trip = nil
+if state['open'] == '1' then
+    trip = {}
+    for _, field in ipairs({'odometerStart', 'start', 'samples', 'distance', 'speedMax', 'speedSum', 'idle', 'fuelUsed'}) do
+        trip[field] = tonumber(state[field])
+    end
+    local gap = ts - last_ts
+    if gap > max_gap then
+        closed = closed_trip(trip, last_ts, tonumber(state['odometer']))
+        trip = nil
+    else
+        local lat0 = math.rad(tonumber(state['lat']))
+        local lat1 = math.rad(lat)
+        local dlat = lat1 - lat0
+        local dlon = math.rad(lon - tonumber(state['lon']))
+        local a = math.sin(dlat / 2) ^ 2 + math.cos(lat0) * math.cos(lat1) * math.sin(dlon / 2) ^ 2
+        trip.distance = trip.distance + 2 * radius * math.asin(math.sqrt(math.min(1, a)))
+        trip.samples = trip.samples + 1
+        trip.speedMax = math.max(trip.speedMax, speed)
+        trip.speedSum = trip.speedSum + speed
+        if state['status'] == 'idle' then
+            trip.idle = trip.idle + gap
+        end
+        trip.fuelUsed = trip.fuelUsed + math.max(0, tonumber(state['fuel']) - fuel)
+        if status == 'off' then
+            closed = closed_trip(trip, ts, odometer)
+            trip = nil
+        end
+    end
+end
+if trip == nil and status ~= 'off' then
+    trip = {odometerStart = odometer, start = ts, samples = 1, distance = 0, speedMax = speed, speedSum = speed, idle = 0, fuelUsed = 0}
+end
+
+redis.call('HSET', key, 'ts', ts, 'status', status, 'lat', lat, 'lon', lon, 'odometer', odometer, 'fuel', fuel)
+if trip then
+    redis.call('HSET', key, 'open', 1,
+        'odometerStart', trip.odometerStart, 'start', trip.start, 'samples', trip.samples, 'distance', trip.distance,
+        'speedMax', trip.speedMax, 'speedSum', trip.speedSum, 'idle', trip.idle, 'fuelUsed', trip.fuelUsed)
+else
+    redis.call('HSET', key, 'open', 0)
+end
+return closed
+""")
+
+def state_key(vin: int):
+    return f"trip_state:{vin}"
+
+def clear_trip_state(vin: int):
+    redis_client.delete(state_key(vin))
+
+def epoch_seconds(ts: datetime):
+    return (utc_naive(ts) - EPOCH).total_seconds()
+
+def from_epoch(seconds: float):
+    return EPOCH + timedelta(seconds=seconds)
+
+def trip_row(vin: int, start, end, odometer_start, odometer_end, samples, distance, speed_max, speed_sum, idle, fuel_used):
+    return {
+        "vin": vin, "startTime": from_epoch(float(start)), "endTime": from_epoch(float(end)), "samples": int(samples),
+        "odometerStart": float(odometer_start), "odometerEnd": float(odometer_end),
+        "odometerDistance": float(odometer_end) - float(odometer_start), "haversineDistance": float(distance),
+        "maxSpeed": float(speed_max), "avgSpeed": float(speed_sum) / int(samples),
+        "idleSeconds": float(idle), "fuelUsed": float(fuel_used)
+    }
+
+def detect(rows):
+    rows = sorted(rows, key=lambda row: row["timestamp"])
+    pipe = redis_client.pipeline(transaction=False)
+    for row in rows:
+        TRIP_SCRIPT(
+            keys=[state_key(row["vin"])],
+            args=[
+                epoch_seconds(row["timestamp"]), engineStatuses(row["engineStatus"]).value,
+                row["latitude"], row["longitude"], row["odometerReading"], row["speed"], row["fuel"],
+                TRIP_MAX_GAP, EARTH_RADIUS_KM
+            ],
+            client=pipe
+        )
+    return [trip_row(row["vin"], *closed) for row, closed in zip(rows, pipe.execute()) if closed]
+
+def current_trip(vin: int):
+    state = {field.decode(): value.decode() for field, value in redis_client.hgetall(state_key(vin)).items()}
+    if state.get("open") != "1":
+        return None
+    return {
+        **trip_row(vin, state["start"], state["ts"], state["odometerStart"], state["odometer"], *(state[field] for field in TRIP_TOTALS)),
+        "open": True
+    }
+
+class TripWorker(BatchWorker):
+    name = "trip detector"
+
+    def __init__(self):
+        super().__init__(TRIP_QUEUE_SIZE, TRIP_BATCH_SIZE, TRIP_BATCH_WAIT)
+
+    async def process(self, items):
+        trips = detect([row for row, _ in items])
+        if trips:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(Trip), trips)
+                await db.commit()
+            publish("trip", trips, {row["vin"]: fleet_id for row, fleet_id in items})
+        self.stats["trips"] += len(trips)
+
+trip_worker = TripWorker()
+
+def haversine(lat0, lon0, lat1, lon1):
+    lat0, lon0, lat1, lon1 = map(np.radians, (lat0, lon0, lat1, lon1))
+    a = np.sin((lat1 - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def load_columns(db: Session, vins):
+    rows = db.execute(
+        select(
+            Telemetry.vin, Telemetry.timestamp, Telemetry.engineStatus, Telemetry.latitude, Telemetry.longitude,
+            Telemetry.odometerReading, Telemetry.speed, Telemetry.fuel
+        )
+        .where(Telemetry.vin.in_(vins))
+        .order_by(Telemetry.vin, Telemetry.timestamp)
+    ).all()
+    if not rows:
+        return None
+    vin, timestamp, status, lat, lon, odometer, speed, fuel = zip(*rows)
+    stamps = np.array([utc_naive(ts) for ts in timestamp], dtype="datetime64[us]")
+    return {
+        "vin": np.array(vin, dtype=np.int64),
+        "ts": (stamps - np.datetime64(EPOCH, "us")).astype(np.int64) / 1e6,
+        "status": np.array([engineStatuses(value).value for value in status]),
+        "lat": np.array(lat, dtype=np.float64),
+        "lon": np.array(lon, dtype=np.float64),
+        "odometer": np.array(odometer, dtype=np.float64),
+        "speed": np.array(speed, dtype=np.float64),
+        "fuel": np.array(fuel, dtype=np.float64),
+    }
+
+def segment(columns, max_gap: float = TRIP_MAX_GAP):
+    vin, ts = columns["vin"], columns["ts"]
+    keep = np.ones(len(ts), dtype=bool)
+    keep[1:] = (vin[1:] != vin[:-1]) | (ts[1:] > ts[:-1])
+    columns = {name: values[keep] for name, values in columns.items()}
+    vin, ts, status = columns["vin"], columns["ts"], columns["status"]
+    lat, lon, odometer, speed, fuel = (columns[name] for name in ("lat", "lon", "odometer", "speed", "fuel"))
+    n = len(ts)
+
+    running = status != OFF
+    same = np.zeros(n, dtype=bool)
+    same[1:] = vin[1:] == vin[:-1]
+    gap = np.zeros(n)
+    gap[1:] = ts[1:] - ts[:-1]
+    cont = np.zeros(n, dtype=bool)
+    cont[1:] = same[1:] & running[:-1] & (gap[1:] <= max_gap)
+    starts = running & ~cont
+    trip = np.cumsum(starts) - 1
+    count = int(starts.sum())
+
+    members = np.flatnonzero(starts | cont)
+    member_trip = trip[members]
+    offsets = np.flatnonzero(np.r_[True, member_trip[1:] != member_trip[:-1]]) if count else np.zeros(0, dtype=np.int64)
+    first = members[offsets]
+    last = members[np.r_[offsets[1:] - 1, len(members) - 1]] if count else first
+
+    steps = np.flatnonzero(cont)
+    step_trip = trip[steps]
+    distance = np.bincount(step_trip, haversine(lat[steps - 1], lon[steps - 1], lat[steps], lon[steps]), count)
+    idle = np.bincount(step_trip, np.where(status[steps - 1] == IDLE, gap[steps], 0.0), count)
+    fuel_used = np.bincount(step_trip, np.maximum(fuel[steps - 1] - fuel[steps], 0.0), count)
+    samples = np.bincount(member_trip, minlength=count)
+    speed_max = np.maximum.reduceat(speed[members], offsets) if count else np.zeros(0)
+    speed_sum = np.add.reduceat(speed[members], offsets) if count else np.zeros(0)
+
+    final = np.ones(n, dtype=bool)
+    final[:-1] = vin[1:] != vin[:-1]
+    open_trip = running[last] & final[last]
+    trips = [
+        trip_row(int(vin[first[i]]), ts[first[i]], ts[last[i]], odometer[first[i]], odometer[last[i]],
+                 samples[i], distance[i], speed_max[i], speed_sum[i], idle[i], fuel_used[i])
+        for i in np.flatnonzero(~open_trip)
+    ]
+
+    states = {}
+    for i in np.flatnonzero(final):
+        states[int(vin[i])] = {
+            "ts": ts[i], "status": status[i], "lat": lat[i], "lon": lon[i],
+            "odometer": odometer[i], "fuel": fuel[i], "open": 0
+        }
+    for i in np.flatnonzero(open_trip):
+        states[int(vin[first[i]])].update({
+            "open": 1, "odometerStart": odometer[first[i]], "start": ts[first[i]], "samples": samples[i],
+            "distance": distance[i], "speedMax": speed_max[i], "speedSum": speed_sum[i],
+            "idle": idle[i], "fuelUsed": fuel_used[i]
+        })
+    return trips, states
+
+def clear_retained_trips(db: Session, vins):
+    firsts = db.execute(
+        select(Telemetry.vin, func.min(Telemetry.timestamp)).where(Telemetry.vin.in_(vins)).group_by(Telemetry.vin)
+    ).all()
+    if firsts:
+        table = Trip.__table__
+        db.execute(
+            delete(table).where(table.c.vin == bindparam("trip_vin"), table.c.startTime >= bindparam("first")),
+            [{"trip_vin": vin, "first": utc_naive(first)} for vin, first in firsts]
+        )
+    return dict(db.execute(select(Trip.vin, func.max(Trip.endTime)).where(Trip.vin.in_(vins)).group_by(Trip.vin)).all())
+
+def after_kept(columns, kept: dict):
+    if not kept:
+        return columns
+    vins, inverse = np.unique(columns["vin"], return_inverse=True)
+    limits = np.array([epoch_seconds(kept[vin]) if vin in kept else -np.inf for vin in vins.tolist()])
+    keep = columns["ts"] > limits[inverse]
+    return {name: values[keep] for name, values in columns.items()}
+
+def rebuild_trips(db: Session, vins=None):
+    if vins is None:
+        vins = list(db.scalars(select(Vehicle.vin).order_by(Vehicle.vin)))
+    rebuilt = 0
+    for i in range(0, len(vins), TRIP_BACKFILL_VINS):
+        chunk = vins[i:i + TRIP_BACKFILL_VINS]
+        kept = clear_retained_trips(db, chunk)
+        db.commit()
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(*[state_key(vin) for vin in chunk])
+        columns = load_columns(db, chunk)
+        if columns is not None:
+            columns = after_kept(columns, kept)
+            trips, states = segment(columns)
+            if trips:
+                db.execute(insert(Trip), trips)
+                db.commit()
+            for vin, state in states.items():
+                pipe.hset(state_key(vin), mapping={field: str(value) for field, value in state.items()})
+            rebuilt += len(trips)
+        pipe.execute()
+    return rebuilt
+
+if __name__ == "__main__":
+    import argparse
+    from ..database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild trips and the streaming detector state from stored telemetry.")
+    parser.add_argument("--vin", type=int, nargs="*")
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        print(f"Rebuilt {rebuild_trips(db, args.vin or None)} trips")
@@ -0,0 +1,51 @@
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import INGEST_BUFFER_SIZE, INGEST_FLUSH_ROWS, INGEST_FLUSH_INTERVAL
+from ..database import AsyncSessionLocal, storage_backend
+from ..alert.rules import alert_worker
+from ..fanout import publish
+from ..fleet.aggregates import record_telemetry
+from ..worker import BatchWorker
+from .latest import upsert_latest_state
+from .rollup import mark_late
+from .schemas import Telemetry
+from .trips import trip_worker
+
+FLUSH_ATTEMPTS = 3
+
+async def write_telemetry(db: AsyncSession, rows):
+    if rows:
+        await storage_backend.bulk_insert(db, Telemetry.__table__, rows)
+        await upsert_latest_state(db, rows)
+    await db.commit()
+    mark_late(rows)
+
+def publish_telemetry(rows, fleets: dict):
+    record_telemetry(rows, fleets)
+    publish("telemetry", rows, fleets)
+    items = [(row, fleets[row["vin"]]) for row in rows]
+    alert_worker.submit(items)
+    trip_worker.submit(items)
+
+class TelemetryWriter(BatchWorker):
+    name = "telemetry writer"
+
+    def __init__(self):
+        super().__init__(INGEST_BUFFER_SIZE, INGEST_FLUSH_ROWS, INGEST_FLUSH_INTERVAL)
+
+    async def process(self, items):
+        rows = [row for row, _ in items]
+        fleets = {row["vin"]: fleet_id for row, fleet_id in items}
+        for attempt in range(FLUSH_ATTEMPTS):
+            try:
+                async with AsyncSessionLocal() as db:
+                    await write_telemetry(db, rows)
+                break
+            except Exception:
+                if attempt == FLUSH_ATTEMPTS - 1:
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        publish_telemetry(rows, fleets)
+
+telemetry_writer = TelemetryWriter()
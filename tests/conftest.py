@@ -0,0 +1,46 @@
+import asyncio
+import os
+import tempfile
+import fakeredis
+import pytest
+import redis
+import redis.asyncio
+from fastapi.testclient import TestClient
+
+DIRECTORY = tempfile.mkdtemp(prefix="fleet-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIRECTORY, 'test.db')}"
+os.environ["CHECK_QUERY_PLANS"] = "0"
+os.environ["ROLLUP_INTERVAL"] = "0"
+
+SERVER = fakeredis.FakeServer()
+redis.Redis = lambda *args, **kwargs: fakeredis.FakeRedis(server=SERVER)
+redis.asyncio.Redis = lambda *args, **kwargs: fakeredis.FakeAsyncRedis(server=SERVER)
+
+from ..main import app
+from ..credentials import credential_cache
+from ..database import Base, async_engine, engine, redis_client
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    redis_client.flushall()
+    credential_cache.clear()
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    yield
+
+@pytest.fixture
+def run():
+    def run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await async_engine.dispose()
+        return asyncio.run(main())
+    return run
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,129 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert
+from ..database import SessionLocal, redis_client
+from ..fleet.aggregates import (
+    BUILT_KEY, PENDING_KEY, REBUILD_KEY, ensure_fleet_aggregates, fleet_distance, fleet_stats, rebuild_fleet_aggregates,
+    record_telemetry, remove_vehicle, status_counts, status_fleets, window_start
+)
+from ..telemetry.schemas import Telemetry, VehicleLatestState
+from ..vehicle.schemas import Vehicle
+
+START = datetime(2026, 1, 1, 10)
+
+def telemetry(vin: int, timestamp: datetime, status: str = "on", fuel: float = 0.5, odometer: int = 100):
+    return {
+        "vin": vin, "latitude": 52.52, "longitude": 13.405, "speed": 40.0, "engineStatus": status, "fuel": fuel,
+        "odometerReading": odometer, "diagnosticCode": 0, "timestamp": timestamp
+    }
+
+@pytest.fixture(params=["UTC", "Asia/Kolkata", "America/Los_Angeles"])
+def server_tz(request, monkeypatch):
+    monkeypatch.setenv("TZ", request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+def test_status_counts_ignore_server_timezone(server_tz):
+    now = datetime.utcnow()
+    record_telemetry([telemetry(1, now), telemetry(2, now - timedelta(minutes=10), status="idle")], {1: 7, 2: 7})
+    assert status_counts([7], staleness=300) == [{"on": 1, "off": 0, "idle": 0, "offline": 1}]
+    assert fleet_stats(7)["last_ts"] == pytest.approx(time.time(), abs=5)
+
+def test_window_start_is_utc_hour(server_tz):
+    latest = datetime(2026, 3, 8, 10, 45)
+    assert window_start(latest, timedelta(hours=24)) == datetime(2026, 3, 7, 11, 0)
+    assert window_start(latest, timedelta(hours=1)) == datetime(2026, 3, 8, 10, 0)
+
+def snapshot(fleet_ids):
+    return (
+        [fleet_stats(fleet_id) for fleet_id in fleet_ids],
+        [fleet_distance(fleet_id, window) for fleet_id in fleet_ids for window in (timedelta(hours=1), timedelta(hours=24))],
+        status_counts(fleet_ids),
+        status_fleets()
+    )
+
+def test_fuel_and_distance_buckets():
+    record_telemetry([
+        telemetry(1, START, fuel=0.5, odometer=100),
+        telemetry(1, START + timedelta(minutes=10), fuel=0.4, odometer=130),
+        telemetry(1, START + timedelta(minutes=70), status="idle", fuel=0.3, odometer=150),
+        telemetry(2, START + timedelta(minutes=20), fuel=0.9, odometer=500),
+    ], {1: 7, 2: 7})
+    stats = fleet_stats(7)
+    assert stats["fuel_sum"] == pytest.approx(1.2)
+    assert (stats["vehicles"], stats["active"]) == (2, 1)
+    assert fleet_distance(7, timedelta(hours=1)) == 20
+    assert fleet_distance(7, timedelta(hours=24)) == 50
+    assert status_counts([7], staleness=0) == [{"on": 0, "off": 0, "idle": 0, "offline": 2}]
+
+def test_older_rows_do_not_overwrite_newer_state():
+    record_telemetry([telemetry(1, START + timedelta(minutes=5), fuel=0.4, odometer=120)], {1: 7})
+    record_telemetry([telemetry(1, START, status="off", fuel=0.9, odometer=100)], {1: 7})
+    assert fleet_stats(7)["fuel_sum"] == pytest.approx(0.4)
+    assert fleet_stats(7)["active"] == 1
+    assert fleet_distance(7, timedelta(hours=24)) == 0
+
+def test_fleet_move_and_removal():
+    record_telemetry([telemetry(1, START, fuel=0.5)], {1: 7})
+    record_telemetry([telemetry(1, START + timedelta(minutes=1), fuel=0.5, odometer=110)], {1: 8})
+    assert (fleet_stats(7)["vehicles"], fleet_stats(8)["vehicles"]) == (0, 1)
+    assert fleet_stats(7)["fuel_sum"] == pytest.approx(0.0)
+    assert fleet_distance(8, timedelta(hours=1)) == 10
+    remove_vehicle(1)
+    assert fleet_stats(8)["vehicles"] == 0
+    assert status_counts([7, 8], staleness=0) == [{"on": 0, "off": 0, "idle": 0, "offline": 0}] * 2
+
+def store(rows, fleets):
+    with SessionLocal() as db:
+        db.execute(insert(Vehicle), [{"vin": vin, "fleetId": fleet_id} for vin, fleet_id in fleets.items()])
+        db.execute(insert(Telemetry), rows)
+        latest = {}
+        for row in sorted(rows, key=lambda row: row["timestamp"]):
+            latest[row["vin"]] = row
+        db.execute(insert(VehicleLatestState), [
+            {key: row[key] for key in ("vin", "latitude", "longitude", "speed", "odometerReading", "fuel", "engineStatus", "timestamp")}
+            for row in latest.values()
+        ])
+        db.commit()
+
+def fleet_rows():
+    return [
+        telemetry(1, START + timedelta(minutes=15 * i), status="on" if i < 6 else "idle", fuel=0.9 - i / 100, odometer=100 + 7 * i)
+        for i in range(8)
+    ] + [
+        telemetry(2, START + timedelta(minutes=40 * i), status="off" if i == 3 else "on", fuel=0.5, odometer=900 + 11 * i)
+        for i in range(4)
+    ] + [telemetry(3, START + timedelta(minutes=90), fuel=0.2, odometer=40)]
+
+def test_rebuild_matches_incremental():
+    rows, fleets = fleet_rows(), {1: 7, 2: 7, 3: 8}
+    record_telemetry(rows, fleets)
+    incremental = snapshot([7, 8])
+    store(rows, fleets)
+    with SessionLocal() as db:
+        rebuild_fleet_aggregates(db)
+    rebuilt = snapshot([7, 8])
+    assert rebuilt[0] == [pytest.approx(stats) for stats in incremental[0]]
+    assert rebuilt[1:] == incremental[1:]
+    assert incremental[1] == [11, 7 * 7 + 11 * 3, 0.0, 0.0]
+
+def test_rows_recorded_during_rebuild_are_replayed():
+    rows, fleets = fleet_rows(), {1: 7, 2: 7, 3: 8}
+    store(rows, fleets)
+    redis_client.set(REBUILD_KEY, "other")
+    record_telemetry(rows, fleets)
+    assert fleet_stats(7)["vehicles"] == 0
+    assert redis_client.smembers(PENDING_KEY) == {b"1", b"2", b"3"}
+    with SessionLocal() as db:
+        ensure_fleet_aggregates(db)
+    assert not redis_client.exists(BUILT_KEY)
+
+    redis_client.delete(REBUILD_KEY)
+    with SessionLocal() as db:
+        ensure_fleet_aggregates(db)
+    assert redis_client.exists(BUILT_KEY) and not redis_client.exists(REBUILD_KEY)
+    assert not redis_client.exists(PENDING_KEY)
+    assert (fleet_stats(7)["vehicles"], fleet_stats(8)["vehicles"]) == (2, 1)
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from ..alert.rules import CLEAR, FIRE, HOLD, Rule, clear_alert_state, evaluate
+from ..alert_type.models import comparisons, ruleFields
+from ..alert_type.schemas import AlertType
+
+START = datetime(2026, 1, 1)
+
+def speeding(cooldown: int = 300):
+    return Rule(AlertType(alertTypeId=1, field=ruleFields.speed, comparison=comparisons.gt, threshold=120, hysteresis=10, cooldown=cooldown))
+
+def low_fuel():
+    return Rule(AlertType(alertTypeId=2, field=ruleFields.fuel, comparison=comparisons.lt, threshold=0.15, hysteresis=0.05, cooldown=0))
+
+def row(seconds: float, speed: float = 50, fuel: float = 0.5, vin: int = 1):
+    return {"vin": vin, "speed": speed, "fuel": fuel, "timestamp": START + timedelta(seconds=seconds)}
+
+def stream(rules, rows):
+    return [alert for r in rows for alert in evaluate(rules, [r])]
+
+def test_transition_uses_release_band():
+    rule = speeding()
+    assert rule.transition(row(0, speed=121)) == FIRE
+    assert rule.transition(row(0, speed=115)) == HOLD
+    assert rule.transition(row(0, speed=111)) == HOLD
+    assert rule.transition(row(0, speed=110)) == CLEAR
+
+    rule = low_fuel()
+    assert rule.transition(row(0, fuel=0.1)) == FIRE
+    assert rule.transition(row(0, fuel=0.18)) == HOLD
+    assert rule.transition(row(0, fuel=0.21)) == CLEAR
+
+def test_fires_once_until_cleared():
+    rows = [row(0, speed=130), row(10, speed=125), row(20, speed=115), row(30, speed=125)]
+    alerts = stream([speeding(cooldown=0)], rows)
+    assert [alert["timestamp"] for alert in alerts] == [START]
+
+def test_refires_after_clear():
+    rows = [row(0, speed=130), row(10, speed=100), row(20, speed=130)]
+    alerts = stream([speeding(cooldown=0)], rows)
+    assert [alert["timestamp"] for alert in alerts] == [START, START + timedelta(seconds=20)]
+
+def test_cooldown_suppresses_refire():
+    rows = [row(0, speed=130), row(10, speed=100), row(20, speed=130), row(400, speed=100), row(410, speed=130)]
+    alerts = stream([speeding(cooldown=300)], rows)
+    assert [alert["timestamp"] for alert in alerts] == [START, START + timedelta(seconds=410)]
+
+def test_suppressed_crossing_stays_active():
+    rows = [row(0, speed=130), row(10, speed=100), row(20, speed=130), row(400, speed=130)]
+    alerts = stream([speeding(cooldown=300)], rows)
+    assert [alert["timestamp"] for alert in alerts] == [START]
+
+def test_batch_matches_stream():
+    rows = [row(i * 30, speed=speed, fuel=fuel) for i, (speed, fuel) in enumerate([
+        (130, 0.5), (118, 0.12), (100, 0.18), (125, 0.25), (90, 0.1), (135, 0.3)
+    ])]
+    rules = [speeding(cooldown=0), low_fuel()]
+    streamed = stream(rules, rows)
+    clear_alert_state(1)
+    assert evaluate(rules, list(reversed(rows))) == streamed
+
+def test_state_is_per_vehicle():
+    rules = [speeding(cooldown=0)]
+    alerts = evaluate(rules, [row(0, speed=130, vin=1), row(0, speed=130, vin=2)])
+    assert sorted(alert["vin"] for alert in alerts) == [1, 2]
+    clear_alert_state(1)
+    assert [alert["vin"] for alert in evaluate(rules, [row(10, speed=130, vin=1), row(10, speed=130, vin=2)])] == [1]
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from ..alert.schemas import Alert, AlertCount
+from ..alert.summary import DAY, HOUR, alert_summary, rebuild_alert_counts, record_alerts, summary_ranges
+from ..database import AsyncSessionLocal, SessionLocal
+from ..vehicle.schemas import Vehicle
+
+START = datetime(2026, 1, 1)
+
+def alerts():
+    return [
+        {"vin": 1 + i % 2, "alertTypeId": 1 + i % 3, "timestamp": START + timedelta(hours=5 * i, minutes=7 * i % 60)}
+        for i in range(40)
+    ]
+
+def store(rows):
+    with SessionLocal() as db:
+        db.execute(insert(Vehicle), [{"vin": 1, "fleetId": 1}, {"vin": 2, "fleetId": 2}])
+        db.execute(insert(Alert), rows)
+        db.commit()
+
+def record(run, rows, sign: int = 1):
+    async def main():
+        async with AsyncSessionLocal() as db:
+            await record_alerts(db, rows, sign)
+            await db.commit()
+    run(main())
+
+def summary(run, since=None, until=None, fleet_id=None):
+    async def main():
+        async with AsyncSessionLocal() as db:
+            return await alert_summary(db, since, until, fleet_id)
+    return run(main())
+
+def expected(rows, since=None, until=None, fleet_id=None):
+    counts = {}
+    for row in rows:
+        hour = row["timestamp"].replace(minute=0)
+        if since is not None and hour < since.replace(minute=0):
+            continue
+        if until is not None and hour >= until:
+            continue
+        if fleet_id is not None and row["vin"] != fleet_id:
+            continue
+        counts[row["alertTypeId"]] = counts.get(row["alertTypeId"], 0) + 1
+    return counts
+
+def test_summary_ranges_split_days_and_hours():
+    assert summary_ranges(START + timedelta(hours=10, minutes=30), START + timedelta(days=3, hours=5, minutes=10)) == [
+        (DAY, START + timedelta(days=1), START + timedelta(days=3)),
+        (HOUR, START + timedelta(hours=10), START + timedelta(days=1)),
+        (HOUR, START + timedelta(days=3), START + timedelta(days=3, hours=6)),
+    ]
+    assert summary_ranges(START + timedelta(hours=1), START + timedelta(hours=20)) == [(HOUR, START + timedelta(hours=1), START + timedelta(hours=20))]
+    assert summary_ranges(START, START + timedelta(days=2)) == [(DAY, START, START + timedelta(days=2))]
+    assert summary_ranges(None, None) == [(DAY, None, None)]
+    assert summary_ranges(None, START + timedelta(hours=3)) == [(DAY, None, START), (HOUR, START, START + timedelta(hours=3))]
+
+def test_summary_matches_raw_alerts(run):
+    rows = alerts()
+    store(rows)
+    record(run, rows)
+    windows = [
+        (None, None), (START + timedelta(hours=13), None), (None, START + timedelta(days=4, hours=2)),
+        (START + timedelta(hours=30, minutes=20), START + timedelta(days=6, hours=11)),
+        (START + timedelta(days=2, hours=1), START + timedelta(days=2, hours=9)),
+    ]
+    for since, until in windows:
+        assert summary(run, since, until) == expected(rows, since, until)
+        assert summary(run, since, until, fleet_id=2) == expected(rows, since, until, fleet_id=2)
+
+def test_removed_alerts_drop_empty_buckets(run):
+    rows = alerts()[:6]
+    store(rows)
+    record(run, rows)
+    record(run, rows[:3], sign=-1)
+    assert summary(run) == expected(rows[3:])
+    with SessionLocal() as db:
+        assert all(count > 0 for count in db.scalars(select(AlertCount.count)))
+
+def test_rebuild_matches_incremental(run):
+    rows = alerts()
+    store(rows)
+    record(run, rows)
+    incremental = summary(run, START + timedelta(hours=7), START + timedelta(days=5))
+    with SessionLocal() as db:
+        rebuild_alert_counts(db)
+    assert summary(run, START + timedelta(hours=7), START + timedelta(days=5)) == incremental
+
+def test_endpoint_parses_bounds(client):
+    rows = alerts()
+    store(rows)
+    with SessionLocal() as db:
+        rebuild_alert_counts(db)
+    response = client.get("/alertSummary", params={"since": "2026-01-02T01:00:00+01:00", "fleet_id": 1})
+    assert {int(key): value for key, value in response.json().items()} == expected(rows, START + timedelta(hours=24), fleet_id=1)
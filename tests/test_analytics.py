@@ -0,0 +1,58 @@
+from datetime import timedelta
+import pytest
+from sqlalchemy import insert, select
+from ..database import SessionLocal
+from ..telemetry.rollup import RAW, RETENTION_DAYS
+from ..telemetry.schemas import Telemetry, VehicleLatestState
+
+def seeded(client):
+    client.post("/seed")
+    with SessionLocal() as db:
+        return db.scalar(select(VehicleLatestState.timestamp).where(VehicleLatestState.vin == 12345))
+
+def store(until, samples):
+    with SessionLocal() as db:
+        db.execute(insert(Telemetry), [
+            {
+                "vin": vin, "latitude": 1.0, "longitude": 2.0, "speed": speed, "engineStatus": status, "fuel": 0.55,
+                "odometerReading": odometer, "diagnosticCode": code, "timestamp": until - age
+            }
+            for vin, age, speed, status, odometer, code in samples
+        ])
+        db.commit()
+
+def test_window_summary(client):
+    until = seeded(client)
+    store(until, [
+        (12345, timedelta(hours=3), 15.0, "on", 49900, 100),
+        (12345, timedelta(hours=2), 0.0, "idle", 49950, 7),
+        (12345, timedelta(hours=30), 200.0, "on", 40000, 7),
+        (67890, timedelta(hours=1), 90.0, "on", 119000, 7),
+    ])
+    analytics = client.get("/fleetAnalytics/1").json()
+    assert analytics["truncated"] is False
+    assert (analytics["samples"], analytics["vehicles"]) == (3, 1)
+    assert analytics["speed"]["max"] == 65.0
+    assert analytics["speed"]["mean"] == pytest.approx(80 / 3)
+    assert analytics["odometer"]["total"] == 100.0
+    assert analytics["engine"]["idle"] == pytest.approx(1 / 3)
+    assert sum(analytics["fuel"]["counts"]) == 3
+    assert analytics["diagnosticCodes"] == [{"code": 100, "count": 2}, {"code": 7, "count": 1}]
+
+    hour = client.get("/fleetAnalytics/1", params={"window": "1h"}).json()
+    assert hour["samples"] == 1
+
+def test_window_past_raw_retention_is_truncated(client, monkeypatch):
+    monkeypatch.setitem(RETENTION_DAYS, RAW, 0.5)
+    until = seeded(client)
+    store(until, [(12345, timedelta(hours=1), 20.0, "on", 49990, 0), (12345, timedelta(hours=13), 30.0, "on", 49000, 0)])
+    analytics = client.get("/fleetAnalytics/1").json()
+    assert analytics["truncated"] is True
+    assert analytics["samples"] == 2
+    assert analytics["until"] > analytics["since"] > (until - timedelta(hours=13)).isoformat()
+    assert client.get("/fleetAnalytics/1", params={"window": "1h"}).json()["truncated"] is False
+
+def test_fleet_without_telemetry(client):
+    analytics = client.get("/fleetAnalytics/9").json()
+    assert (analytics["samples"], analytics["since"], analytics["until"]) == (0, None, None)
+    assert analytics["fuel"]["counts"] == [0] * len(analytics["fuel"]["counts"])
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from .. import cache
+from ..cache import acquire, bump, cached, release, stats
+from ..database import redis_client
+
+class Source:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self, fleet_id: int) -> int:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("source down")
+        return fleet_id * 100 + self.calls
+
+def test_hits_and_versioned_invalidation(run):
+    source = Source()
+    load = cached("test_hits", ttl=60, scope="fleet_id")(source)
+
+    async def main():
+        return [await load(1), await load(1), await load(2)]
+    assert run(main()) == [101, 101, 202]
+    bump("test_hits", 1)
+    assert run(main()) == [103, 103, 202]
+    assert (stats["test_hits"]["hits"], stats["test_hits"]["misses"]) == (3, 3)
+
+def test_concurrent_misses_compute_once(run):
+    source = Source(delay=0.05)
+    load = cached("test_single_flight", ttl=60)(source)
+
+    async def main():
+        return await asyncio.gather(*(load(1) for _ in range(5)))
+    assert run(main()) == [101] * 5
+    assert source.calls == 1
+    assert not cache.local_locks and not cache.local_waiters
+
+def test_stale_value_served_while_refreshing(run):
+    source = Source()
+    load = cached("test_swr", ttl=60, soft_ttl=0)(source)
+
+    async def main():
+        first = await load(1)
+        stale = await load(1)
+        await asyncio.gather(*cache.refreshing.values())
+        fresh = await load(1)
+        await asyncio.gather(*cache.refreshing.values())
+        return first, stale, fresh
+    assert run(main()) == (101, 101, 102)
+    assert source.calls == 3
+    assert (stats["test_swr"]["stale"], stats["test_swr"]["refreshes"]) == (2, 2)
+    assert not cache.refreshing
+
+def test_failed_refresh_is_logged(run, caplog):
+    source = Source()
+    load = cached("test_refresh_error", ttl=60, soft_ttl=0)(source)
+
+    async def main():
+        await load(1)
+        source.fail = True
+        value = await load(1)
+        await asyncio.gather(*cache.refreshing.values(), return_exceptions=True)
+        await asyncio.sleep(0)
+        return value
+    with caplog.at_level(logging.ERROR, logger=cache.__name__):
+        assert run(main()) == 101
+    assert "Cache refresh for test_refresh_error failed" in caplog.text
+    assert stats["test_refresh_error"]["refresh_errors"] == 1
+    assert not redis_client.keys("cache:test_refresh_error:*:lock")
+
+def test_release_only_drops_own_lock():
+    token = acquire("cache:test_release")
+    assert token and acquire("cache:test_release") is None
+    release("cache:test_release", "other")
+    assert redis_client.get("cache:test_release:lock") == token.encode()
+    release("cache:test_release", token)
+    assert redis_client.get("cache:test_release:lock") is None
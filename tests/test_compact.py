@@ -0,0 +1,61 @@
+from datetime import datetime
+import msgpack
+import orjson
+import pytest
+from ..telemetry.compact import COMPACT_COLUMNS, CompactFormatError, decode_records
+from ..telemetry.models import engineStatuses
+
+ROW = [12345, "password123", 1.5, 2.5, 30, "on", 0.5, 100, 7, "2026-01-01T01:00:00+01:00"]
+
+def test_array_rows_use_default_columns():
+    [(password, row)] = decode_records(orjson.dumps([ROW]), "application/json")
+    assert password == "password123"
+    assert row["engineStatus"] is engineStatuses.on
+    assert row["timestamp"] == datetime(2026, 1, 1)
+    assert (row["vin"], row["speed"], row["diagnosticCode"]) == (12345, 30.0, 7)
+
+def test_msgpack_with_reordered_columns():
+    columns = list(reversed(COMPACT_COLUMNS))
+    body = msgpack.packb({"columns": columns, "rows": [list(reversed(ROW[:-1] + [1767225600]))]})
+    [(password, row)] = decode_records(body, "application/msgpack; charset=binary")
+    assert password == "password123"
+    assert row["timestamp"] == datetime(2026, 1, 1)
+
+def test_bad_rows_become_none():
+    rows = [
+        ROW,
+        ROW[:-1],
+        "not a row",
+        ROW[:5] + ["stalled"] + ROW[6:],
+        ROW[:-1] + [["2026"]],
+        ROW[:-1] + ["yesterday"],
+        ["vin"] + ROW[1:],
+    ]
+    records = decode_records(orjson.dumps(rows), "application/json")
+    assert records[0] is not None
+    assert records[1:] == [None] * 6
+
+@pytest.mark.parametrize("body, content_type, message", [
+    (b"{not json", "application/json", "Malformed body"),
+    (b"\xc1", "application/x-msgpack", "Malformed body"),
+    (b'{"rows": 3}', "application/json", "Body must be"),
+    (b'"rows"', "application/json", "Body must be"),
+    (orjson.dumps({"columns": ["vin"], "rows": []}), "application/json", "Columns must be exactly"),
+    (orjson.dumps({"columns": COMPACT_COLUMNS + ["extra"], "rows": []}), "application/json", "Columns must be exactly"),
+])
+def test_malformed_bodies(body, content_type, message):
+    with pytest.raises(CompactFormatError, match=message):
+        decode_records(body, content_type)
+
+def test_endpoint_rejects_malformed_and_reports_invalid_rows(client):
+    client.post("/seed")
+    response = client.post("/telemetry/batch/compact", content=b"[[", headers={"content-type": "application/json"})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Malformed body")
+
+    body = msgpack.packb([ROW, ROW[:3]])
+    batch = client.post("/telemetry/batch/compact", content=body, headers={"content-type": "application/msgpack"}).json()
+    assert batch["results"] == [
+        {"index": 0, "vin": 12345, "accepted": True},
+        {"index": 1, "accepted": False, "detail": "Invalid record"},
+    ]
@@ -0,0 +1,68 @@
+import pytest
+from .. import credentials
+from ..credentials import CredentialCache, check_credential, hash_credential
+from ..vehicle.models import authModes
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def bcrypt_calls(monkeypatch):
+    calls = []
+    verify = credentials.verify_password
+
+    def counting(secret, stored):
+        calls.append(secret)
+        return verify(secret, stored)
+    monkeypatch.setattr(credentials, "verify_password", counting)
+    return calls
+
+def test_verified_password_is_cached(run, bcrypt_calls):
+    async def main():
+        stored = await hash_credential("secret", authModes.password)
+        return [
+            await check_credential(1, "secret", stored, authModes.password),
+            await check_credential(1, "secret", stored, authModes.password),
+            await check_credential(1, "wrong", stored, authModes.password),
+            await check_credential(1, "secret", await hash_credential("secret", authModes.password), authModes.password),
+        ]
+    assert run(main()) == [True, True, False, True]
+    assert bcrypt_calls == ["secret", "wrong", "secret"]
+
+def test_tokens_skip_bcrypt(run, bcrypt_calls):
+    async def main():
+        stored = await hash_credential("token", authModes.token)
+        return await check_credential(1, "token", stored, authModes.token), await check_credential(1, "nope", stored, authModes.token)
+    assert run(main()) == (True, False)
+    assert bcrypt_calls == []
+
+def test_entries_expire_and_evict(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(credentials, "time", clock)
+    cache = CredentialCache(maxsize=2, ttl=60)
+    cache.put(1, "a", "stored")
+    cache.put(2, "b", "stored")
+    assert cache.get(1, "a", "stored")
+    cache.put(3, "c", "stored")
+    assert [cache.get(1, "a", "stored"), cache.get(2, "b", "stored"), cache.get(3, "c", "stored")] == [True, False, True]
+    clock.now += 61
+    assert not cache.get(1, "a", "stored")
+    cache.put(1, "a", "stored")
+    cache.invalidate(1)
+    assert not cache.get(1, "a", "stored")
+
+def test_password_change_invalidates_cache(client):
+    client.post("/seed")
+    telemetry = {
+        "vin": 12345, "password": "password123", "latitude": 1.0, "longitude": 2.0, "speed": 10, "engineStatus": "on",
+        "fuel": 0.5, "odometerReading": 100, "diagnosticCode": 0, "timestamp": "2026-01-01T00:00:00"
+    }
+    assert client.post("/telemetry/", json=telemetry).status_code == 200
+    vehicle = {"vin": 12345, "modelId": 1, "fleetId": 1, "operatorId": 1, "ownerId": 2, "regStatus": "active", "password": "changed"}
+    assert client.put("/vehicle/12345", json=vehicle).status_code == 200
+    assert client.post("/telemetry/", json={**telemetry, "timestamp": "2026-01-01T00:01:00"}).status_code == 401
+    assert client.post("/telemetry/", json={**telemetry, "password": "changed", "timestamp": "2026-01-01T00:02:00"}).status_code == 200
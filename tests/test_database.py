@@ -0,0 +1,67 @@
+import os
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+from .. import database
+from ..config import DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_POOL_TIMEOUT
+from ..database import PoolMetrics, async_engine, async_url, engine_options, get_db, make_engine, pool_metrics
+from .conftest import DIRECTORY
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = PoolMetrics()
+    monkeypatch.setattr(database, "pool_metrics", metrics)
+    return metrics
+
+def test_pool_options_per_backend():
+    pooled = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT, "pool_recycle": DB_POOL_RECYCLE}
+    assert engine_options("postgresql://fleet@db/fleet").items() >= pooled.items()
+    assert engine_options("sqlite:///fleet.db").items() >= pooled.items()
+    assert engine_options("sqlite:///fleet.db")["connect_args"] == {"check_same_thread": False}
+    assert "pool_size" not in engine_options("sqlite://")
+    assert str(async_url("postgresql://fleet@db/fleet")).startswith("postgresql+asyncpg://")
+    assert str(async_url("sqlite:///fleet.db")).startswith("sqlite+aiosqlite://")
+
+def test_make_engine_records_pool_events(metrics):
+    engine = make_engine(f"sqlite:///{os.path.join(DIRECTORY, 'pool.db')}")
+    try:
+        assert isinstance(engine.pool, QueuePool)
+        assert engine.pool.size() == DB_POOL_SIZE
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            assert metrics.snapshot()["pools"]["sync"]["checked_out"] == 1
+        snapshot = metrics.snapshot()
+        assert (snapshot["connects"], snapshot["checkouts"], snapshot["checkins"]) == (1, 1, 1)
+        assert snapshot["pools"]["sync"]["checked_out"] == 0
+    finally:
+        engine.dispose()
+
+def test_wait_stats():
+    metrics = PoolMetrics()
+    assert metrics.snapshot()["wait_seconds_avg"] == 0.0
+    for seconds in (0.1, 0.4, 0.1):
+        metrics.observe_wait(seconds)
+    snapshot = metrics.snapshot()
+    assert snapshot["wait_seconds_total"] == pytest.approx(0.6)
+    assert snapshot["wait_seconds_max"] == 0.4
+    assert snapshot["wait_seconds_avg"] == pytest.approx(0.2)
+
+def test_get_db_closes_session(run):
+    waits = pool_metrics.waits
+
+    async def request(fail: bool):
+        dependency = get_db()
+        db = await anext(dependency)
+        assert async_engine.pool.checkedout() == 1
+        if fail:
+            with pytest.raises(RuntimeError):
+                await dependency.athrow(RuntimeError("handler failed"))
+        else:
+            await db.execute(text("SELECT 1"))
+            with pytest.raises(StopAsyncIteration):
+                await anext(dependency)
+        return async_engine.pool.checkedout(), db.in_transaction()
+
+    assert run(request(fail=False)) == (0, False)
+    assert run(request(fail=True)) == (0, False)
+    assert pool_metrics.waits == waits + 2
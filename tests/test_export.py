@@ -0,0 +1,78 @@
+import csv
+import io
+from datetime import datetime, timedelta
+import orjson
+from sqlalchemy import insert
+from ..database import SessionLocal
+from ..telemetry.schemas import Telemetry
+
+START = datetime(2026, 1, 1)
+
+def store(count: int):
+    with SessionLocal() as db:
+        db.execute(insert(Telemetry), [
+            {
+                "vin": 1 + i % 2, "latitude": 1.0, "longitude": 2.0, "speed": float(i), "engineStatus": "on", "fuel": 0.5,
+                "odometerReading": i, "diagnosticCode": 0, "timestamp": START + timedelta(minutes=i)
+            }
+            for i in range(count)
+        ])
+        db.commit()
+
+def pages(client, **params):
+    after = None
+    while True:
+        page = client.get("/telemetry/all", params={**params, **({"after": after} if after is not None else {})}).json()
+        yield page
+        after = page["next_cursor"]
+        if after is None:
+            return
+
+def test_pages_walk_every_row_once(client):
+    store(25)
+    walked = list(pages(client, limit=10))
+    assert [len(page["items"]) for page in walked] == [10, 10, 5]
+    ids = [item["telemetryId"] for page in walked for item in page["items"]]
+    assert ids == sorted(ids) and len(set(ids)) == 25
+    assert walked[0]["next_cursor"] == ids[9]
+
+def test_exact_multiple_ends_with_empty_page(client):
+    store(20)
+    walked = list(pages(client, limit=10))
+    assert [len(page["items"]) for page in walked] == [10, 10, 0]
+
+def test_json_page_shape(client):
+    store(1)
+    [item] = client.get("/telemetry/all").json()["items"]
+    assert item["engineStatus"] == "on"
+    assert item["timestamp"] == START.isoformat()
+
+def test_filters_and_aware_bounds(client):
+    store(10)
+    since = (START + timedelta(minutes=2)).isoformat() + "+02:00"
+    until = (START + timedelta(minutes=6)).isoformat() + "Z"
+    items = client.get("/telemetry/all", params={"vin": 1, "since": since, "until": until}).json()["items"]
+    assert [item["odometerReading"] for item in items] == [0, 2, 4]
+    since = (START + timedelta(hours=2, minutes=2)).isoformat() + "+02:00"
+    items = client.get("/telemetry/all", params={"vin": 1, "since": since, "until": until}).json()["items"]
+    assert [item["odometerReading"] for item in items] == [2, 4]
+
+def test_limit_bounds(client):
+    assert client.get("/telemetry/all", params={"limit": 0}).status_code == 400
+    assert client.get("/telemetry/all", params={"limit": 10001}).status_code == 400
+
+def test_ndjson_streams_all_rows(client):
+    store(2500)
+    response = client.get("/telemetry/all", params={"format": "ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="telemetry.ndjson"' in response.headers["content-disposition"]
+    lines = [orjson.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 2500
+    assert [line["odometerReading"] for line in lines] == list(range(2500))
+
+def test_csv_has_header_and_rows(client):
+    store(3)
+    response = client.get("/telemetry/all", params={"format": "csv", "vin": 2})
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0][:2] == ["telemetryId", "vin"]
+    assert [row[1] for row in rows[1:]] == ["2"]
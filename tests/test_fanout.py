@@ -0,0 +1,102 @@
+import asyncio
+import orjson
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from ..fanout import CLOSED, DISCONNECT, DROP_OLDEST, FanoutHub, Subscriber, fanout_hub, publish
+from ..main import event_stream
+
+def record(vin: int, speed: float = 10.0):
+    return {"vin": vin, "speed": speed}
+
+def test_drop_oldest_keeps_newest_messages():
+    subscriber = Subscriber({"stream:vin:1"}, 2, DROP_OLDEST)
+    assert all(subscriber.push(message) for message in (b"1", b"2", b"3"))
+    assert (subscriber.dropped, subscriber.take_dropped(), subscriber.take_dropped()) == (1, 1, 0)
+    assert [subscriber.queue.get_nowait() for _ in range(2)] == [b"2", b"3"]
+
+def test_disconnect_policy_closes_slow_consumer():
+    subscriber = Subscriber({"stream:vin:1"}, 2, DISCONNECT)
+    assert [subscriber.push(message) for message in (b"1", b"2", b"3", b"4")] == [True, True, False, False]
+    assert subscriber.closed and subscriber.dropped == 0
+    assert [subscriber.queue.get_nowait() for _ in range(2)] == [b"2", CLOSED]
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        FanoutHub(2, "block")
+
+async def drain(subscriber, count: int):
+    return [orjson.loads(await asyncio.wait_for(subscriber.next(), 2)) for _ in range(count)]
+
+def test_hub_routes_vin_and_fleet_channels(run):
+    async def main():
+        hub = FanoutHub(8, DROP_OLDEST)
+        hub.start()
+        try:
+            async with hub.subscription([1], []) as by_vin, hub.subscription([], [7]) as by_fleet:
+                assert hub.snapshot()["subscribers"] == 2
+                publish("telemetry", [record(1), record(2), record(3)], {1: 7, 2: 7})
+                vin_messages = await drain(by_vin, 1)
+                fleet_messages = await drain(by_fleet, 1)
+                assert await by_vin.next(0.1) is None
+            return vin_messages, fleet_messages, hub.snapshot()
+        finally:
+            await hub.stop()
+    vin_messages, fleet_messages, snapshot = run(main())
+    assert vin_messages == [{"type": "telemetry", "records": [record(1)]}]
+    assert fleet_messages == [{"type": "telemetry", "records": [record(1), record(2)]}]
+    assert (snapshot["subscribers"], snapshot["channels"], snapshot["delivered"]) == (0, 0, 2)
+
+def test_hub_disconnects_slow_subscriber(run):
+    async def main():
+        hub = FanoutHub(2, DISCONNECT)
+        hub.start()
+        try:
+            async with hub.subscription([1], []) as slow, hub.subscription([1], []) as fast:
+                for speed in range(4):
+                    publish("telemetry", [record(1, speed)], {})
+                    await drain(fast, 1)
+                assert slow.closed
+                assert await slow.next(1) == orjson.dumps({"type": "telemetry", "records": [record(1, 1)]})
+                assert await slow.next(1) is CLOSED
+            return hub.stats
+        finally:
+            await hub.stop()
+    stats = run(main())
+    assert (stats["delivered"], stats["disconnected"]) == (6, 1)
+
+def test_event_stream_reports_drops(run, monkeypatch):
+    async def main():
+        monkeypatch.setattr(fanout_hub, "queue_size", 1)
+        fanout_hub.start()
+        stream = event_stream([1], [])
+        try:
+            assert await anext(stream) == ": subscribed\n\n"
+            for speed in range(3):
+                publish("telemetry", [record(1, speed)], {})
+            await asyncio.sleep(0.2)
+            return [await anext(stream), await anext(stream)]
+        finally:
+            await stream.aclose()
+            await fanout_hub.stop()
+    notice, data = run(main())
+    assert notice == 'data: {"type":"dropped","count":2}\n\n'
+    assert data.startswith(b"data: ") and orjson.loads(data[6:])["records"] == [record(1, 2.0)]
+
+def test_websocket_receives_published_telemetry(client):
+    client.post("/seed")
+    with client.websocket_connect("/subscribe?fleet_id=1") as websocket:
+        telemetry = {
+            "vin": 12345, "password": "password123", "latitude": 1.0, "longitude": 2.0, "speed": 10, "engineStatus": "on",
+            "fuel": 0.5, "odometerReading": 100, "diagnosticCode": 0, "timestamp": "2026-01-01T00:00:00"
+        }
+        assert client.post("/telemetry/", json=telemetry).status_code == 200
+        message = orjson.loads(websocket.receive_text())
+    assert message["type"] == "telemetry"
+    assert [record["vin"] for record in message["records"]] == [12345]
+
+def test_subscribe_requires_a_filter(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/subscribe") as websocket:
+            websocket.receive_text()
+    assert closed.value.code == 1008
+    assert client.get("/subscribe/events").status_code == 400
@@ -0,0 +1,87 @@
+import math
+from datetime import datetime, timedelta
+import pytest
+from ..database import redis_client
+from ..fleet.aggregates import record_telemetry
+from ..fleet.geo import cell_bounds, geohash, haversine_km, position_args
+
+START = datetime(2026, 1, 1)
+PLACES = {
+    1: (52.52, 13.405),
+    2: (52.39, 13.065),
+    3: (53.55, 9.99),
+    4: (48.857, 2.352),
+    5: (89.0, 0.0),
+}
+FLEETS = {1: 1, 2: 2, 3: 1, 4: 1, 5: 1}
+
+def position(vin: int, latitude: float, longitude: float, minutes: int = 0):
+    return {
+        "vin": vin, "latitude": latitude, "longitude": longitude, "speed": 10.0, "engineStatus": "on", "fuel": 0.5,
+        "odometerReading": 100, "diagnosticCode": 0, "timestamp": START + timedelta(minutes=minutes)
+    }
+
+@pytest.fixture
+def placed():
+    record_telemetry([position(vin, *PLACES[vin]) for vin in PLACES], FLEETS)
+
+@pytest.fixture
+def bybox(monkeypatch):
+    # fakeredis has no GEOSEARCH BYBOX; a radius covering the box also returns a superset for the exact filter to trim.
+    geosearch = redis_client.geosearch
+    boxes = []
+
+    def search(name, width=None, height=None, **kwargs):
+        if width is not None:
+            boxes.append((width, height))
+            kwargs["radius"] = math.hypot(width, height) / 2
+        return geosearch(name, **kwargs)
+    monkeypatch.setattr(redis_client, "geosearch", search)
+    return boxes
+
+def vins(positions):
+    return [position["vin"] for position in positions]
+
+def test_geohash_and_cells():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    lat_low, lon_low, lat_high, lon_high = cell_bounds("u4pruyd")
+    assert lat_low <= 57.64911 <= lat_high and lon_low <= 10.40744 <= lon_high
+    assert position_args(52.52, 13.405)[2] == "u33d u33dc u33dc0"
+    assert position_args(89.0, 0.0) == ["", "", ""]
+    assert haversine_km(52.52, 13.405, 48.857, 2.352) == pytest.approx(877, abs=5)
+
+def test_nearby_sorted_by_distance(client, placed):
+    nearby = client.get("/vehiclesNearby", params={"latitude": 52.5, "longitude": 13.3, "radius_km": 50}).json()
+    assert vins(nearby) == [1, 2]
+    assert nearby[0]["distance"] < nearby[1]["distance"] < 50
+    assert nearby[0]["latitude"] == pytest.approx(52.52, abs=1e-4)
+    assert vins(client.get("/vehiclesNearby", params={"latitude": 52.5, "longitude": 13.3, "radius_km": 50, "fleet_id": 2}).json()) == [2]
+    assert vins(client.get("/vehiclesNearby", params={"latitude": 52.5, "longitude": 13.3, "radius_km": 500, "limit": 2}).json()) == [1, 2]
+    assert client.get("/vehiclesNearby", params={"latitude": 52.5, "longitude": 13.3, "radius_km": 0}).status_code == 422
+
+def test_box_filters_exact_bounds(client, placed, bybox):
+    box = {"min_lat": 52.4, "min_lon": 9.0, "max_lat": 54.0, "max_lon": 14.0}
+    assert sorted(vins(client.get("/vehiclesInBox", params=box).json())) == [1, 3]
+    assert vins(client.get("/vehiclesInBox", params={**box, "min_lat": 52.0, "fleet_id": 2}).json()) == [2]
+    everywhere = {"min_lat": -85, "min_lon": -180, "max_lat": 85, "max_lon": 180}
+    assert sorted(vins(client.get("/vehiclesInBox", params=everywhere).json())) == [1, 2, 3, 4]
+    assert bybox[-1][0] >= 2 * math.pi * 6372.797
+    assert client.get("/vehiclesInBox", params={**box, "min_lat": 55.0}).status_code == 400
+
+def test_moves_update_index(client, placed):
+    record_telemetry([position(1, *PLACES[4], minutes=5), position(3, 91.0, 0.0, minutes=5)], FLEETS)
+    assert vins(client.get("/vehiclesNearby", params={"latitude": 52.5, "longitude": 13.3, "radius_km": 50}).json()) == [2]
+    paris = client.get("/vehiclesNearby", params={"latitude": 48.857, "longitude": 2.352, "radius_km": 5}).json()
+    assert sorted(vins(paris)) == [1, 4]
+    density = client.get("/fleetDensity", params={"precision": 4, "fleet_id": 1}).json()
+    assert density["vehicles"] == 2
+    assert density["cells"] == [{"cell": geohash(48.857, 2.352, 4), "latitude": pytest.approx(48.78, abs=0.2), "longitude": pytest.approx(2.29, abs=0.2), "count": 2}]
+
+def test_density_counts_and_box(client, placed):
+    density = client.get("/fleetDensity", params={"precision": 4}).json()
+    assert density["vehicles"] == 4
+    assert sorted(cell["cell"] for cell in density["cells"]) == sorted({geohash(*PLACES[vin], 4) for vin in (1, 2, 3, 4)})
+    boxed = client.get("/fleetDensity", params={"precision": 5, "min_lat": 52.0, "min_lon": 12.0, "max_lat": 53.0, "max_lon": 14.0}).json()
+    assert boxed["vehicles"] == 2
+    assert client.get("/fleetDensity", params={"precision": 7}).status_code == 400
+    assert client.get("/fleetDensity", params={"min_lat": 52.0}).status_code == 400
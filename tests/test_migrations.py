@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import select, text
+from ..database import SessionLocal, engine
+from ..migrations import run_migrations, schema_migrations
+from ..vehicle.schemas import Vehicle
+
+BASELINE_VEHICLES = """
+CREATE TABLE vehicles (
+    vin INTEGER NOT NULL PRIMARY KEY,
+    "modelId" INTEGER,
+    "fleetId" INTEGER REFERENCES fleets ("fleetId"),
+    "operatorId" INTEGER REFERENCES humans ("humanId"),
+    "ownerId" INTEGER REFERENCES humans ("humanId"),
+    "regStatus" VARCHAR(13),
+    password VARCHAR
+)
+"""
+
+@pytest.fixture
+def baseline_schema():
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE vehicles"))
+        conn.execute(text(BASELINE_VEHICLES))
+        conn.execute(text("CREATE INDEX ix_vehicles_vin ON vehicles (vin)"))
+        conn.execute(text('CREATE INDEX "ix_vehicles_modelId" ON vehicles ("modelId")'))
+        conn.execute(text(
+            'INSERT INTO vehicles (vin, "modelId", "fleetId", "operatorId", "ownerId", "regStatus", password) '
+            "VALUES (1, 1, 1, 1, 1, 'active', 'secret')"
+        ))
+        conn.execute(schema_migrations.delete())
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE vehicles"))
+    Vehicle.__table__.create(engine)
+    run_migrations(engine)
+
+def test_upgrade_backfills_auth_mode(baseline_schema, client):
+    run_migrations(engine)
+    with SessionLocal() as db:
+        assert db.scalar(select(Vehicle.authMode).where(Vehicle.vin == 1)).value == "password"
+    response = client.get("/vehicle/1")
+    assert response.status_code == 200
+    assert response.json()["authMode"] == "password"
+    assert [vehicle["authMode"] for vehicle in client.get("/vehicle/").json()] == ["password"]
+
+def test_migrations_are_recorded_once(baseline_schema):
+    run_migrations(engine)
+    run_migrations(engine)
+    with engine.connect() as conn:
+        versions = list(conn.execute(select(schema_migrations.c.version)).scalars())
+    assert sorted(versions) == list(range(1, len(versions) + 1))
@@ -0,0 +1,86 @@
+import pytest
+from redis.exceptions import RedisError
+from .. import ratelimit
+from ..ratelimit import LocalLimiter, RatePolicy, check_rate_limits
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    return clock
+
+@pytest.fixture
+def policies(monkeypatch):
+    policies = {
+        1: RatePolicy("sliding_window", 3, 60),
+        2: RatePolicy("token_bucket", 2, 60),
+    }
+    monkeypatch.setattr(ratelimit, "FLEET_POLICIES", policies)
+    return policies
+
+@pytest.fixture(params=["redis", "local"])
+def backend(request, monkeypatch):
+    if request.param == "local":
+        def unavailable(*args, **kwargs):
+            raise RedisError("down")
+        monkeypatch.setattr(ratelimit, "RATE_LIMIT_SCRIPT", unavailable)
+        monkeypatch.setattr(ratelimit, "local_limiter", LocalLimiter())
+    return request.param
+
+def allowed(vin: int, fleet_id: int):
+    return check_rate_limits([(vin, fleet_id)])[0]
+
+def test_sliding_window(clock, policies, backend):
+    for _ in range(3):
+        assert allowed(1, 1) == (True, 0)
+        clock.now += 10
+    assert allowed(1, 1) == (False, 30)
+    clock.now += 30.001
+    assert allowed(1, 1) == (True, 0)
+    assert allowed(1, 1) == (False, 10)
+
+def test_token_bucket_refills(clock, policies, backend):
+    assert [allowed(1, 2)[0] for _ in range(2)] == [True, True]
+    assert allowed(1, 2) == (False, 30)
+    clock.now += 15
+    assert allowed(1, 2) == (False, 15)
+    clock.now += 15
+    assert allowed(1, 2) == (True, 0)
+    assert allowed(1, 2)[0] is False
+
+def test_vehicles_are_limited_independently(clock, policies, backend):
+    for _ in range(3):
+        allowed(1, 1)
+    assert allowed(1, 1)[0] is False
+    assert allowed(2, 1)[0] is True
+
+def test_batch_counts_each_request(clock, policies, backend):
+    results = check_rate_limits([(1, 1), (1, 1), (2, 2), (1, 1), (1, 1)])
+    assert [ok for ok, _ in results] == [True, True, True, True, False]
+    assert check_rate_limits([]) == []
+
+def test_fleet_policy_overrides_default(policies):
+    assert ratelimit.policy_for(2) is policies[2]
+    assert ratelimit.policy_for(99) is ratelimit.DEFAULT_POLICY
+    assert policies[2].describe() == "Max 2 requests per 60 seconds (burst 2)"
+    with pytest.raises(ValueError):
+        RatePolicy("leaky_bucket")
+
+def test_telemetry_returns_retry_after(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "DEFAULT_POLICY", RatePolicy("sliding_window", 1, 60))
+    client.post("/seed")
+    telemetry = {
+        "vin": 12345, "password": "password123", "latitude": 1.0, "longitude": 2.0, "speed": 10, "engineStatus": "on",
+        "fuel": 0.5, "odometerReading": 100, "diagnosticCode": 0, "timestamp": "2026-01-01T00:00:00"
+    }
+    assert client.post("/telemetry/", json=telemetry).status_code == 200
+    response = client.post("/telemetry/", json={**telemetry, "timestamp": "2026-01-01T00:00:30"})
+    assert response.status_code == 429
+    assert 0 < int(response.headers["Retry-After"]) <= 60
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from ..database import AsyncSessionLocal, SessionLocal, redis_client
+from ..telemetry.rollup import (
+    DAY, HOUR, LEADER_KEY, MINUTE, RAW, RETENTION_DAYS, fold_into, mark_late, prune, rollup_scheduler, source_rollups
+)
+from ..telemetry.schemas import Telemetry, TelemetryRollup
+
+START = (datetime.utcnow() - timedelta(days=3)).replace(hour=6, minute=0, second=0, microsecond=0)
+SAMPLES = 360
+
+def raw_rows(vin: int):
+    return [
+        {
+            "vin": vin, "latitude": 0.0, "longitude": 0.0, "speed": float((i * 7 + vin) % 100),
+            "engineStatus": "on" if i < 200 else "off", "fuel": 1.0 - i / 1000, "odometerReading": 1000 * vin + i,
+            "diagnosticCode": 0, "timestamp": START + timedelta(seconds=30 * i)
+        }
+        for i in range(SAMPLES)
+    ]
+
+def store(rows):
+    with SessionLocal() as db:
+        db.execute(insert(Telemetry), rows)
+        db.commit()
+
+def rollups(tier: str, vin: int = 1):
+    with SessionLocal() as db:
+        return db.query(TelemetryRollup).filter(TelemetryRollup.tier == tier, TelemetryRollup.vin == vin).order_by(TelemetryRollup.bucket).all()
+
+def test_fold_merges_into_wider_bucket():
+    base = START.replace(minute=10)
+    first = {
+        "vin": 1, "bucket": base, "samples": 2, "speedMin": 10.0, "speedMax": 20.0, "speedSum": 30.0,
+        "fuelFirst": 0.9, "fuelLast": 0.8, "odometerFirst": 100, "odometerLast": 101,
+        "firstAt": base, "lastAt": base + timedelta(seconds=30), "onSeconds": 30.0
+    }
+    second = {
+        **first, "bucket": base + timedelta(minutes=1), "speedMin": 5.0, "speedMax": 50.0, "speedSum": 55.0,
+        "fuelFirst": 0.7, "fuelLast": 0.6, "odometerFirst": 102, "odometerLast": 104,
+        "firstAt": base + timedelta(minutes=1), "lastAt": base + timedelta(minutes=1, seconds=30), "onSeconds": 0.0
+    }
+    buckets = {}
+    fold_into(buckets, second, HOUR)
+    fold_into(buckets, first, HOUR)
+    [merged] = buckets.values()
+    assert merged["tier"] == HOUR and merged["bucket"] == START
+    assert merged["samples"] == 4
+    assert (merged["speedMin"], merged["speedMax"], merged["speedSum"]) == (5.0, 50.0, 85.0)
+    assert (merged["fuelFirst"], merged["fuelLast"]) == (0.9, 0.6)
+    assert (merged["odometerFirst"], merged["odometerLast"]) == (100, 104)
+    assert merged["onSeconds"] == 30.0
+
+def test_source_rollups_yield_one_batch_per_vin(run):
+    store(raw_rows(1) + raw_rows(2))
+
+    async def batches():
+        async with AsyncSessionLocal() as db:
+            return [rows async for rows in source_rollups(db, MINUTE, START, START + timedelta(days=1))]
+    minutes = run(batches())
+    assert [{row["vin"] for row in rows} for rows in minutes] == [{1}, {2}]
+    assert [len(rows) for rows in minutes] == [SAMPLES // 2] * 2
+
+def test_tiers_match_raw(run):
+    rows = raw_rows(1) + raw_rows(2)
+    store(rows)
+    assert run(rollup_scheduler.run_once())
+
+    raw = [row for row in rows if row["vin"] == 1]
+    minutes = rollups(MINUTE)
+    assert len(minutes) == SAMPLES // 2
+    assert sum(rollup.samples for rollup in minutes) == SAMPLES
+
+    hours = rollups(HOUR)
+    assert [rollup.bucket for rollup in hours] == [START + timedelta(hours=h) for h in range(3)]
+    for h, rollup in enumerate(hours):
+        chunk = raw[h * 120:(h + 1) * 120]
+        assert rollup.samples == 120
+        assert rollup.speedMax == max(row["speed"] for row in chunk)
+        assert rollup.speedMin == min(row["speed"] for row in chunk)
+        assert rollup.odometerFirst == chunk[0]["odometerReading"]
+        assert rollup.odometerLast == chunk[-1]["odometerReading"]
+
+    [day] = rollups(DAY)
+    assert day.bucket == START.replace(hour=0)
+    assert day.samples == SAMPLES
+    assert day.speedSum == sum(row["speed"] for row in raw)
+    assert (day.firstAt, day.lastAt) == (raw[0]["timestamp"], raw[-1]["timestamp"])
+    assert day.onSeconds == 200 * 30
+    assert len(rollups(DAY, vin=2)) == 1
+
+def test_second_run_is_incremental(run):
+    store(raw_rows(1))
+    run(rollup_scheduler.run_once())
+    before = rollup_scheduler.stats[f"rolled_{MINUTE}"]
+    run(rollup_scheduler.run_once())
+    assert rollup_scheduler.stats[f"rolled_{MINUTE}"] == before
+    assert sum(rollup.samples for rollup in rollups(MINUTE)) == SAMPLES
+
+def test_skips_while_another_worker_leads(run):
+    store(raw_rows(1))
+    redis_client.set(LEADER_KEY, "other")
+    skipped = rollup_scheduler.stats["skipped"]
+    assert not run(rollup_scheduler.run_once())
+    assert rollup_scheduler.stats["skipped"] == skipped + 1
+    assert rollups(MINUTE) == []
+    assert redis_client.get(LEADER_KEY) == b"other"
+
+def test_late_rows_are_rerolled(run):
+    store(raw_rows(1))
+    run(rollup_scheduler.run_once())
+    late = {**raw_rows(1)[10], "speed": 999.0, "timestamp": START + timedelta(minutes=5, seconds=10)}
+    store([late])
+    mark_late([late])
+    run(rollup_scheduler.run_once())
+    assert rollups(HOUR)[0].speedMax == 999.0
+    assert rollups(HOUR)[0].samples == 121
+    assert rollups(DAY)[0].samples == SAMPLES + 1
+
+def test_prune_respects_retention_and_watermarks(run, monkeypatch):
+    store(raw_rows(1))
+    monkeypatch.setitem(RETENTION_DAYS, RAW, 1)
+    monkeypatch.setitem(RETENTION_DAYS, MINUTE, 2)
+    run(rollup_scheduler.run_once())
+    with SessionLocal() as db:
+        assert db.query(func.count(Telemetry.telemetryId)).scalar() == 0
+    assert rollups(MINUTE) == []
+    assert len(rollups(HOUR)) == 3
+    assert rollups(DAY)[0].samples == SAMPLES
+
+def test_prune_waits_for_rollup(run, monkeypatch):
+    store(raw_rows(1))
+    monkeypatch.setitem(RETENTION_DAYS, RAW, 1)
+
+    async def prune_only():
+        async with AsyncSessionLocal() as db:
+            return await prune(db, datetime.utcnow())
+    assert run(prune_only())[RAW] == 0
+    with SessionLocal() as db:
+        assert db.query(func.count(Telemetry.telemetryId)).scalar() == SAMPLES
@@ -0,0 +1,102 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from ..database import AsyncSessionLocal, Base, async_url
+from ..storage import (
+    PartitionedPostgresBackend, PostgresBackend, SQLiteBackend, StorageBackend, TimescaleBackend, backend_for
+)
+from ..telemetry.schemas import Telemetry
+from ..vehicle.schemas import Vehicle
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL", "")
+START = datetime(2026, 1, 1, 12)
+
+def rows(count: int, start: datetime = START):
+    return [
+        {
+            "vin": 1, "latitude": 1.0, "longitude": 2.0, "speed": float(i), "engineStatus": "on", "fuel": 0.5,
+            "odometerReading": i, "diagnosticCode": 0, "timestamp": start + timedelta(hours=6 * i)
+        }
+        for i in range(count)
+    ]
+
+def test_backend_for():
+    assert isinstance(backend_for("sqlite:///fleet.db"), SQLiteBackend)
+    assert backend_for("sqlite://").in_memory
+    assert type(backend_for("postgresql://fleet@db/fleet")) is PostgresBackend
+    assert isinstance(backend_for("postgresql://fleet@db/fleet", "timescale"), TimescaleBackend)
+    assert isinstance(backend_for("postgresql://fleet@db/fleet", "partitioned"), PartitionedPostgresBackend)
+    assert type(backend_for("mysql://fleet@db/fleet")) is StorageBackend
+
+def test_default_bulk_insert_follows_session(run):
+    async def insert_and(finish):
+        async with AsyncSessionLocal() as db:
+            await StorageBackend().bulk_insert(db, Telemetry.__table__, rows(3))
+            await finish(db)
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(func.count()).select_from(Telemetry))
+    assert run(insert_and(lambda db: db.rollback())) == 0
+    assert run(insert_and(lambda db: db.commit())) == 3
+
+@pytest.fixture
+def postgres():
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(POSTGRES_URL)
+    try:
+        with engine.begin() as conn:
+            Base.metadata.drop_all(conn)
+            Base.metadata.create_all(conn)
+            conn.execute(insert(Vehicle), [{"vin": 1, "password": "secret"}])
+    except OperationalError:
+        engine.dispose()
+        pytest.skip("Postgres is not reachable")
+    yield engine
+    with engine.begin() as conn:
+        Base.metadata.drop_all(conn)
+    engine.dispose()
+
+def telemetry_count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Telemetry)).scalar()
+
+def copy(backend, finish):
+    async def main():
+        engine = create_async_engine(async_url(POSTGRES_URL))
+        try:
+            async with AsyncSession(engine) as db:
+                await backend.bulk_insert(db, Telemetry.__table__, rows(4))
+                await finish(db)
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+def test_copy_joins_session_transaction(postgres):
+    copy(PostgresBackend(), lambda db: db.rollback())
+    assert telemetry_count(postgres) == 0
+    copy(PostgresBackend(), lambda db: db.commit())
+    assert telemetry_count(postgres) == 4
+
+def test_partitioning_keeps_rows_and_routes_inserts(postgres):
+    with postgres.begin() as conn:
+        conn.execute(insert(Telemetry), rows(8))
+    backend = PartitionedPostgresBackend()
+    with postgres.begin() as conn:
+        backend.prepare_time_series(conn, Telemetry.__table__, "timestamp")
+        backend.prepare_time_series(conn, Telemetry.__table__, "timestamp")
+        assert backend.is_partitioned(conn, Telemetry.__table__)
+    assert telemetry_count(postgres) == 8
+
+    copy(backend, lambda db: db.commit())
+    with postgres.connect() as conn:
+        partitions = dict(conn.execute(text(
+            "SELECT tableoid::regclass::text, count(*) FROM telemetries GROUP BY 1"
+        )).all())
+        ids = conn.execute(select(Telemetry.telemetryId).order_by(Telemetry.telemetryId)).scalars().all()
+    assert (partitions["telemetries_20260101"], partitions["telemetries_20260102"], partitions["telemetries_20260103"]) == (4, 6, 2)
+    assert "telemetries_default" not in partitions
+    assert ids == list(range(1, 13))
@@ -0,0 +1,46 @@
+from .. import ratelimit
+from ..ratelimit import RatePolicy
+
+def record(vin: int, password: str, minute: int = 0):
+    return {
+        "vin": vin, "password": password, "latitude": 1.0, "longitude": 2.0, "speed": 30, "engineStatus": "on",
+        "fuel": 0.5, "odometerReading": 100 + minute, "diagnosticCode": 0, "timestamp": f"2026-01-01T00:{minute:02d}:00"
+    }
+
+def stored(client, vin: int):
+    return client.get("/telemetry/all", params={"vin": vin, "until": "2026-01-02T00:00:00"}).json()["items"]
+
+def test_batch_reports_each_record(client):
+    client.post("/seed")
+    response = client.post("/telemetry/batch", json={"tel": [
+        record(12345, "password123", 1),
+        record(12345, "wrong", 2),
+        record(99999, "password123", 3),
+        record(67890, "password456", 4),
+        record(12345, "password123", 5),
+    ]})
+    assert response.status_code == 200
+    batch = response.json()
+    assert (batch["success"], batch["accepted"], batch["rejected"]) == (False, 3, 2)
+    assert batch["results"] == [
+        {"index": 0, "vin": 12345, "accepted": True},
+        {"index": 1, "vin": 12345, "accepted": False, "detail": "Wrong Password for Vehicle"},
+        {"index": 2, "vin": 99999, "accepted": False, "detail": "Vehicle Not Found"},
+        {"index": 3, "vin": 67890, "accepted": True},
+        {"index": 4, "vin": 12345, "accepted": True},
+    ]
+    assert [item["odometerReading"] for item in stored(client, 12345)] == [101, 105]
+    assert [item["odometerReading"] for item in stored(client, 67890)] == [104]
+
+def test_rate_limited_vehicle_is_rejected_in_batch(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "DEFAULT_POLICY", RatePolicy("sliding_window", 1, 60))
+    client.post("/seed")
+    assert client.post("/telemetry/batch", json={"tel": [record(12345, "password123", 1)]}).json()["success"]
+    batch = client.post("/telemetry/batch", json={"tel": [record(12345, "password123", 2), record(67890, "password456", 3)]}).json()
+    assert [result["accepted"] for result in batch["results"]] == [False, True]
+    assert batch["results"][0]["detail"].startswith("Rate limit exceeded")
+    assert len(stored(client, 12345)) == 1
+
+def test_invalid_batch_body(client):
+    assert client.post("/telemetry/batch", json={"tel": [{"vin": 1}]}).status_code == 422
+    assert client.post("/telemetry/batch", json={"tel": []}).json() == {"success": True, "accepted": 0, "rejected": 0, "results": []}
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert, select
+from ..database import SessionLocal
+from ..telemetry.schemas import Telemetry, Trip
+from ..telemetry.trips import current_trip, detect, load_columns, rebuild_trips, segment
+
+START = datetime(2026, 1, 1)
+TRIP_FIELDS = [
+    "vin", "startTime", "endTime", "samples", "odometerStart", "odometerEnd", "odometerDistance",
+    "haversineDistance", "maxSpeed", "avgSpeed", "idleSeconds", "fuelUsed"
+]
+
+def drive(vin: int, plan):
+    rows = []
+    seconds = 0.0
+    odometer = 1000.0 * vin
+    fuel = 0.9
+    for gap, status, speed in plan:
+        seconds += gap
+        odometer += speed / 60
+        fuel -= 0.002 if status != "off" else 0
+        rows.append({
+            "vin": vin, "latitude": 52.0 + odometer / 1000, "longitude": 13.0 + vin / 100, "speed": float(speed),
+            "engineStatus": status, "fuel": fuel, "odometerReading": int(odometer), "diagnosticCode": 0,
+            "timestamp": START + timedelta(seconds=seconds)
+        })
+    return rows
+
+def fleet_rows():
+    first = (
+        [(60, "on", 50 + i) for i in range(10)] + [(60, "idle", 0)] * 3 + [(60, "off", 0)] * 2
+        + [(60, "on", 80)] * 5 + [(1200, "on", 40)] + [(60, "on", 45)] * 3
+    )
+    second = [(30, "on", 70 + i) for i in range(6)] + [(30, "off", 0)]
+    return drive(1, first) + drive(2, second)
+
+def store(rows):
+    with SessionLocal() as db:
+        db.execute(insert(Telemetry), rows)
+        db.commit()
+
+def comparable(trips):
+    return sorted(
+        tuple(pytest.approx(trip[field]) if isinstance(trip[field], float) else trip[field] for field in TRIP_FIELDS)
+        for trip in trips
+    )
+
+def stored_trips():
+    with SessionLocal() as db:
+        return [{field: getattr(trip, field) for field in TRIP_FIELDS} for trip in db.scalars(select(Trip).order_by(Trip.vin, Trip.startTime))]
+
+def test_detect_closes_on_off_and_gap():
+    trips = detect(fleet_rows())
+    spans = sorted((trip["vin"], trip["startTime"], trip["endTime"], trip["samples"]) for trip in trips)
+    assert spans == [
+        (1, START + timedelta(seconds=60), START + timedelta(seconds=840), 14),
+        (1, START + timedelta(seconds=960), START + timedelta(seconds=1200), 5),
+        (2, START + timedelta(seconds=30), START + timedelta(seconds=210), 7),
+    ]
+    first = min((trip for trip in trips if trip["vin"] == 1), key=lambda trip: trip["startTime"])
+    assert first["idleSeconds"] == 180
+    assert first["maxSpeed"] == 59
+    assert current_trip(1)["samples"] == 4
+    assert current_trip(2) is None
+
+def test_detect_ignores_replayed_rows():
+    rows = fleet_rows()
+    trips = detect(rows)
+    assert detect(rows) == []
+    assert len(trips) == 3
+
+def test_segment_matches_streaming():
+    rows = fleet_rows()
+    streamed = [trip for i in range(0, len(rows), 7) for trip in detect(sorted(rows, key=lambda row: row["timestamp"])[i:i + 7])]
+    open_trip = current_trip(1)
+    store(rows)
+    with SessionLocal() as db:
+        trips, states = segment(load_columns(db, [1, 2]))
+    assert comparable(trips) == comparable(streamed)
+    assert states[1]["open"] == 1 and states[1]["samples"] == open_trip["samples"]
+    assert states[2]["open"] == 0
+
+def test_rebuild_restores_detector_state():
+    rows = fleet_rows()
+    streamed = detect(rows)
+    open_trip = current_trip(1)
+    store(rows)
+    with SessionLocal() as db:
+        assert rebuild_trips(db, [1, 2]) == 3
+    assert comparable(stored_trips()) == comparable(streamed)
+    assert comparable([current_trip(1)]) == comparable([open_trip])
+
+    with SessionLocal() as db:
+        assert rebuild_trips(db, [1, 2]) == 3
+    assert len(stored_trips()) == 3
+
+def test_rebuild_keeps_trips_older_than_retained_telemetry():
+    rows = fleet_rows()
+    old = {
+        "vin": 1, "startTime": START - timedelta(days=2), "endTime": START - timedelta(days=2) + timedelta(minutes=10), "samples": 11,
+        "odometerStart": 900.0, "odometerEnd": 950.0, "odometerDistance": 50.0, "haversineDistance": 49.0,
+        "maxSpeed": 90.0, "avgSpeed": 60.0, "idleSeconds": 0.0, "fuelUsed": 0.01
+    }
+    with SessionLocal() as db:
+        db.execute(insert(Trip), [old])
+        db.commit()
+    store(rows)
+    with SessionLocal() as db:
+        rebuild_trips(db, [1, 2])
+    trips = stored_trips()
+    assert len(trips) == 4
+    assert trips[0]["startTime"] == old["startTime"]
+
+def test_rebuild_skips_telemetry_covered_by_kept_trip():
+    rows = fleet_rows()
+    detect(rows)
+    store(rows)
+    with SessionLocal() as db:
+        rebuild_trips(db, [1])
+        db.query(Telemetry).filter(Telemetry.vin == 1, Telemetry.timestamp < START + timedelta(seconds=300)).delete()
+        db.commit()
+        rebuild_trips(db, [1])
+    starts = [trip["startTime"] for trip in stored_trips() if trip["vin"] == 1]
+    assert starts == [START + timedelta(seconds=60), START + timedelta(seconds=960)]
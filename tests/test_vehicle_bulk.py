@@ -0,0 +1,46 @@
+from ..cache import version_key
+from ..database import redis_client
+
+def vehicle(vin: int, password: str = "secret", auth_mode: str = "password", fleet_id: int = 1):
+    return {
+        "vin": vin, "modelId": 1, "fleetId": fleet_id, "operatorId": 1, "ownerId": 2, "regStatus": "active",
+        "password": password, "authMode": auth_mode
+    }
+
+def telemetry(vin: int, password: str):
+    return {
+        "vin": vin, "password": password, "latitude": 1.0, "longitude": 2.0, "speed": 10, "engineStatus": "on",
+        "fuel": 0.5, "odometerReading": 100, "diagnosticCode": 0, "timestamp": "2026-01-01T00:00:00"
+    }
+
+def test_bulk_creates_new_and_reports_rejections(client):
+    client.post("/seed")
+    response = client.post("/vehicle/bulk", json={"vehicles": [
+        vehicle(1),
+        vehicle(12345),
+        vehicle(1, password="other"),
+        vehicle(2, password="device-token", auth_mode="token", fleet_id=2),
+    ]})
+    assert response.status_code == 200
+    bulk = response.json()
+    assert (bulk["success"], bulk["created"], bulk["rejected"]) == (False, 2, 2)
+    assert bulk["results"] == [
+        {"index": 0, "vin": 1, "created": True},
+        {"index": 1, "vin": 12345, "created": False, "detail": "Vehicle Already Exists"},
+        {"index": 2, "vin": 1, "created": False, "detail": "Duplicate VIN in request"},
+        {"index": 3, "vin": 2, "created": True},
+    ]
+    assert client.get("/vehicle/2").json()["authMode"] == "token"
+    assert client.post("/telemetry/", json=telemetry(1, "secret")).status_code == 200
+    assert client.post("/telemetry/", json=telemetry(1, "other")).status_code == 401
+    assert client.post("/telemetry/", json=telemetry(2, "device-token")).status_code == 200
+
+def test_bulk_invalidates_fleet_caches(client):
+    client.post("/vehicle/bulk", json={"vehicles": [vehicle(1, fleet_id=3), vehicle(2, fleet_id=3), vehicle(3, fleet_id=4)]})
+    assert [int(redis_client.get(version_key("fleet_distance", fleet_id)) or 0) for fleet_id in (3, 4, 5)] == [1, 1, 0]
+    assert int(redis_client.get(version_key("fleet_analytics", 3))) == 1
+
+def test_empty_and_invalid_bulk(client):
+    assert client.post("/vehicle/bulk", json={"vehicles": []}).json() == {"success": True, "created": 0, "rejected": 0, "results": []}
+    assert client.post("/vehicle/bulk", json={"vehicles": [{"vin": 1}]}).status_code == 422
+    assert client.get("/vehicle/").json() == []
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import List, Optional
 from pydantic import BaseModel
 
 class regStatuses(str, Enum):
@@ -6,6 +7,10 @@ class regStatuses(str, Enum):
     maintenance = "maintenance"
     decommisioned = "decommisioned"
 
+class authModes(str, Enum):
+    password = "password"
+    token = "token"
+
 class VehicleIn(BaseModel):
     vin: int
     modelId: int
@@ -14,6 +19,7 @@ class VehicleIn(BaseModel):
     ownerId: int
     regStatus: regStatuses
     password: str
+    authMode: authModes = authModes.password
 
 class VehicleOut(BaseModel):
     vin: int
@@ -21,4 +27,20 @@ class VehicleOut(BaseModel):
     fleetId: int
     operatorId: int
     ownerId: int
-    regStatus: regStatuses
\ No newline at end of file
+    regStatus: regStatuses
+    authMode: authModes = authModes.password
+
+class VehicleInList(BaseModel):
+    vehicles: List[VehicleIn]
+
+class VehicleResult(BaseModel):
+    index: int
+    vin: int
+    created: bool
+    detail: Optional[str] = None
+
+class VehicleBulkOut(BaseModel):
+    success: bool
+    created: int
+    rejected: int
+    results: List[VehicleResult]
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, HTTPException
-from ..database import SessionLocal
-from .models import VehicleIn, VehicleOut
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db
+from .models import VehicleBulkOut, VehicleIn, VehicleInList, VehicleOut, authModes
 from .schemas import Vehicle
-from ..database import hash_password
+from ..telemetry.schemas import VehicleLatestState
+from ..fleet.aggregates import record_telemetry, remove_vehicle, state_row
+from ..alert.rules import clear_alert_state
+from ..telemetry.trips import clear_trip_state
+from ..cache import bump
+from ..credentials import credential_cache, hash_credential, hash_credentials
 
 router = APIRouter()
 
 @router.post("/")
-async def create_vehicle(vehicle: VehicleIn) -> VehicleOut:
-    db = SessionLocal()
-
-    db_vehicle = db.query(Vehicle).filter(Vehicle.vin == vehicle.vin).first()
+async def create_vehicle(vehicle: VehicleIn, db: AsyncSession = Depends(get_db)) -> VehicleOut:
+    db_vehicle = await db.scalar(select(Vehicle).where(Vehicle.vin == vehicle.vin))
     if db_vehicle:
         raise HTTPException(status_code=409, detail="Vehicle Already Exists")
 
@@ -21,54 +27,114 @@ async def create_vehicle(vehicle: VehicleIn) -> VehicleOut:
         operatorId = vehicle.operatorId,
         ownerId = vehicle.ownerId,
         regStatus = vehicle.regStatus,
-        password = hash_password(vehicle.password)
+        password = await hash_credential(vehicle.password, vehicle.authMode),
+        authMode = vehicle.authMode
     )
 
     db.add(db_vehicle)
-    db.commit()
-    db.refresh(db_vehicle)
+    await db.commit()
+    bump("fleet_distance", vehicle.fleetId)
+    bump("fleet_analytics", vehicle.fleetId)
+    await db.refresh(db_vehicle)
     return db_vehicle
 
+@router.post("/bulk", response_model_exclude_none=True)
+async def create_vehicles(vehicles: VehicleInList, db: AsyncSession = Depends(get_db)) -> VehicleBulkOut:
+    vins = [vehicle.vin for vehicle in vehicles.vehicles]
+    existing = set((await db.scalars(select(Vehicle.vin).where(Vehicle.vin.in_(vins)))).all())
+    results = [None] * len(vins)
+    pending = {}
+    for index, vehicle in enumerate(vehicles.vehicles):
+        if vehicle.vin in existing:
+            results[index] = {"index": index, "vin": vehicle.vin, "created": False, "detail": "Vehicle Already Exists"}
+        elif vehicle.vin in pending:
+            results[index] = {"index": index, "vin": vehicle.vin, "created": False, "detail": "Duplicate VIN in request"}
+        else:
+            pending[vehicle.vin] = (index, vehicle)
+
+    passwords = await hash_credentials([(vehicle.password, vehicle.authMode) for _, vehicle in pending.values()])
+    db.add_all([
+        Vehicle(
+            vin = vehicle.vin,
+            modelId = vehicle.modelId,
+            fleetId = vehicle.fleetId,
+            operatorId = vehicle.operatorId,
+            ownerId = vehicle.ownerId,
+            regStatus = vehicle.regStatus,
+            password = password,
+            authMode = vehicle.authMode
+        )
+        for (_, vehicle), password in zip(pending.values(), passwords)
+    ])
+    await db.commit()
+    for fleet_id in {vehicle.fleetId for _, vehicle in pending.values()}:
+        bump("fleet_distance", fleet_id)
+        bump("fleet_analytics", fleet_id)
+
+    for index, vehicle in pending.values():
+        results[index] = {"index": index, "vin": vehicle.vin, "created": True}
+    return {
+        "success": len(pending) == len(results),
+        "created": len(pending),
+        "rejected": len(results) - len(pending),
+        "results": results
+    }
+
 @router.get("/{vin}")
-async def get_vehicle(vin: int):
-    db = SessionLocal()
-    db_vehicle = db.query(Vehicle).filter(Vehicle.vin == vin).first()
+async def get_vehicle(vin: int, db: AsyncSession = Depends(get_db)) -> VehicleOut:
+    db_vehicle = await db.scalar(select(Vehicle).where(Vehicle.vin == vin))
     if not db_vehicle:
         raise HTTPException(status_code=404, detail="Vehicle Not Found")
     return db_vehicle
 
 @router.get("/")
-async def get_vehicles():
-    db = SessionLocal()
-    db_vehicles = db.query(Vehicle).all()
+async def get_vehicles(db: AsyncSession = Depends(get_db)) -> List[VehicleOut]:
+    db_vehicles = (await db.scalars(select(Vehicle))).all()
     return db_vehicles
 
 @router.delete("/{vin}")
-async def delete_vehicle(vin: int):
-    db = SessionLocal()
-    db_vehicle = db.query(Vehicle).filter(Vehicle.vin == vin).first()
+async def delete_vehicle(vin: int, db: AsyncSession = Depends(get_db)) -> dict[str, bool]:
+    db_vehicle = await db.scalar(select(Vehicle).where(Vehicle.vin == vin))
     if not db_vehicle:
         raise HTTPException(status_code=404, detail="Vehicle Not Found")
-    db.delete(db_vehicle)
-    db.commit()
+    await db.execute(delete(VehicleLatestState).where(VehicleLatestState.vin == vin))
+    await db.delete(db_vehicle)
+    await db.commit()
+    credential_cache.invalidate(vin)
+    remove_vehicle(vin)
+    clear_alert_state(vin)
+    clear_trip_state(vin)
+    bump("fleet_distance", db_vehicle.fleetId)
+    bump("fleet_analytics", db_vehicle.fleetId)
     return {"success": True}
 
 @router.put("/{vin}")
-async def update_vehicle(vin: int, vehicle: VehicleIn):
-    db = SessionLocal()
-    db_vehicle = db.query(Vehicle).filter(Vehicle.vin == vin).first()
+async def update_vehicle(vin: int, vehicle: VehicleIn, db: AsyncSession = Depends(get_db)) -> VehicleOut:
+    db_vehicle = await db.scalar(select(Vehicle).where(Vehicle.vin == vin))
     if not db_vehicle:
         raise HTTPException(status_code=404, detail="Vehicle Not Found")
     
     db_vehicle.modelId = vehicle.modelId
+    previous_fleet = db_vehicle.fleetId
     db_vehicle.fleetId = vehicle.fleetId
     db_vehicle.operatorId = vehicle.operatorId
     db_vehicle.ownerId = vehicle.ownerId
     db_vehicle.regStatus = vehicle.regStatus
-    if vehicle.password:
-        db_vehicle.password = hash_password(vehicle.password)
+    if vehicle.password or vehicle.authMode != (db_vehicle.authMode or authModes.password):
+        db_vehicle.password = await hash_credential(vehicle.password, vehicle.authMode)
+        db_vehicle.authMode = vehicle.authMode
     
-    db.commit()
-    db.refresh(db_vehicle)
+    await db.commit()
+    credential_cache.invalidate(vin)
+    if previous_fleet != vehicle.fleetId:
+        state = await db.scalar(select(VehicleLatestState).where(VehicleLatestState.vin == vin))
+        remove_vehicle(vin)
+        if state:
+            record_telemetry([state_row(state)], {vin: vehicle.fleetId})
+    bump("fleet_distance", previous_fleet)
+    bump("fleet_analytics", previous_fleet)
+    bump("fleet_distance", vehicle.fleetId)
+    bump("fleet_analytics", vehicle.fleetId)
+    await db.refresh(db_vehicle)
     return db_vehicle
 
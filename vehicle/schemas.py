@@ -1,13 +1,14 @@
 from sqlalchemy import Column, Integer, ForeignKey, Enum, String
-from .models import regStatuses
+from .models import regStatuses, authModes
 from ..database import Base
 
 class Vehicle(Base):
     __tablename__ = "vehicles"
     vin = Column(Integer, primary_key=True, index=True, autoincrement="auto")
     modelId = Column(Integer, index=True)
-    fleetId = Column(Integer, ForeignKey("fleets.fleetId"))
+    fleetId = Column(Integer, ForeignKey("fleets.fleetId"), index=True)
     operatorId = Column(Integer, ForeignKey("humans.humanId"))
     ownerId = Column(Integer, ForeignKey("humans.humanId"))
     regStatus = Column(Enum(regStatuses))
-    password = Column(String)
\ No newline at end of file
+    password = Column(String)
+    authMode = Column(Enum(authModes), default=authModes.password)
\ No newline at end of file
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SAMPLES = 1000
+
+class BatchWorker:
+    name = "worker"
+
+    def __init__(self, queue_size: int, batch_size: int, batch_wait: float):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = None
+        self.task = None
+        self.stats = Counter()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def running(self):
+        return self.task is not None
+
+    def submit(self, items):
+        if self.queue is None:
+            return False
+        if self.queue_size - self.queue.qsize() < len(items):
+            self.stats["rejected"] += len(items)
+            return False
+        for item in items:
+            self.queue.put_nowait(item)
+        self.stats["queued"] += len(items)
+        return True
+
+    async def process(self, items):
+        raise NotImplementedError
+
+    async def next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        while True:
+            items = await self.next_batch()
+            started = time.perf_counter()
+            try:
+                await self.process(items)
+                self.stats["processed"] += len(items)
+                self.stats["batches"] += 1
+            except Exception:
+                self.stats["failed"] += len(items)
+                logger.exception("%s failed to process %d items", self.name, len(items))
+            finally:
+                self.latencies.append(time.perf_counter() - started)
+                for _ in items:
+                    self.queue.task_done()
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        await self.queue.join()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.queue = None
+        self.task = None
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+        return {
+            **self.stats,
+            "depth": self.queue.qsize() if self.queue else 0,
+            "capacity": self.queue_size,
+            "batch_ms_p50": percentile(0.5),
+            "batch_ms_p95": percentile(0.95),
+            "batch_ms_max": latencies[-1] * 1000 if latencies else 0.0,
+        }